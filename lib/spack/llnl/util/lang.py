@@ -263,11 +263,49 @@ def setter(name, value):
     return cls
 
 
+def slot_names(cls):
+    """Names of the attributes kept in the ``__slots__`` of a class and of
+    its base classes, other than ``__dict__`` and ``__weakref__``."""
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, string_types):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in names and
+                     name not in ('__dict__', '__weakref__'))
+    return tuple(names)
+
+
+def getstate_with_slots(obj):
+    """``__getstate__`` for classes keeping attributes in ``__slots__``.
+
+    Their instances can then be pickled with any protocol, and copied, like
+    those of classes with just a ``__dict__``.  Use along with
+    ``setstate_with_slots()``.
+    """
+    state = dict(getattr(obj, '__dict__', None) or {})
+    for name in slot_names(type(obj)):
+        if hasattr(obj, name):
+            state[name] = getattr(obj, name)
+    return state
+
+
+def setstate_with_slots(obj, state):
+    """``__setstate__`` for classes keeping attributes in ``__slots__``."""
+    for name, value in state.items():
+        object.__setattr__(obj, name, value)
+
+
 @key_ordering
 class HashableMap(collections.MutableMapping):
     """This is a hashable, comparable dictionary.  Hash is performed on
        a tuple of the values in the dictionary."""
 
+    __slots__ = ('dict',)
+
+    __getstate__ = getstate_with_slots
+    __setstate__ = setstate_with_slots
+
     def __init__(self):
         self.dict = {}
 
@@ -528,24 +566,37 @@ class ObjectWrapper(object):
 
     This class is modeled after the stackoverflow answer:
     * http://stackoverflow.com/a/1445289/771663
+
+    The wrapper shares the ``__dict__`` of the wrapped object.  Attributes
+    the wrapped object keeps in ``__slots__`` are copied instead.
     """
-    def __init__(self, wrapped_object):
+    def __new__(cls, wrapped_object, *args, **kwargs):
         wrapped_cls = type(wrapped_object)
         wrapped_name = wrapped_cls.__name__
 
         # If the wrapped object is already an ObjectWrapper, or a derived class
-        # of it, adding type(self) in front of type(wrapped_object)
+        # of it, adding cls in front of type(wrapped_object)
         # results in an inconsistent MRO.
         #
         # TODO: the implementation below doesn't account for the case where we
         # TODO: have different base classes of ObjectWrapper, say A and B, and
         # TODO: we want to wrap an instance of A with B.
-        if type(self) not in wrapped_cls.__mro__:
-            self.__class__ = type(wrapped_name, (type(self), wrapped_cls), {})
+        #
+        # The instance is created with its final class, rather than having
+        # its class changed later, for the layout of any __slots__ to match.
+        if cls not in wrapped_cls.__mro__:
+            wrapper_cls = type(wrapped_name, (cls, wrapped_cls), {})
         else:
-            self.__class__ = type(wrapped_name, (wrapped_cls,), {})
+            wrapper_cls = type(wrapped_name, (wrapped_cls,), {})
+        return object.__new__(wrapper_cls)
+
+    def __init__(self, wrapped_object):
+        for name in slot_names(type(wrapped_object)):
+            if hasattr(wrapped_object, name):
+                object.__setattr__(self, name, getattr(wrapped_object, name))
 
-        self.__dict__ = wrapped_object.__dict__
+        if hasattr(wrapped_object, '__dict__'):
+            self.__dict__ = wrapped_object.__dict__
 
 
 class Singleton(object):
@@ -60,6 +60,7 @@
 import spack.install_test
 import spack.subprocess_context
 import spack.architecture as arch
+import spack.util.jobserver
 import spack.util.path
 from spack.util.string import plural
 from spack.util.environment import (
@@ -101,6 +102,9 @@
 # Platform-specific library suffix.
 dso_suffix = 'dylib' if sys.platform == 'darwin' else 'so'
 
+#: Node-local named pipe hosting the jobserver shared by all builds
+jobserver_path = '$tempdir/$user/spack-jobserver/jobserver'
+
 
 class MakeExecutable(Executable):
     """Special callable executable object for make so the user can specify
@@ -114,11 +118,25 @@ class MakeExecutable(Executable):
 
        Note that if the SPACK_NO_PARALLEL_MAKE env var is set it overrides
        everything.
+
+       If a jobserver is given, parallel invocations are passed its
+       ``MAKEFLAGS`` and file descriptors so that they (and any make they
+       run) draw jobs from its shared pool.  A token is taken from the pool
+       for the job make runs without one.  Tools that are not jobserver
+       clients themselves get ``-j`` with as many jobs as they can take
+       from the pool right away, up to ``jobs``, and keep them until they
+       exit.
     """
 
-    def __init__(self, name, jobs):
+    def __init__(self, name, jobs, jobserver=None):
         super(MakeExecutable, self).__init__(name)
         self.jobs = jobs
+        self.jobserver = jobserver
+
+    @property
+    def jobserver_client(self):
+        """Whether the executable is a GNU make that uses the jobserver."""
+        return self.jobserver is not None and self.name in ('make', 'gmake')
 
     def __call__(self, *args, **kwargs):
         """parallel, and jobs_env from kwargs are swallowed and used here;
@@ -128,15 +146,39 @@ def __call__(self, *args, **kwargs):
         disable = env_flag(SPACK_NO_PARALLEL_MAKE)
         parallel = (not disable) and kwargs.pop('parallel', self.jobs > 1)
 
-        if parallel:
-            args = ('-j{0}'.format(self.jobs),) + args
+        if not parallel:
+            return super(MakeExecutable, self).__call__(*args, **kwargs)
+
+        jobs, tokens = self.jobs, 0
+        if self.jobserver is not None:
+            if self.jobserver_client:
+                tokens = self.jobserver.acquire()
+            else:
+                jobs = tokens = self.jobserver.acquire(self.jobs)
+
+        try:
+            # A -j option would make GNU make start its own jobserver
+            if not self.jobserver_client:
+                args = ('-j{0}'.format(jobs),) + args
             jobs_env = kwargs.pop('jobs_env', None)
+            extra_env = kwargs.setdefault('extra_env', {})
             if jobs_env:
                 # Caller wants us to set an environment variable to
                 # control the parallelism.
-                kwargs['extra_env'] = {jobs_env: str(self.jobs)}
-
-        return super(MakeExecutable, self).__call__(*args, **kwargs)
+                extra_env[jobs_env] = str(jobs)
+            if self.jobserver is not None:
+                extra_env['MAKEFLAGS'] = ' '.join(filter(None, (
+                    extra_env.get('MAKEFLAGS'), self.jobserver.makeflags)))
+                kwargs['pass_fds'] = tuple(
+                    kwargs.get('pass_fds') or ()) + self.jobserver.fds
+
+            return super(MakeExecutable, self).__call__(*args, **kwargs)
+        finally:
+            if tokens:
+                # A killed make does not give back the tokens it took
+                if self.returncode != 0:
+                    self.jobserver.refill()
+                self.jobserver.release(tokens)
 
 
 def clean_environment():
@@ -452,6 +494,20 @@ def set_build_environment_variables(pkg, env, dirty):
     return env
 
 
+def _get_jobserver():
+    """Return the node-wide jobserver if it is enabled, else ``None``.
+
+    The pool is sized to the ``build_jobs`` of the first process to use it.
+    """
+    if not spack.config.get('config:jobserver', False):
+        return None
+
+    jobs = min(spack.config.get('config:build_jobs', 16),
+               multiprocessing.cpu_count())
+    path = spack.util.path.canonicalize_path(jobserver_path)
+    return spack.util.jobserver.attach(path, jobs)
+
+
 def _set_variables_for_single_module(pkg, module):
     """Helper function to set module variables for single module."""
     # Put a marker on this module so that it won't execute the body of this
@@ -462,15 +518,16 @@ def _set_variables_for_single_module(pkg, module):
 
     jobs = spack.config.get('config:build_jobs', 16) if pkg.parallel else 1
     jobs = min(jobs, multiprocessing.cpu_count())
+    jobserver = _get_jobserver() if jobs > 1 else None
 
     m = module
     m.make_jobs = jobs
 
     # TODO: make these build deps that can be installed if not found.
-    m.make = MakeExecutable('make', jobs)
-    m.gmake = MakeExecutable('gmake', jobs)
-    m.scons = MakeExecutable('scons', jobs)
-    m.ninja = MakeExecutable('ninja', jobs)
+    m.make = MakeExecutable('make', jobs, jobserver)
+    m.gmake = MakeExecutable('gmake', jobs, jobserver)
+    m.scons = MakeExecutable('scons', jobs, jobserver)
+    m.ninja = MakeExecutable('ninja', jobs, jobserver)
 
     # easy shortcut to os.environ
     m.env = os.environ
@@ -481,7 +538,7 @@ def _set_variables_for_single_module(pkg, module):
 
     m.meson = Executable('meson')
     m.cmake = Executable('cmake')
-    m.ctest = MakeExecutable('ctest', jobs)
+    m.ctest = MakeExecutable('ctest', jobs, jobserver)
 
     # Standard CMake arguments
     m.std_cmake_args = spack.build_systems.cmake.CMakePackage._std_args(pkg)
@@ -834,7 +891,7 @@ def modifications_from_dependencies(spec, context):
 
 
 def _setup_pkg_and_run(serialized_pkg, function, kwargs, child_pipe,
-                       input_multiprocess_fd):
+                       input_multiprocess_fd, setup_env=True):
 
     context = kwargs.get('context', 'build')
 
@@ -849,7 +906,7 @@ def _setup_pkg_and_run(serialized_pkg, function, kwargs, child_pipe,
 
         pkg = serialized_pkg.restore()
 
-        if not kwargs.get('fake', False):
+        if setup_env and not kwargs.get('fake', False):
             kwargs['unmodified_env'] = os.environ.copy()
             setup_package(pkg, dirty=kwargs.get('dirty', False),
                           context=context)
@@ -900,6 +957,133 @@ def _setup_pkg_and_run(serialized_pkg, function, kwargs, child_pipe,
             input_multiprocess_fd.close()
 
 
+class BuildProcess(object):
+    """Handle on a child process running part of a spack build.
+
+    The process is started with the build environment of ``pkg`` set up
+    (see :func:`start_build_process`), but the parent is free to do other
+    work until it calls :meth:`complete`.  This allows the installer to keep
+    several builds in flight at once.
+    """
+
+    def __init__(self, pkg, function, kwargs, forward_stdin=True,
+                 setup_env=True):
+        """
+        Args:
+            pkg (PackageBase): package whose environment we should set up the
+                child process for.
+            function (callable): function to run in the child process, which
+                is passed the restored package and ``kwargs``.
+            kwargs (dict): arguments passed through to ``function``
+            forward_stdin (bool): whether to forward ``sys.stdin`` to the
+                child process, which only makes sense when a single build
+                runs at a time
+            setup_env (bool): whether to set up the build environment of
+                ``pkg`` in the child process, which is not needed to, e.g.,
+                extract a binary package
+        """
+        self.pkg = pkg
+        self.function = function
+        self.kwargs = kwargs
+        self.forward_stdin = forward_stdin
+        self.setup_env = setup_env
+        self.process = None
+        self.parent_pipe = None
+
+    def start(self):
+        """Start the child process and return this handle."""
+        parent_pipe, child_pipe = multiprocessing.Pipe()
+        input_multiprocess_fd = None
+
+        serialized_pkg = spack.subprocess_context.PackageInstallContext(
+            self.pkg)
+
+        try:
+            # Forward sys.stdin when appropriate, to allow toggling verbosity
+            if self.forward_stdin and sys.stdin.isatty() and \
+                    hasattr(sys.stdin, 'fileno'):
+                input_fd = os.dup(sys.stdin.fileno())
+                input_multiprocess_fd = MultiProcessFd(input_fd)
+
+            self.process = multiprocessing.Process(
+                target=_setup_pkg_and_run,
+                args=(serialized_pkg, self.function, self.kwargs, child_pipe,
+                      input_multiprocess_fd, self.setup_env))
+            self.process.start()
+
+        except InstallError as e:
+            e.pkg = self.pkg
+            raise
+
+        finally:
+            # Close the input stream in the parent process
+            if input_multiprocess_fd is not None:
+                input_multiprocess_fd.close()
+
+            # Only the child writes to its end of the pipe.  Closing it here
+            # ensures the parent sees EOF if the child dies without replying
+            # and that children started later do not inherit it.
+            child_pipe.close()
+
+        self.parent_pipe = parent_pipe
+        return self
+
+    def fileno(self):
+        """File descriptor that becomes readable once the child is done."""
+        return self.parent_pipe.fileno()
+
+    def ready(self):
+        """Return ``True`` if the child has sent its result."""
+        return self.parent_pipe.poll()
+
+    def terminate(self):
+        """Forcibly stop the child process, if it is still running."""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+        self.join()
+
+    def join(self):
+        """Wait for the child process to exit and release the pipe."""
+        if self.process is not None:
+            self.process.join()
+        if self.parent_pipe is not None:
+            self.parent_pipe.close()
+
+    def complete(self):
+        """Wait for the child to finish and return its result.
+
+        Raises the child's ``StopPhase`` or ``ChildError``, if any.
+        """
+        try:
+            child_result = self.parent_pipe.recv()
+        except EOFError:
+            err = InstallError('Child process for {0} exited without a result'
+                               .format(self.pkg.name))
+            err.pkg = self.pkg
+            raise err
+        finally:
+            self.join()
+
+        # If returns a StopPhase, raise it
+        if isinstance(child_result, StopPhase):
+            # do not print
+            raise child_result
+
+        # let the caller know which package went wrong.
+        if isinstance(child_result, InstallError):
+            child_result.pkg = self.pkg
+
+        if isinstance(child_result, ChildError):
+            # If the child process raised an error, print its output here
+            # rather than waiting until the call to SpackError.die() in
+            # main(). This allows exception handling output to be logged from
+            # within Spack. see spack.main.SpackCommand.
+            child_result.print_context()
+            raise child_result
+
+        return child_result
+
+
 def start_build_process(pkg, function, kwargs):
     """Create a child process to do part of a spack build.
 
@@ -938,54 +1122,11 @@ def child_fun():
 
     For more information on `multiprocessing` child process creation
     mechanisms, see https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
-    """
-    parent_pipe, child_pipe = multiprocessing.Pipe()
-    input_multiprocess_fd = None
-
-    serialized_pkg = spack.subprocess_context.PackageInstallContext(pkg)
-
-    try:
-        # Forward sys.stdin when appropriate, to allow toggling verbosity
-        if sys.stdin.isatty() and hasattr(sys.stdin, 'fileno'):
-            input_fd = os.dup(sys.stdin.fileno())
-            input_multiprocess_fd = MultiProcessFd(input_fd)
-
-        p = multiprocessing.Process(
-            target=_setup_pkg_and_run,
-            args=(serialized_pkg, function, kwargs, child_pipe,
-                  input_multiprocess_fd))
-        p.start()
 
-    except InstallError as e:
-        e.pkg = pkg
-        raise
-
-    finally:
-        # Close the input stream in the parent process
-        if input_multiprocess_fd is not None:
-            input_multiprocess_fd.close()
-
-    child_result = parent_pipe.recv()
-    p.join()
-
-    # If returns a StopPhase, raise it
-    if isinstance(child_result, StopPhase):
-        # do not print
-        raise child_result
-
-    # let the caller know which package went wrong.
-    if isinstance(child_result, InstallError):
-        child_result.pkg = pkg
-
-    if isinstance(child_result, ChildError):
-        # If the child process raised an error, print its output here rather
-        # than waiting until the call to SpackError.die() in main(). This
-        # allows exception handling output to be logged from within Spack.
-        # see spack.main.SpackCommand.
-        child_result.print_context()
-        raise child_result
-
-    return child_result
+    Use :class:`BuildProcess` directly to run the child without waiting
+    for it to finish.
+    """
+    return BuildProcess(pkg, function, kwargs).start().complete()
 
 
 def get_package_context(traceback, context=3):
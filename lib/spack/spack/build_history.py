@@ -0,0 +1,206 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Resource usage of builds and the history of it kept by each install tree.
+
+Every build from source measures the wall time, CPU time, maximum resident
+set size and bytes written of each of its phases.  The measurements are
+saved with the installation (see ``PackageBase.times_log_path``) and
+appended to the build history of the install tree, which lives next to the
+database.  The history is what ``spack build-stats`` reports on, and what
+the installer estimates the build times of packages from.
+"""
+import json
+import os
+import sys
+import time
+
+import llnl.util.tty as tty
+from llnl.util.filesystem import mkdirp
+
+import spack.util.lock as lk
+import spack.util.spack_json as sjson
+import spack.version
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore
+
+#: Name of the build history file in the database directory
+history_file_name = 'build_history.jsonl'
+
+#: Measurements recorded for each build and each of its phases
+metrics = ('wall', 'cpu', 'max_rss', 'bytes_written')
+
+
+def _bytes_written():
+    """Bytes written to storage by this process and its reaped children, or
+    ``None`` if the platform does not account for them."""
+    try:
+        with open('/proc/self/io') as io:
+            for line in io:
+                if line.startswith('write_bytes:'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def resource_usage():
+    """Return a snapshot of the resources used so far by this process and
+    its reaped children.
+
+    Returns:
+        (dict): ``wall`` clock time and ``cpu`` time in seconds, ``max_rss``
+            of any single process and ``bytes_written``, in bytes.  Values
+            not available on the platform are ``None``.
+    """
+    usage = {'wall': time.time(), 'cpu': None, 'max_rss': None,
+             'bytes_written': _bytes_written()}
+    if resource is not None:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        usage['cpu'] = sum((own.ru_utime, own.ru_stime,
+                            children.ru_utime, children.ru_stime))
+        # ru_maxrss is in kilobytes except on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        usage['max_rss'] = max(own.ru_maxrss, children.ru_maxrss) * scale
+    return usage
+
+
+def usage_since(start):
+    """Return the resources used since the ``start`` snapshot.
+
+    The maximum resident set size is the largest one so far, since the
+    platform does not reset it.
+
+    Args:
+        start (dict): snapshot returned by ``resource_usage()``
+
+    Returns:
+        (dict): resources used, keyed on metric
+    """
+    end = resource_usage()
+    usage = {'max_rss': end['max_rss']}
+    for metric in ('wall', 'cpu', 'bytes_written'):
+        if start[metric] is None or end[metric] is None:
+            usage[metric] = None
+        else:
+            usage[metric] = end[metric] - start[metric]
+    return usage
+
+
+def record_for(spec, times):
+    """Return the build history record of an installation.
+
+    Args:
+        spec (Spec): the concrete spec that was installed
+        times (dict): contents of the installation's times log
+
+    Returns:
+        (dict): record identifying the build along with its measurements
+    """
+    record = {
+        'hash': spec.dag_hash(),
+        'name': spec.name,
+        'version': str(spec.version),
+        'compiler': str(spec.compiler),
+        'arch': str(spec.architecture),
+        'time': time.time(),
+    }
+    record.update(times)
+    return record
+
+
+class BuildHistory(object):
+    """Append-only history of the builds performed in an install tree.
+
+    Records are stored as one JSON object per line so that concurrent
+    Spack instances only ever append to the file.
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root (str): directory holding the history, normally the database
+                directory of the install tree
+        """
+        self.root = root
+        self.path = os.path.join(root, history_file_name)
+        self._lock = None
+
+    @property
+    def lock(self):
+        if self._lock is None:
+            mkdirp(self.root)
+            self._lock = lk.Lock(self.path + '.lock', desc='build history')
+        return self._lock
+
+    def add(self, spec, times):
+        """Append the build of a spec to the history.
+
+        Args:
+            spec (Spec): the concrete spec that was built
+            times (dict): contents of the installation's times log
+        """
+        line = json.dumps(record_for(spec, times), sort_keys=True) + '\n'
+        with lk.WriteTransaction(self.lock):
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def records(self, names=None):
+        """Return the recorded builds, oldest first.
+
+        Args:
+            names (container or None): only return records of packages with
+                these names, or all records if ``None``
+
+        Returns:
+            (list): the matching build records
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with lk.ReadTransaction(self.lock):
+            with open(self.path) as f:
+                for n, line in enumerate(f, 1):
+                    try:
+                        record = sjson.load(line)
+                        name = record['name']
+                    except (ValueError, KeyError, TypeError):
+                        tty.debug('Skipping malformed build history record '
+                                  'at {0}:{1}'.format(self.path, n))
+                        continue
+                    if names is None or name in names:
+                        records.append(record)
+        return records
+
+    def build_times(self, names):
+        """Return the latest build times recorded for the packages.
+
+        Args:
+            names (container): names of the packages of interest
+
+        Returns:
+            (dict): build time, in seconds, keyed on package name and
+                version, with the ``None`` version for the time of the
+                highest version of the package
+        """
+        times, highest = {}, {}
+        for record in self.records(names):
+            try:
+                name = record['name']
+                version = spack.version.Version(record['version'])
+                build_time = float(record['total'])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            times[(name, version)] = build_time
+            if name not in highest or highest[name] <= version:
+                highest[name] = version
+                times[(name, None)] = build_time
+        return times
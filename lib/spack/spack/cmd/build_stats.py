@@ -0,0 +1,141 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from __future__ import division, print_function
+
+import collections
+
+import llnl.util.tty as tty
+from llnl.util.tty.colify import colify_table
+
+import spack.build_history
+import spack.store
+
+description = "show the time and resources used by past builds"
+section = "build"
+level = "long"
+
+#: Extra columns identifying the builds of each group
+group_columns = {
+    'package': (),
+    'version': ('version',),
+    'compiler': ('compiler',),
+}
+
+
+def setup_parser(subparser):
+    subparser.add_argument(
+        '-g', '--group-by', choices=sorted(group_columns), default='package',
+        help='summarize builds per package (default), package version, '
+        'or package compiler')
+    subparser.add_argument(
+        '-s', '--sort', choices=spack.build_history.metrics, default='wall',
+        help='sort by the mean of this measurement, largest first '
+        '(default: wall)')
+    subparser.add_argument(
+        '-n', '--limit', type=int, default=None,
+        help='only show the first LIMIT rows')
+    subparser.add_argument(
+        '-p', '--phases', action='store_true',
+        help='summarize each build phase separately')
+    subparser.add_argument(
+        'packages', nargs='*', help='only show builds of these packages')
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _maximum(values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def _seconds(value):
+    if value is None:
+        return '-'
+    m, s = divmod(value, 60)
+    h, m = divmod(m, 60)
+    if h:
+        return '%dh %dm' % (h, m)
+    if m:
+        return '%dm %ds' % (m, s)
+    return '%.1fs' % s
+
+
+def _bytes(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if value < 1024:
+            return '%.1f %s' % (value, unit)
+        value /= 1024
+    return '%.1f TiB' % value
+
+
+def summarize(records, group_by='package', phases=False):
+    """Summarize build history records.
+
+    Args:
+        records (list): build history records
+        group_by (str): one of ``group_columns``
+        phases (bool): summarize each phase separately
+
+    Returns:
+        (list): one ``(key, summary)`` tuple per group, where ``key`` is a
+            tuple of the package name, the ``group_by`` columns and the phase
+            name (if ``phases``), and ``summary`` maps ``builds`` to the
+            number of builds and each metric to its mean, with ``max_wall``
+            holding the longest wall time
+    """
+    groups = collections.OrderedDict()
+    for record in records:
+        key = (record['name'],) + tuple(
+            record.get(column) for column in group_columns[group_by])
+        if phases:
+            for phase in record.get('phases', []):
+                groups.setdefault(key + (phase['name'],), []).append(phase)
+        else:
+            groups.setdefault(key, []).append(record)
+
+    summaries = []
+    for key, builds in groups.items():
+        summary = {'builds': len(builds)}
+        for metric in spack.build_history.metrics:
+            summary[metric] = _mean(b.get(metric) for b in builds)
+        summary['max_wall'] = _maximum(b.get('wall') for b in builds)
+        summaries.append((key, summary))
+    return summaries
+
+
+def build_stats(parser, args):
+    records = spack.store.history.records(set(args.packages) or None)
+    if not records:
+        tty.msg('No builds recorded in {0}'.format(spack.store.history.path))
+        return
+
+    summaries = summarize(records, args.group_by, args.phases)
+    summaries.sort(key=lambda s: s[1][args.sort] or 0, reverse=True)
+    if args.limit is not None:
+        summaries = summaries[:args.limit]
+
+    header = ['PACKAGE'] + [
+        c.upper() for c in group_columns[args.group_by]]
+    if args.phases:
+        header.append('PHASE')
+    header += ['BUILDS', 'WALL', 'MAX WALL', 'CPU', 'MAX RSS', 'WRITTEN']
+
+    table = [header]
+    for key, summary in summaries:
+        table.append(list(key) + [
+            summary['builds'],
+            _seconds(summary['wall']),
+            _seconds(summary['max_wall']),
+            _seconds(summary['cpu']),
+            _bytes(summary['max_rss']),
+            _bytes(summary['bytes_written']),
+        ])
+    colify_table(table)
@@ -479,8 +479,10 @@ def installtarball(args):
     matches = match_downloaded_specs(pkgs, args.multiple, args.force,
                                      args.otherarch)
 
-    for match in matches:
-        install_tarball(match, args)
+    # Write the database records of all the packages at once
+    with spack.store.db.batched_writes():
+        for match in matches:
+            install_tarball(match, args)
 
 
 def install_tarball(spec, args):
@@ -0,0 +1,45 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import llnl.util.tty as tty
+
+import spack.database_sqlite
+import spack.store
+
+description = "move Spack's package database between backends"
+section = "admin"
+level = "long"
+
+
+def setup_parser(subparser):
+    sp = subparser.add_subparsers(
+        metavar='SUBCOMMAND', dest='database_command')
+    sp.add_parser('import', help="replace the records of the SQLite "
+                  "database with those in index.json")
+    sp.add_parser('export', help="write the records of the SQLite "
+                  "database to index.json")
+
+
+def import_index(db):
+    db.import_index()
+    tty.msg('Imported the records of {0}'.format(db._index_path))
+
+
+def export_index(db):
+    db.export_index()
+    tty.msg('Exported the records to {0}'.format(db._index_path))
+
+
+def database(parser, args):
+    db = spack.store.store.db
+    if not isinstance(db, spack.database_sqlite.SQLiteDatabase):
+        tty.die('The package database is not kept in SQLite',
+                'Set config:database_backend to sqlite to use it')
+
+    action = {
+        'import': import_index,
+        'export': export_index,
+    }
+    action[args.database_command](db)
@@ -74,6 +74,11 @@ def create_db_tarball(args):
     wd = os.path.dirname(str(spack.store.root))
     with working_dir(wd):
         files = [spack.store.db._index_path]
+        if os.path.exists(spack.store.db._journal_path):
+            files.append(spack.store.db._journal_path)
+        sqlite_path = getattr(spack.store.db, '_sqlite_path', None)
+        if sqlite_path and os.path.exists(sqlite_path):
+            files.append(sqlite_path)
         files += glob('%s/*/*/*/.spack/spec.yaml' % base)
         files = [os.path.relpath(f) for f in files]
 
@@ -34,6 +34,8 @@ def update_kwargs_from_args(args, kwargs):
 
     kwargs.update({
         'fail_fast': args.fail_fast,
+        'concurrent_builds': args.concurrent_builds,
+        'prefetch_jobs': args.prefetch_jobs,
         'keep_prefix': args.keep_prefix,
         'keep_stage': args.keep_stage,
         'restage': not args.dont_restage,
@@ -85,6 +87,15 @@ def setup_parser(subparser):
     subparser.add_argument(
         '--fail-fast', action='store_true',
         help="stop all builds if any build fails (default is best effort)")
+    subparser.add_argument(
+        '--concurrent-builds', type=int, default=1, metavar='N',
+        dest='concurrent_builds',
+        help="build up to N packages from source at the same time")
+    subparser.add_argument(
+        '--prefetch-jobs', type=int, default=0, metavar='N',
+        dest='prefetch_jobs',
+        help="fetch the sources of up to N packages in the background "
+        "while others are built")
     subparser.add_argument(
         '--keep-prefix', action='store_true',
         help="don't remove the install prefix if installation fails")
@@ -88,9 +88,9 @@ def match(p, f):
                 if f.match(p):
                     return True
 
-                pkg = spack.repo.get(p)
-                if pkg.__doc__:
-                    return f.match(pkg.__doc__)
+                pkg = spack.repo.path.package_metadata(p)
+                if pkg.description:
+                    return f.match(pkg.description)
                 return False
         else:
             def match(p, f):
@@ -137,7 +137,7 @@ def get_dependencies(pkg):
 @formatter
 def version_json(pkg_names, out):
     """Print all packages with their latest versions."""
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    pkgs = [spack.repo.path.package_metadata(name) for name in pkg_names]
 
     out.write('[\n')
 
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import spack.cmd.common.arguments as arguments
 import spack.store
 
 description = "rebuild Spack's package database"
@@ -10,5 +11,13 @@
 level = "long"
 
 
+def setup_parser(subparser):
+    subparser.add_argument(
+        '-i', '--incremental', action='store_true',
+        help="only read the spec files modified since the database "
+        "was last written")
+    arguments.add_common_arguments(subparser, ['jobs'])
+
+
 def reindex(parser, args):
-    spack.store.store.reindex()
+    spack.store.store.reindex(incremental=args.incremental)
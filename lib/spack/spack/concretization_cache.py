@@ -0,0 +1,309 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Cache of the results of concretization.
+
+Concretizing the same abstract specs with the same configuration, the
+same packages and the same compilers always gives the same concrete
+specs, so the result of each concretization is kept in the misc cache.
+
+Entries are stored under a key that is a digest of everything that is
+cheap to check before concretizing: the abstract specs, the configuration
+sections the concretizers read, the compilers, the host architecture,
+the repositories and the modules of Spack that implement concretization.
+Each entry also records a digest of the files of every package that was
+(or could have been) part of the result, and the providers of every
+virtual package that could have been, and it is used only if none of them
+changed since it was written.
+
+The cache is used if ``config:concretization_cache`` is true, which is not
+the default.
+"""
+import contextlib
+import hashlib
+import json
+import os
+
+import llnl.util.tty as tty
+
+import spack
+import spack.architecture
+import spack.caches
+import spack.compilers
+import spack.concretize
+import spack.config
+import spack.environment
+import spack.error
+import spack.hash_types as ht
+import spack.package
+import spack.package_metadata
+import spack.paths
+import spack.repo
+import spack.spec
+import spack.util.file_cache
+import spack.util.spack_json as sjson
+
+#: Directory of the misc cache where results are stored
+cache_dir = 'concretization'
+
+#: Files and directories of Python modules whose changes may change the
+#: result of concretization
+core_modules = spack.package_metadata.core_modules + [
+    os.path.join(spack.paths.module_path, f) for f in (
+        'architecture.py', 'concretize.py', 'package_prefs.py', 'spec.py',
+        'variant.py', 'version.py', 'compilers', 'operating_systems',
+        'platforms', 'solver', os.path.join('solver', 'concretize.lp'),
+        os.path.join('solver', 'display.lp'))
+]
+
+#: Whether the cache is disabled, regardless of the configuration
+_disabled = False
+
+
+@contextlib.contextmanager
+def disabled():
+    """Context manager to concretize without using the cache."""
+    global _disabled
+    saved, _disabled = _disabled, True
+    try:
+        yield
+    finally:
+        _disabled = saved
+
+
+def enabled():
+    """Whether concretization results are read from and stored in the
+    cache."""
+    return (not _disabled and
+            spack.config.get('config:concretization_cache', False))
+
+
+def _repositories():
+    """Data identifying the repositories in use, or None if they are not
+    all on disk."""
+    repos = getattr(spack.repo.path, 'repos', None)
+    if repos is None or not all(isinstance(r, spack.repo.Repo)
+                                for r in repos):
+        return None
+
+    result = []
+    for repo in repos:
+        names = '\n'.join(sorted(repo.all_package_names()))
+        result.append([repo.namespace, repo.root,
+                       hashlib.sha1(names.encode('utf-8')).hexdigest()])
+    return result
+
+
+def cache_key(abstract_specs, tests=False, together=False):
+    """Key of the cache entry for the concretization of some specs.
+
+    Args:
+        abstract_specs (list): abstract specs to be concretized
+        tests (bool or list): same as the argument of
+            ``Spec.concretize()``
+        together (bool): whether the specs are concretized together
+
+    Returns:
+        (str): the key, or None if the result cannot be cached
+    """
+    if not enabled():
+        return None
+
+    repositories = _repositories()
+    if repositories is None:
+        return None
+
+    install_missing_compilers = spack.config.get(
+        'config:install_missing_compilers', False)
+    check_for_compiler_existence = (
+        spack.concretize.Concretizer.check_for_compiler_existence)
+    if check_for_compiler_existence is None:
+        check_for_compiler_existence = not install_missing_compilers
+
+    env = spack.environment.get_env(None, None)
+    develop = [env.path, env.dev_specs] if env and env.dev_specs else None
+
+    data = {
+        'specs': [s.to_dict() for s in abstract_specs],
+        'tests': sorted(tests) if isinstance(tests, (list, tuple)) else tests,
+        'together': together,
+        'concretizer': spack.config.get('config:concretizer'),
+        'install_missing_compilers': install_missing_compilers,
+        'check_for_compiler_existence': check_for_compiler_existence,
+        'packages': spack.config.get('packages'),
+        'compilers': spack.compilers.all_compilers_config(),
+        'arch': str(spack.architecture.default_arch()),
+        'repos': repositories,
+        'develop': develop,
+        'core': spack.package_metadata.core_mtime(core_modules),
+        'spack': spack.spack_version,
+    }
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _entry_key(key):
+    return os.path.join(cache_dir, key + '.json')
+
+
+def package_digest(fullname):
+    """Digest of the files in the directory of a package, or None if the
+    package is not in the repositories anymore."""
+    namespace, _, name = fullname.rpartition('.')
+    try:
+        repo = spack.repo.path.get_repo(namespace)
+    except spack.repo.UnknownNamespaceError:
+        return None
+
+    pkg_dir = repo.dirname_for_package_name(name)
+    if not os.path.isdir(pkg_dir):
+        return None
+
+    sha = hashlib.sha1()
+    for root, dirs, files in os.walk(pkg_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for filename in sorted(files):
+            if filename.endswith('.pyc'):
+                continue
+            path = os.path.join(root, filename)
+            sha.update(os.path.relpath(path, pkg_dir).encode('utf-8'))
+            with open(path, 'rb') as f:
+                sha.update(f.read())
+    return sha.hexdigest()
+
+
+def _packages_used(abstract_specs, concrete_specs):
+    """Packages whose changes may change the result of a concretization.
+
+    These are the packages in the concrete specs, every package that could
+    have been a dependency of the abstract specs and the packages they
+    inherit from, and the virtual packages that could have been provided
+    to them.
+
+    Returns:
+        (tuple): set of the full names of the packages and set of the names
+            of the virtual packages
+    """
+    virtuals = set()
+    names = set(s.name for spec in abstract_specs for s in spec.traverse())
+    names.update(spack.package.possible_dependencies(
+        *abstract_specs, virtuals=virtuals))
+    for spec in concrete_specs:
+        names.update(s.name for s in spec.traverse())
+
+    fullnames = set()
+    for name in names:
+        if not name:
+            continue
+        if spack.repo.path.is_virtual(name):
+            virtuals.add(name)
+            continue
+        pkg_class = spack.repo.path.get_pkg_class(name)
+        fullnames.update(
+            cls.fullname for cls in pkg_class.__mro__
+            if isinstance(cls, spack.package.PackageMeta) and
+            cls.__module__.startswith(spack.repo.repo_namespace + '.'))
+    return fullnames, virtuals
+
+
+def virtual_providers(name):
+    """Sorted list of the providers of a virtual package, each with the
+    virtual spec it provides, from the provider indexes of the repositories.
+    """
+    result = set()
+    for repo in spack.repo.path.repos:
+        providers = repo.provider_index.providers.get(name, {})
+        result.update('{0} {1}'.format(vspec, p)
+                      for vspec, specs in providers.items() for p in specs)
+    return sorted(result)
+
+
+def _spec_dict(spec):
+    """Dictionary of a concrete spec and its build dependencies.
+
+    Like the specs in lockfiles of environments, nodes do not have a full
+    hash, since computing it needs the sources of each package.
+    """
+    nodes = []
+    for s in spec.traverse(order='pre', deptype=ht.build_hash.deptype):
+        node = s.to_node_dict(hash=ht.build_hash)
+        node[s.name]['hash'] = s.dag_hash()
+        nodes.append(node)
+    return {'spec': nodes}
+
+
+def get(key):
+    """Return the concrete specs stored in the cache for a key.
+
+    Returns:
+        (list): the concrete specs, in the order they were stored, or None
+            if there is no entry for the key or the packages it was
+            computed from changed
+    """
+    cache = spack.caches.misc_cache
+    entry_key = _entry_key(key)
+    if not cache.init_entry(entry_key):
+        return None
+
+    try:
+        with cache.read_transaction(entry_key) as f:
+            data = sjson.load(f)
+        packages, providers = data['packages'], data['providers']
+        specs = data['specs']
+    except (IOError, OSError, ValueError, KeyError, TypeError) as e:
+        tty.debug('[CONCRETIZATION CACHE] cannot read {0}: {1}'.format(
+            entry_key, str(e)))
+        return None
+
+    for fullname, digest in packages.items():
+        if package_digest(fullname) != digest:
+            tty.debug('[CONCRETIZATION CACHE] {0} changed'.format(fullname))
+            return None
+
+    for name, expected in providers.items():
+        if virtual_providers(name) != expected:
+            tty.debug('[CONCRETIZATION CACHE] providers of {0} changed'
+                      .format(name))
+            return None
+
+    concrete_specs = [spack.spec.Spec.from_dict(d) for d in specs]
+    for spec in concrete_specs:
+        spec._mark_concrete()
+    return concrete_specs
+
+
+def put(key, abstract_specs, concrete_specs):
+    """Store the result of a concretization in the cache.
+
+    Args:
+        key (str): key returned by ``cache_key()``
+        abstract_specs (list): specs that were concretized
+        concrete_specs (list): the corresponding concrete specs
+    """
+    try:
+        fullnames, virtuals = _packages_used(abstract_specs, concrete_specs)
+        packages = dict(
+            (fullname, package_digest(fullname)) for fullname in fullnames)
+        providers = dict((name, virtual_providers(name)) for name in virtuals)
+    except spack.error.SpackError as e:
+        tty.debug('[CONCRETIZATION CACHE] not storing {0}: {1}'.format(
+            key, str(e)))
+        return
+
+    data = {
+        'packages': packages,
+        'providers': providers,
+        'specs': [_spec_dict(s) for s in concrete_specs],
+    }
+
+    cache = spack.caches.misc_cache
+    entry_key = _entry_key(key)
+    try:
+        cache.init_entry(entry_key)
+        with cache.write_transaction(entry_key) as (old, new):
+            sjson.dump(data, new)
+    except (IOError, OSError, spack.util.file_cache.CacheError) as e:
+        tty.debug('[CONCRETIZATION CACHE] cannot write {0}: {1}'.format(
+            entry_key, str(e)))
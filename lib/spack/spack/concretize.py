@@ -724,6 +724,8 @@ def concretize_specs_together(*abstract_specs):
     Returns:
         List of concretized specs
     """
+    import spack.concretization_cache
+
     def make_concretization_repository(abstract_specs):
         """Returns the path to a temporary repository created to contain
         a fake package that depends on all of the abstract specs.
@@ -752,17 +754,33 @@ def make_concretization_repository(abstract_specs):
         return spack.repo.Repo(repo_path)
 
     abstract_specs = [spack.spec.Spec(s) for s in abstract_specs]
+
+    key = spack.concretization_cache.cache_key(abstract_specs, together=True)
+    if key:
+        concrete_specs = spack.concretization_cache.get(key)
+        if concrete_specs:
+            if spack.config.get('config:concretizer') != 'clingo':
+                for spec in concrete_specs:
+                    spack.spec.Spec.ensure_no_deprecated(spec)
+            return concrete_specs
+
     concretization_repository = make_concretization_repository(abstract_specs)
 
+    # The helper package is different every time, so its concretization
+    # is not worth caching on its own
     with spack.repo.additional_repository(concretization_repository):
-        # Spec from a helper package that depends on all the abstract_specs
-        concretization_root = spack.spec.Spec('concretizationroot')
-        concretization_root.concretize()
+        with spack.concretization_cache.disabled():
+            # Spec from a helper package that depends on all the abstract_specs
+            concretization_root = spack.spec.Spec('concretizationroot')
+            concretization_root.concretize()
         # Retrieve the direct dependencies
         concrete_specs = [
             concretization_root[spec.name].copy() for spec in abstract_specs
         ]
 
+    if key:
+        spack.concretization_cache.put(key, abstract_specs, concrete_specs)
+
     return concrete_specs
 
 
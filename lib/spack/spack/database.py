@@ -20,8 +20,11 @@
 filesystem.
 """
 
+import bisect
+import collections
 import contextlib
 import datetime
+import json
 import os
 import six
 import socket
@@ -39,6 +42,7 @@
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
 
+import spack.dependency as dp
 import spack.repo
 import spack.spec
 import spack.store
@@ -65,7 +69,7 @@ def nullcontext(*args, **kwargs):
 # DB version.  This is stuck in the DB file to track changes in format.
 # Increment by one when the database format changes.
 # Versions before 5 were not integers.
-_db_version = Version('5')
+_db_version = Version('6')
 
 # For any version combinations here, skip reindex when upgrading.
 # Reindexing can take considerable time and is not always necessary.
@@ -76,6 +80,13 @@ def nullcontext(*args, **kwargs):
     # fields.  So, skip the reindex for this transition. The new
     # version is saved to disk the first time the DB is written.
     (Version('0.9.3'), Version('5')),
+    # Version 6 indices may name a journal of changes made on top of them
+    # (see Database._read_journal()).  Older versions of Spack reject them
+    # rather than missing the changes, and losing them when they rewrite
+    # the index.  Older indices are read as they are, and rewritten with a
+    # journal the first time the DB is written.
+    (Version('0.9.3'), Version('6')),
+    (Version('5'), Version('6')),
 ]
 
 # Default timeout for spack database locks in seconds or None (no timeout).
@@ -92,6 +103,11 @@ def nullcontext(*args, **kwargs):
 # ensure a failed install is properly tracked).
 _pkg_lock_timeout = None
 
+# Changes to the database are appended to a journal next to the index, which
+# is only rewritten once the journal grows larger than this fraction of it.
+# Readers then only need to read the changes they have not seen yet.
+_journal_compaction_ratio = 0.5
+
 # Types of dependencies tracked by the database
 _tracked_deps = ('link', 'run')
 
@@ -179,6 +195,9 @@ class InstallRecord(object):
         installation_time (time, optional): time of the installation
     """
 
+    #: Whether the spec of the record has been constructed
+    spec_is_read = True
+
     def __init__(
             self,
             spec,
@@ -197,6 +216,11 @@ def __init__(
         self.installation_time = installation_time or _now()
         self.deprecated_for = deprecated_for
 
+    @property
+    def name(self):
+        """Name of the package of the spec."""
+        return self.spec.name
+
     def install_type_matches(self, installed):
         installed = InstallStatuses.canonicalize(installed)
         if self.installed:
@@ -219,8 +243,10 @@ def to_dict(self, include_fields=default_install_record_fields):
 
         return rec_dict
 
-    @classmethod
-    def from_dict(cls, spec, dictionary):
+    @staticmethod
+    def _fields(dictionary):
+        """Return the arguments of the constructor, other than the spec, for
+        an install record in JSON form."""
         d = dict(dictionary.items())
         d.pop('spec', None)
 
@@ -231,7 +257,155 @@ def from_dict(cls, spec, dictionary):
         if 'installed' not in d:
             d['installed'] = False
 
-        return InstallRecord(spec, **d)
+        return d
+
+    @classmethod
+    def from_dict(cls, spec, dictionary):
+        return InstallRecord(spec, **InstallRecord._fields(dictionary))
+
+
+class LazyInstallRecord(InstallRecord):
+    """Install record read from a database file, whose spec is only
+    constructed when it is first used.
+
+    Until then, the record keeps the spec in the node dict form it has in
+    the file.  The specs of its dependencies are those of the records with
+    their hashes among the records it was read with, or in the upstreams of
+    the database, so specs stay shared among records as when they are all
+    constructed at once.
+
+    Args:
+        hash_key (str): DAG hash of the spec
+        dictionary (dict): install record in JSON form
+        database (Database): database the record is read into
+        data (dict): records the record was read with, keyed on DAG hash
+    """
+
+    def __init__(self, hash_key, dictionary, database, data):
+        self.hash_key = hash_key
+        self._spec_dict = dictionary['spec']
+        self._database = database
+        self._data = data
+        super(LazyInstallRecord, self).__init__(
+            None, **InstallRecord._fields(dictionary))
+
+    @property
+    def spec(self):
+        if self._spec is None:
+            self._spec = self._database._read_spec_of_record(self)
+        return self._spec
+
+    @spec.setter
+    def spec(self, spec):
+        self._spec = spec
+
+    @property
+    def name(self):
+        return next(iter(self._spec_dict))
+
+    @property
+    def spec_is_read(self):
+        return self._spec is not None
+
+    def to_dict(self, include_fields=default_install_record_fields):
+        if self.spec_is_read or 'spec' not in include_fields:
+            return super(LazyInstallRecord, self).to_dict(include_fields)
+
+        # The spec is written as it was read
+        rec_dict = super(LazyInstallRecord, self).to_dict(
+            [f for f in include_fields if f != 'spec'])
+        rec_dict['spec'] = self._spec_dict
+        return rec_dict
+
+
+class InstallRecordDict(dict):
+    """Install records keyed on DAG hash, indexed by package name.
+
+    The hashes of the records of each package, and the sorted list of all
+    hashes used to look up hash prefixes, are kept up to date as records
+    are added and removed.  ``changes`` counts the records set and deleted,
+    for other indices to tell whether they are still up to date.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(InstallRecordDict, self).__init__()
+        self._by_name = {}
+        self._sorted_hashes = None
+        self.changes = 0
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __setitem__(self, hash_key, record):
+        old = self.get(hash_key)
+        if old is not None:
+            self._unindex(hash_key, old)
+        super(InstallRecordDict, self).__setitem__(hash_key, record)
+        self._by_name.setdefault(record.name, set()).add(hash_key)
+        self.changes += 1
+        if old is None:
+            self._sorted_hashes = None
+
+    def __delitem__(self, hash_key):
+        record = self[hash_key]
+        super(InstallRecordDict, self).__delitem__(hash_key)
+        self._unindex(hash_key, record)
+        self._sorted_hashes = None
+        self.changes += 1
+
+    def _unindex(self, hash_key, record):
+        hashes = self._by_name[record.name]
+        hashes.discard(hash_key)
+        if not hashes:
+            del self._by_name[record.name]
+
+    def pop(self, hash_key, *default):
+        if hash_key in self:
+            record = self[hash_key]
+            del self[hash_key]
+            return record
+        if default:
+            return default[0]
+        raise KeyError(hash_key)
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): no install records')
+        hash_key = next(iter(self))
+        return hash_key, self.pop(hash_key)
+
+    def setdefault(self, hash_key, default=None):
+        if hash_key not in self:
+            self[hash_key] = default
+        return self[hash_key]
+
+    def update(self, *args, **kwargs):
+        for hash_key, record in dict(*args, **kwargs).items():
+            self[hash_key] = record
+
+    def clear(self):
+        super(InstallRecordDict, self).clear()
+        self._by_name.clear()
+        self._sorted_hashes = None
+        self.changes += 1
+
+    def items_with_name(self, name):
+        """Return the hashes and records of the package with this name."""
+        return [(h, self[h]) for h in self._by_name.get(name, ())]
+
+    def with_hash_prefix(self, prefix):
+        """Return the records whose DAG hash starts with the prefix."""
+        if self._sorted_hashes is None:
+            self._sorted_hashes = sorted(self)
+
+        records = []
+        i = bisect.bisect_left(self._sorted_hashes, prefix)
+        while (i < len(self._sorted_hashes) and
+               self._sorted_hashes[i].startswith(prefix)):
+            records.append(self[self._sorted_hashes[i]])
+            i += 1
+        return records
 
 
 class ForbiddenLockError(SpackError):
@@ -331,6 +505,7 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
         # Set up layout of database files within the db dir
         self._index_path = os.path.join(self._db_dir, 'index.json')
         self._verifier_path = os.path.join(self._db_dir, 'index_verifier')
+        self._journal_path = os.path.join(self._db_dir, 'index_journal')
         self._lock_path = os.path.join(self._db_dir, 'lock')
 
         # This is for other classes to use to lock prefix directories.
@@ -373,7 +548,10 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
             self.lock = lk.Lock(self._lock_path,
                                 default_timeout=self.db_lock_timeout,
                                 desc='database')
-        self._data = {}
+        self._data = InstallRecordDict()
+
+        # Dependents of the records, here and in upstream databases
+        self._dependents_index = None
 
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
 
@@ -394,15 +572,102 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
 
         self._record_fields = record_fields
 
+        # Records added within batched_writes() that are yet to be written
+        # to the index file, keyed on DAG hash, and the nesting depth of
+        # batched_writes()
+        self._pending = collections.OrderedDict()
+        self._batch_depth = 0
+
+        # Keys of the records that were pending when the current write
+        # transaction started, which are kept if the transaction fails
+        self._pending_before_write = set()
+
+        # Keys of the records changed since the last write, the identifier
+        # of the journal that goes with the index file that was read, and
+        # how much of the journal has been read
+        self._dirty = set()
+        self._journal_id = None
+        self._journal_offset = 0
+
+        # Whether the next write has to rewrite the whole index file
+        self._rewrite_index = False
+
+    @property
+    def _data(self):
+        """Install records keyed on DAG hash (an ``InstallRecordDict``)."""
+        return self._records
+
+    @_data.setter
+    def _data(self, records):
+        if not isinstance(records, InstallRecordDict):
+            records = InstallRecordDict(records)
+        self._records = records
+
     def write_transaction(self):
         """Get a write lock context manager for use in a `with` block."""
         return self._write_transaction_impl(
-            self.lock, acquire=self._read, release=self._write)
+            self.lock, acquire=self._start_write, release=self._write)
+
+    def _start_write(self):
+        """Read the database at the start of a write transaction."""
+        self._pending_before_write = set(self._pending)
+        self._read()
 
     def read_transaction(self):
         """Get a read lock context manager for use in a `with` block."""
         return self._read_transaction_impl(self.lock, acquire=self._read)
 
+    @contextlib.contextmanager
+    def batched_writes(self):
+        """Context manager deferring the writes of added records.
+
+        Within the context, ``add()`` updates the in-memory database and
+        queries see the new records, but they are only written to the index
+        file by ``flush()``, the next write transaction that succeeds, or at
+        the end of the context (even if an exception was raised).  The index
+        is then rewritten once for many records rather than once per record.
+
+        Since each write replaces the index file atomically, a crash loses
+        at most the records that were not flushed yet.  Their installation
+        prefixes are not in the database and are either reinstalled or
+        recovered by ``spack reindex``.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """Write records added within ``batched_writes()`` to the index."""
+        if self._pending:
+            tty.debug('Writing {0} pending records to the database'
+                      .format(len(self._pending)))
+            with self.write_transaction():
+                pass
+
+    def is_pending(self, spec):
+        """Return ``True`` if the record of the spec was added within
+        ``batched_writes()`` but not written to the index yet."""
+        return spec.dag_hash() in self._pending
+
+    def _drop_pending_of_failed_write(self):
+        """Forget the records added within a write transaction that failed,
+        keeping those that were pending before it started."""
+        for key in list(self._pending):
+            if key not in self._pending_before_write:
+                del self._pending[key]
+
+    def _replay_pending(self):
+        """Add the records that are yet to be written again after reading
+        the index file."""
+        for spec, directory_layout, explicit, installation_time in \
+                list(self._pending.values()):
+            self._add(spec, directory_layout, explicit=explicit,
+                      installation_time=installation_time)
+
     def _failed_spec_path(self, spec):
         """Return the path to the spec's failure file, which may not exist."""
         if not spec.concrete:
@@ -627,26 +892,57 @@ def _write_to_file(self, stream):
             }
         }
 
+        # Identifies the journal of changes made on top of this index
+        if self._journal_id:
+            database['database']['journal'] = self._journal_id
+
         try:
             sjson.dump(database, stream)
         except (TypeError, ValueError) as e:
             raise sjson.SpackJSONError("error writing JSON database:", str(e))
 
-    def _read_spec_from_dict(self, hash_key, installs):
-        """Recursively construct a spec from a hash in a YAML database.
+    def _read_spec_of_record(self, record):
+        """Construct the spec of a lazily read install record.
+
+        The specs of its dependencies are constructed first, if they have
+        not been yet.  The data of the node is shared with the specs of the
+        same node read before in the process, from this or other databases,
+        environment lockfiles or build cache indices (see
+        ``Spec.from_interned_node_dict()``).
 
         Does not do any locking.
         """
-        spec_dict = installs[hash_key]['spec']
+        hash_key = record.hash_key
+        spec_dict = record._spec_dict
+        try:
+            # Install records don't include hash with spec, so we add it in
+            # here to ensure it is read properly.
+            for name in spec_dict:
+                spec_dict[name]['hash'] = hash_key
+
+            dependencies = self._read_dependencies(
+                hash_key, spec_dict, record._data)
+            spec = spack.spec.Spec.from_interned_node_dict(
+                spec_dict, dependencies)
+            spec._mark_concrete()
+        except (MissingDependenciesError, CorruptDatabaseError):
+            raise
+        except Exception as e:
+            msg = ("Invalid record in Spack database: "
+                   "hash: %s, cause: %s: %s")
+            msg %= (hash_key, type(e).__name__, str(e))
+            raise CorruptDatabaseError(msg, self._index_path)
+        return spec
 
-        # Install records don't include hash with spec, so we add it in here
-        # to ensure it is read properly.
-        for name in spec_dict:
-            spec_dict[name]['hash'] = hash_key
+    def _read_all_specs(self):
+        """Construct the specs of all the lazily read records, here and in
+        upstream databases.
 
-        # Build spec from dict first.
-        spec = spack.spec.Spec.from_node_dict(spec_dict)
-        return spec
+        Does not do any locking.
+        """
+        for db in [self] + self.upstream_dbs:
+            for rec in db._data.values():
+                rec.spec
 
     def db_for_spec_hash(self, hash_key):
         with self.read_transaction():
@@ -669,13 +965,13 @@ def query_by_spec_hash(self, hash_key, data=None):
                 return True, db._data[hash_key]
         return False, None
 
-    def _assign_dependencies(self, hash_key, installs, data):
-        # Add dependencies from other records in the install DB to
-        # form a full spec.
-        spec = data[hash_key].spec
-        spec_dict = installs[hash_key]['spec']
-        if 'dependencies' in spec_dict[spec.name]:
-            yaml_deps = spec_dict[spec.name]['dependencies']
+    def _read_dependencies(self, hash_key, spec_dict, data):
+        """Return ``(spec, deptypes)`` tuples for the dependencies of a spec
+        in node dict form, from other records in the install DB."""
+        dependencies = []
+        name = next(iter(spec_dict))
+        if 'dependencies' in spec_dict[name]:
+            yaml_deps = spec_dict[name]['dependencies']
             for dname, dhash, dtypes in spack.spec.Spec.read_yaml_dep_specs(
                     yaml_deps):
                 # It is important that we always check upstream installations
@@ -692,14 +988,16 @@ def _assign_dependencies(self, hash_key, installs, data):
                 if not child:
                     msg = ("Missing dependency not in database: "
                            "%s needs %s-%s" % (
-                               spec.cformat('{name}{/hash:7}'),
+                               spack.spec.colorize_spec(
+                                   '%s/%s' % (name, hash_key[:7])),
                                dname, dhash[:7]))
                     if self._fail_when_missing_deps:
                         raise MissingDependenciesError(msg)
                     tty.warn(msg)
                     continue
 
-                spec._add_dependency(child, dtypes)
+                dependencies.append((child, dtypes))
+        return dependencies
 
     def _read_from_file(self, filename):
         """Fill database from file, do not maintain old data.
@@ -750,58 +1048,132 @@ def check(cond, msg):
                     for k, v in self._data.items()
                 )
 
-        def invalid_record(hash_key, error):
-            msg = ("Invalid record in Spack database: "
-                   "hash: %s, cause: %s: %s")
-            msg %= (hash_key, type(error).__name__, str(error))
-            raise CorruptDatabaseError(msg, self._index_path)
-
-        # Build up the database in three passes:
-        #
-        #   1. Read in all specs without dependencies.
-        #   2. Hook dependencies up among specs.
-        #   3. Mark all specs concrete.
-        #
-        # The database is built up so that ALL specs in it share nodes
-        # (i.e., its specs are a true Merkle DAG, unlike most specs.)
-
-        # Pass 1: Iterate through database and build specs w/o dependencies
-        data = {}
+        # Records are read without constructing their specs, which is left
+        # to when they are first used (see LazyInstallRecord).  The specs
+        # of all records are still shared among them (i.e., they are a true
+        # Merkle DAG, unlike most specs.)
+        data = InstallRecordDict()
         for hash_key, rec in installs.items():
             try:
-                # This constructs a spec DAG from the list of all installs
-                spec = self._read_spec_from_dict(hash_key, installs)
-
-                # Insert the brand new spec in the database.  Each
-                # spec has its own copies of its dependency specs.
-                # TODO: would a more immmutable spec implementation simplify
-                #       this?
-                data[hash_key] = InstallRecord.from_dict(spec, rec)
+                data[hash_key] = LazyInstallRecord(hash_key, rec, self, data)
             except Exception as e:
-                invalid_record(hash_key, e)
+                msg = ("Invalid record in Spack database: "
+                       "hash: %s, cause: %s: %s")
+                msg %= (hash_key, type(e).__name__, str(e))
+                raise CorruptDatabaseError(msg, self._index_path)
+
+        self._data = data
+
+        # Only indices of the current version go with a journal
+        self._journal_id = None
+        if version == _db_version:
+            self._journal_id = db.get('journal')
+
+        # Missing dependencies are only found when reading specs
+        if self._fail_when_missing_deps:
+            self._read_all_specs()
+
+    def _read_index(self):
+        """Read the index file, if any, and the journal that goes with it.
+
+        Does not do any locking.
+        """
+        if os.path.isfile(self._index_path):
+            self._read_from_file(self._index_path)
+            self._journal_offset = 0
+            self._read_journal()
+
+    def _read_journal(self):
+        """Apply the changes appended to the journal since it was last read.
+
+        The journal holds one JSON object per line.  The first one names the
+        journal, which is ignored unless the index file refers to it (i.e.,
+        it was written before the index was last rewritten).  Each of the
+        others holds the records changed by one write transaction.  Reading
+        stops at the first incomplete line, which is left by an interrupted
+        write and is overwritten by the next one.
+
+        Does not do any locking.
 
-        # Pass 2: Assign dependencies once all specs are created.
-        for hash_key in data:
+        Returns:
+            (bool): whether any change was applied
+        """
+        if not self._journal_id:
+            return False
+
+        try:
+            with open(self._journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                tail = f.read()
+        except (IOError, OSError):
+            return False
+
+        applied = False
+        for line in tail.splitlines(True):
+            if not line.endswith(b'\n'):
+                break
             try:
-                self._assign_dependencies(hash_key, installs, data)
-            except MissingDependenciesError:
-                raise
-            except Exception as e:
-                invalid_record(hash_key, e)
+                entry = sjson.load(line.decode('utf-8'))
+            except ValueError:
+                break
+            if not isinstance(entry, dict):
+                break
+
+            if not self._journal_offset:
+                if entry.get('journal') != self._journal_id:
+                    break
+            else:
+                self._apply_changes(entry.get('installs', {}),
+                                    entry.get('removed', []),
+                                    self._journal_path)
+                applied = True
+            self._journal_offset += len(line)
 
-        # Pass 3: Mark all specs concrete.  Specs representing real
-        # installations must be explicitly marked.
-        # We do this *after* all dependencies are connected because if we
-        # do it *while* we're constructing specs,it causes hashes to be
-        # cached prematurely.
-        for hash_key, rec in data.items():
-            rec.spec._mark_concrete()
+        return applied
 
-        self._data = data
+    def _apply_changes(self, installs, removed, path):
+        """Apply changes made to the database by another process.
+
+        Records of specs already constructed are only updated, so that
+        their specs stay shared with their dependents.  Other records are
+        read lazily, as by ``_read_from_file()``.
+
+        Does not do any locking.
+
+        Args:
+            installs (dict): new or changed install records in JSON form,
+                keyed on DAG hash
+            removed (list): DAG hashes of removed records
+            path (str): file the changes were read from, for error messages
+        """
+        try:
+            for hash_key in removed:
+                rec = self._data.pop(hash_key, None)
+                if rec and rec.spec_is_read:
+                    for dep in rec.spec.dependencies(_tracked_deps):
+                        dep._dependents.pop(rec.spec.name, None)
+
+            for hash_key, rec in installs.items():
+                old = self._data.get(hash_key)
+                if old is not None and old.spec_is_read:
+                    self._data[hash_key] = InstallRecord.from_dict(
+                        old.spec, rec)
+                else:
+                    self._data[hash_key] = LazyInstallRecord(
+                        hash_key, rec, self, self._data)
+        except Exception as e:
+            raise CorruptDatabaseError(
+                "Invalid change to Spack database: %s: %s"
+                % (type(e).__name__, str(e)), path)
 
-    def reindex(self, directory_layout):
+    def reindex(self, directory_layout, incremental=False):
         """Build database index from scratch based on a directory layout.
 
+        Spec files are read in parallel (see
+        ``YamlDirectoryLayout.read_specs()``).  If ``incremental``, the
+        specs of the installed records are taken from the index, instead,
+        unless their spec files were modified after it was last written.
+
         Locks the DB if it isn't locked already.
         """
         if self.is_upstream:
@@ -812,8 +1184,7 @@ def reindex(self, directory_layout):
         # ignore errors if we need to rebuild a corrupt database.
         def _read_suppress_error():
             try:
-                if os.path.isfile(self._index_path):
-                    self._read_from_file(self._index_path)
+                self._read_index()
             except CorruptDatabaseError as e:
                 self._error = e
                 self._data = {}
@@ -830,10 +1201,15 @@ def _read_suppress_error():
                 )
                 self._error = None
 
+            since = None
+            if incremental and os.path.isfile(self._index_path):
+                since = os.path.getmtime(self._index_path)
+
             old_data = self._data
+            self._rewrite_index = True
             try:
                 self._construct_from_directory_layout(
-                    directory_layout, old_data)
+                    directory_layout, old_data, since)
             except BaseException:
                 # If anything explodes, restore old data, skip write.
                 self._data = old_data
@@ -864,23 +1240,62 @@ def _construct_entry_from_directory_layout(self, directory_layout,
         if deprecator:
             self._deprecate(spec, deprecator)
 
-    def _construct_from_directory_layout(self, directory_layout, old_data):
+    def _installed_specs_from_directory_layout(self, directory_layout,
+                                               old_data, since):
+        """Read the specs installed in the prefixes of a directory layout.
+
+        If ``since`` is a time, specs of installed records in ``old_data``
+        are used instead of those in spec files not modified after it.
+        """
+        spec_files = directory_layout.spec_files()
+        if since is None:
+            return directory_layout.read_specs(spec_files)
+
+        old_records = {}
+        for rec in old_data.values():
+            if rec.installed and rec.path:
+                spec_file = os.path.join(rec.path, directory_layout.metadata_dir,
+                                         directory_layout.spec_file_name)
+                old_records[spec_file] = rec
+
+        specs, to_read = [], []
+        for spec_file in spec_files:
+            rec = old_records.get(spec_file)
+            try:
+                unchanged = rec and os.path.getmtime(spec_file) < since
+            except OSError:
+                unchanged = False
+
+            if unchanged:
+                specs.append(rec.spec)
+            else:
+                to_read.append(spec_file)
+
+        tty.debug('REUSING {0} SPECS FROM OLD DB'.format(len(specs)))
+        return specs + directory_layout.read_specs(to_read)
+
+    def _construct_from_directory_layout(self, directory_layout, old_data,
+                                         since=None):
         # Read first the `spec.yaml` files in the prefixes. They should be
         # considered authoritative with respect to DB reindexing, as
         # entries in the DB may be corrupted in a way that still makes
         # them readable. If we considered DB entries authoritative
         # instead, we would perpetuate errors over a reindex.
         with directory_layout.disable_upstream_check():
+            installed_specs = self._installed_specs_from_directory_layout(
+                directory_layout, old_data, since)
+
             # Initialize data in the reconstructed DB
             self._data = {}
 
             # Start inspecting the installed prefixes
             processed_specs = set()
 
-            for spec in directory_layout.all_specs():
-                self._construct_entry_from_directory_layout(directory_layout,
-                                                            old_data, spec)
-                processed_specs.add(spec)
+            with directory_layout.known_installed_specs(installed_specs):
+                for spec in installed_specs:
+                    self._construct_entry_from_directory_layout(
+                        directory_layout, old_data, spec)
+                    processed_specs.add(spec)
 
             for spec, deprecator in directory_layout.all_deprecated_specs():
                 self._construct_entry_from_directory_layout(directory_layout,
@@ -957,23 +1372,106 @@ def _check_ref_counts(self):
                     (key, found, expected, self._index_path))
 
     def _write(self, type, value, traceback):
-        """Write the in-memory database index to its file path.
+        """Write the changes to the in-memory database to disk.
 
         This is a helper function called by the WriteTransaction context
         manager. If there is an exception while the write lock is active,
-        nothing will be written to the database file, but the in-memory
-        database *may* be left in an inconsistent state.  It will be consistent
-        after the start of the next transaction, when it read from disk again.
+        nothing will be written to the database file, and the in-memory
+        database, which *may* be left in an inconsistent state, is read from
+        disk again at the start of the next transaction.  Records that were
+        pending in ``batched_writes()`` before the transaction started are
+        kept and added again after that read, so they are written by a later
+        transaction; those added within the failed transaction are dropped.
+
+        The changed records are appended to the journal, unless the journal
+        has grown too large compared to the index file, in which case the
+        whole index is rewritten instead (see ``_write_index()``).
 
         This routine does no locking.
         """
         # Do not write if exceptions were raised
         if type is not None:
+            self._drop_pending_of_failed_write()
+            self._dirty.clear()
+            self.last_seen_verifier = ''
             return
 
+        if not self._rewrite_index and self._journal_id and \
+                os.path.isfile(self._index_path):
+            if not self._dirty:
+                return
+            entry = self._journal_entry()
+            if not self._journal_too_large(len(entry)):
+                self._append_to_journal(entry)
+                return
+
+        self._write_index()
+
+    def _journal_entry(self):
+        """Return the journal line recording the changed records."""
+        installs, removed = {}, []
+        for hash_key in sorted(self._dirty):
+            if hash_key in self._data:
+                installs[hash_key] = self._data[hash_key].to_dict(
+                    include_fields=self._record_fields)
+            else:
+                removed.append(hash_key)
+
+        line = json.dumps({'installs': installs, 'removed': removed},
+                          separators=(',', ':'))
+        return (line + '\n').encode('utf-8')
+
+    def _journal_too_large(self, entry_size):
+        """Whether appending ``entry_size`` bytes to the journal makes it
+        too large compared to the index file."""
+        try:
+            index_size = os.path.getsize(self._index_path)
+        except OSError:
+            return True
+        size = self._journal_offset + entry_size
+        return size > index_size * _journal_compaction_ratio
+
+    def _append_to_journal(self, entry):
+        """Append an entry to the journal, starting a new journal if the
+        one on disk does not go with the index file.
+
+        Anything after the last complete entry, e.g. left by an interrupted
+        write, is overwritten.
+        """
+        if not self._journal_offset:
+            header = json.dumps({'journal': self._journal_id,
+                                 'version': str(_db_version)})
+            entry = (header + '\n').encode('utf-8') + entry
+
+        with open(self._journal_path, 'ab') as f:
+            f.truncate(self._journal_offset)
+            f.write(entry)
+        self._journal_offset += len(entry)
+
+        # Any pending records were written along with the other changes.
+        self._dirty.clear()
+        self._pending.clear()
+
+    def _write_index(self):
+        """Rewrite the whole index file, compacting the journal into it."""
+        self._write_index_file()
+
+        # Any pending records were written along with the rest.
+        self._dirty.clear()
+        self._pending.clear()
+        self._rewrite_index = False
+
+    def _write_index_file(self):
+        """Write the in-memory database to the index file, along with a new
+        verifier, and start a new journal."""
         temp_file = self._index_path + (
             '.%s.%s.temp' % (socket.getfqdn(), os.getpid()))
 
+        # A new journal goes with the new index, which makes the one on disk
+        # stale even if it cannot be removed below.
+        self._journal_id = str(uuid.uuid4()) if _use_uuid else None
+        self._journal_offset = 0
+
         # Write a temporary database file them move it into place
         try:
             with open(temp_file, 'w') as f:
@@ -986,11 +1484,18 @@ def _write(self, type, value, traceback):
                     self.last_seen_verifier = new_verifier
         except BaseException as e:
             tty.debug(e)
-            # Clean up temp file if something goes wrong.
+            # Clean up temp file if something goes wrong, and read the index
+            # again to find the journal that goes with it.
             if os.path.exists(temp_file):
                 os.remove(temp_file)
+            self.last_seen_verifier = ''
             raise
 
+        try:
+            os.remove(self._journal_path)
+        except OSError:
+            pass
+
     def _read(self):
         """Re-read Database from the data in the set location.
 
@@ -1010,7 +1515,11 @@ def _read(self):
                     (current_verifier == '')):
                 self.last_seen_verifier = current_verifier
                 # Read from file if a database exists
-                self._read_from_file(self._index_path)
+                self._read_index()
+                self._replay_pending()
+            elif self._read_journal():
+                # Only the changes made by others since the last read
+                self._replay_pending()
             return
         elif self.is_upstream:
             raise UpstreamDatabaseLockingError(
@@ -1109,6 +1618,7 @@ def _add(
                 new_spec._add_dependency(record.spec, dep.deptypes)
                 if not upstream:
                     record.ref_count += 1
+                    self._dirty.add(dkey)
 
             # Mark concrete once everything is built, and preserve
             # the original hash of concrete specs.
@@ -1123,6 +1633,7 @@ def _add(
             self._data[key].installation_time = _now()
 
         self._data[key].explicit = explicit
+        self._dirty.add(key)
 
     @_autospec
     def add(self, spec, directory_layout, explicit=False):
@@ -1132,6 +1643,17 @@ def add(self, spec, directory_layout, explicit=False):
 
         """
         # TODO: ensure that spec is concrete?
+        if self._batch_depth:
+            # Only write the record along with others (see batched_writes())
+            with self.read_transaction():
+                self._add(spec, directory_layout, explicit=explicit)
+                key = spec.dag_hash()
+                if key in self._data:
+                    self._pending[key] = (
+                        spec, directory_layout, explicit,
+                        self._data[key].installation_time)
+            return
+
         # Entire add is transactional.
         with self.write_transaction():
             self._add(spec, directory_layout, explicit=explicit)
@@ -1163,6 +1685,7 @@ def _decrement_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count -= 1
+        self._dirty.add(key)
 
         if rec.ref_count == 0 and not rec.installed:
             del self._data[key]
@@ -1177,11 +1700,13 @@ def _increment_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count += 1
+        self._dirty.add(key)
 
     def _remove(self, spec):
         """Non-locking version of remove(); does real work."""
         key = self._get_matching_spec_key(spec)
         rec = self._data[key]
+        self._dirty.add(key)
 
         if rec.ref_count > 0:
             rec.installed = False
@@ -1254,6 +1779,7 @@ def _deprecate(self, spec, deprecator):
         spec_rec.deprecated_for = deprecator_key
         spec_rec.installed = False
         self._data[spec_key] = spec_rec
+        self._dirty.add(spec_key)
 
     @_autospec
     def deprecate(self, spec, deprecator):
@@ -1261,6 +1787,48 @@ def deprecate(self, spec, deprecator):
         with self.write_transaction():
             return self._deprecate(spec, deprecator)
 
+    def _dependents(self, spec, transitive, deptype):
+        """Return the specs of the records, here and in upstream databases,
+        depending on a spec.
+
+        They are looked up in an index of the dependencies of all records
+        rather than with ``Spec.dependents()``, which keeps one dependent
+        per package name and also has the dependents in downstream
+        databases.
+
+        Does not do any locking.
+        """
+        deptype = dp.canonical_deptype(deptype)
+        dbs = [self] + self.upstream_dbs
+        version = [(db._data, db._data.changes) for db in dbs]
+        cached = self._dependents_index
+        if cached is None or len(cached[0]) != len(version) or any(
+                a[0] is not b[0] or a[1] != b[1]
+                for a, b in zip(cached[0], version)):
+            index = {}
+            for db in dbs:
+                for rec in db._data.values():
+                    for dep in rec.spec.dependencies_dict(
+                            _tracked_deps).values():
+                        index.setdefault(dep.spec.dag_hash(), []).append(
+                            (rec.spec, dep.deptypes))
+            self._dependents_index = cached = (version, index)
+
+        index = cached[1]
+        dependents = []
+        seen = set()
+        stack = [spec.dag_hash()]
+        while stack:
+            for parent, deptypes in index.get(stack.pop(), ()):
+                hash_key = parent.dag_hash()
+                if hash_key in seen or not set(deptypes) & set(deptype):
+                    continue
+                seen.add(hash_key)
+                dependents.append(parent)
+                if transitive:
+                    stack.append(hash_key)
+        return dependents
+
     @_autospec
     def installed_relatives(self, spec, direction='children', transitive=True,
                             deptype='all'):
@@ -1268,34 +1836,35 @@ def installed_relatives(self, spec, direction='children', transitive=True,
         if direction not in ('parents', 'children'):
             raise ValueError("Invalid direction: %s" % direction)
 
-        relatives = set()
-        for spec in self.query(spec):
-            if transitive:
-                to_add = spec.traverse(
-                    direction=direction, root=False, deptype=deptype)
-            elif direction == 'parents':
-                to_add = spec.dependents(deptype=deptype)
-            else:  # direction == 'children'
-                to_add = spec.dependencies(deptype=deptype)
-
-            for relative in to_add:
-                hash_key = relative.dag_hash()
-                upstream, record = self.query_by_spec_hash(hash_key)
-                if not record:
-                    reltype = ('Dependent' if direction == 'parents'
-                               else 'Dependency')
-                    msg = ("Inconsistent state! %s %s of %s not in DB"
-                           % (reltype, hash_key, spec.dag_hash()))
-                    if self._fail_when_missing_deps:
-                        raise MissingDependenciesError(msg)
-                    tty.warn(msg)
-                    continue
-
-                if not record.installed:
-                    continue
-
-                relatives.add(relative)
-        return relatives
+        with self.read_transaction():
+            relatives = set()
+            for spec in self.query(spec):
+                if direction == 'parents':
+                    to_add = self._dependents(spec, transitive, deptype)
+                elif transitive:
+                    to_add = spec.traverse(
+                        direction=direction, root=False, deptype=deptype)
+                else:  # direction == 'children'
+                    to_add = spec.dependencies(deptype=deptype)
+
+                for relative in to_add:
+                    hash_key = relative.dag_hash()
+                    upstream, record = self.query_by_spec_hash(hash_key)
+                    if not record:
+                        reltype = ('Dependent' if direction == 'parents'
+                                   else 'Dependency')
+                        msg = ("Inconsistent state! %s %s of %s not in DB"
+                               % (reltype, hash_key, spec.dag_hash()))
+                        if self._fail_when_missing_deps:
+                            raise MissingDependenciesError(msg)
+                        tty.warn(msg)
+                        continue
+
+                    if not record.installed:
+                        continue
+
+                    relatives.add(relative)
+            return relatives
 
     @_autospec
     def installed_extensions_for(self, extendee_spec):
@@ -1335,9 +1904,9 @@ def _get_by_hash_local(self, dag_hash, default=None, installed=any):
 
         # check if hash is a prefix of some installed (or previously
         # installed) spec.
-        matches = [record.spec for h, record in self._data.items()
-                   if h.startswith(dag_hash) and
-                   record.install_type_matches(installed)]
+        matches = [record.spec for record in
+                   self._data.with_hash_prefix(dag_hash)
+                   if record.install_type_matches(installed)]
         if matches:
             return matches
 
@@ -1424,6 +1993,10 @@ def _query(
         # TODO: like installed and known that can be queried?  Or are
         # TODO: these really special cases that only belong here?
 
+        # Parse the query once rather than in each satisfies() call
+        if isinstance(query_spec, six.string_types):
+            query_spec = spack.spec.Spec(query_spec)
+
         # Just look up concrete specs with hashes; no fancy search.
         if isinstance(query_spec, spack.spec.Spec) and query_spec.concrete:
             # TODO: handling of hashes restriction is not particularly elegant.
@@ -1434,14 +2007,14 @@ def _query(
             else:
                 return []
 
-        # Abstract specs require more work -- currently we test
-        # against everything.
+        # Abstract specs require more work -- we test against every record
+        # that may match.
         results = []
         start_date = start_date or datetime.datetime.min
         end_date = end_date or datetime.datetime.max
 
-        for key, rec in self._data.items():
-            if hashes is not None and rec.spec.dag_hash() not in hashes:
+        for hash_key, rec in self._candidate_records(query_spec):
+            if hashes is not None and hash_key not in hashes:
                 continue
 
             if not rec.install_type_matches(installed):
@@ -1451,7 +2024,7 @@ def _query(
                 continue
 
             if known is not any and spack.repo.path.exists(
-                    rec.spec.name) != known:
+                    rec.name) != known:
                 continue
 
             inst_date = datetime.datetime.fromtimestamp(
@@ -1470,6 +2043,25 @@ def _query(
         _query.__doc__ = ""
     _query.__doc__ += _query_docstring
 
+    def _candidate_records(self, query_spec):
+        """Return the hashes and records that may satisfy an abstract query
+        spec.
+
+        A spec with a name is only satisfied by the records of the package
+        with that name and, if it is virtual, by those of its providers.
+
+        Does not do any locking.
+        """
+        if not isinstance(query_spec, spack.spec.Spec) or not query_spec.name:
+            return self._data.items()
+
+        names = set([query_spec.name])
+        if query_spec.virtual:
+            names.update(p.name for p in spack.repo.path.provider_index
+                         .providers_for(query_spec.name))
+        return [item for name in names
+                for item in self._data.items_with_name(name)]
+
     def query_local(self, *args, **kwargs):
         """Query only the local Spack database."""
         with self.read_transaction():
@@ -1556,7 +2148,10 @@ def update_explicit(self, spec, explicit):
                 message = '{s.name}@{s.version} : marking the package {0}'
                 status = 'explicit' if explicit else 'implicit'
                 tty.debug(message.format(status, s=spec))
+                # The record may have been read again within the transaction
+                rec = self.get_record(spec)
                 rec.explicit = explicit
+                self._dirty.add(rec.spec.dag_hash())
 
 
 class UpstreamDatabaseLockingError(SpackError):
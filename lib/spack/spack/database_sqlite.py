@@ -0,0 +1,382 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Installation database kept in SQLite.
+
+``SQLiteDatabase`` stores the install records of an install tree in an
+SQLite database, ``index.sqlite``, instead of ``index.json``.  Each record
+is a row, with indexes on package name, version and DAG hash, and the
+dependencies among the records are rows of their own.  Writes only update
+the rows of the records that changed, and readers only read back the rows
+changed since they last read, so neither depends on the size of the
+database.  Queries for a package name look up the matching records
+through the index, and relatives of installed specs are found with a
+recursive query over the dependencies.
+
+It is selected with ``config:database_backend: sqlite``.  When it is first
+used, the records are imported from ``index.json`` if that exists, and
+``spack database export`` writes them back to ``index.json`` for Spack
+instances using the default backend (e.g., as an upstream).
+"""
+import contextlib
+import json
+import os
+import uuid
+
+import llnl.util.tty as tty
+
+import spack.database
+import spack.dependency
+import spack.repo
+import spack.spec
+import spack.store
+import spack.util.lock as lk
+import spack.util.spack_json as sjson
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None  # type: ignore
+
+#: Name of the SQLite database in the database directory
+sqlite_file_name = 'index.sqlite'
+
+_schema = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    path TEXT,
+    installed INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL,
+    explicit INTEGER NOT NULL,
+    installation_time REAL NOT NULL,
+    deprecated_for TEXT,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_name_version ON records (name, version);
+CREATE INDEX IF NOT EXISTS records_seq ON records (seq);
+CREATE TABLE IF NOT EXISTS dependencies (
+    parent TEXT NOT NULL,
+    child TEXT NOT NULL,
+    deptypes TEXT NOT NULL,
+    PRIMARY KEY (parent, child)
+);
+CREATE INDEX IF NOT EXISTS dependencies_child ON dependencies (child);
+CREATE TABLE IF NOT EXISTS removed (
+    hash TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+_record_columns = (
+    'hash, spec, path, installed, ref_count, explicit, installation_time, '
+    'deprecated_for')
+
+_relatives_query = """
+WITH RECURSIVE relatives(hash) AS (
+    SELECT ?
+    UNION
+    SELECT dependencies.{0} FROM dependencies
+    JOIN relatives ON dependencies.{1} = relatives.hash
+)
+SELECT hash FROM relatives
+"""
+
+
+class SQLiteDatabase(spack.database.Database):
+    """Installation database kept in SQLite.
+
+    Changes are tracked with two numbers stored in the database: a
+    generation, which changes whenever all the records are rewritten (e.g.
+    by ``spack reindex``), and a sequence number, which is incremented by
+    each write and stored with the records written and the hashes of the
+    records removed.
+    """
+
+    def __init__(self, root, db_dir=None, upstream_dbs=None,
+                 is_upstream=False):
+        super(SQLiteDatabase, self).__init__(
+            root, db_dir=db_dir, upstream_dbs=upstream_dbs,
+            is_upstream=is_upstream)
+        self._sqlite_path = os.path.join(self._db_dir, sqlite_file_name)
+
+        # Connections cannot be shared with forked processes
+        self._connection = None
+        self._connection_pid = None
+
+        # Generation and sequence number of the records last read
+        self._generation = None
+        self._seq = 0
+
+    @property
+    def connection(self):
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self._sqlite_path, timeout=self.db_lock_timeout,
+                isolation_level=None)
+            self._connection_pid = os.getpid()
+            if not self.is_upstream:
+                self._connection.executescript(_schema)
+        return self._connection
+
+    @contextlib.contextmanager
+    def _sql_transaction(self, begin='BEGIN'):
+        """Run the statements in the context in one SQLite transaction."""
+        connection = self.connection
+        connection.execute(begin)
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _stored_version(self):
+        """Return the generation (``None`` if nothing was stored yet) and
+        sequence number of the stored records."""
+        try:
+            meta = dict(self.connection.execute(
+                'SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError as e:
+            raise spack.database.CorruptDatabaseError(
+                "error reading database:", str(e))
+        return meta.get('generation'), int(meta.get('seq', 0))
+
+    def _read(self):
+        """Read the records changed since they were last read.
+
+        Records are imported from ``index.json`` if nothing is stored yet,
+        or regenerated from the install tree if that does not exist either,
+        which requires taking a write lock.
+        """
+        generation, seq = self._stored_version()
+        if generation is None:
+            if self.is_upstream:
+                raise spack.database.UpstreamDatabaseLockingError(
+                    "No database index is present, and upstream"
+                    " databases cannot generate an index")
+            if os.path.isfile(self._index_path):
+                self.import_index()
+                return
+
+            # reindex() takes its own write lock, so no lock here.
+            with lk.WriteTransaction(self.lock):
+                self._rewrite_index = True
+                self._write(None, None, None)
+            self.reindex(spack.store.layout)
+            return
+
+        if generation != self._generation:
+            self._read_index()
+            self._replay_pending()
+        elif seq != self._seq:
+            self._read_changes()
+            self._replay_pending()
+
+    def _read_index(self):
+        """Read all the stored records.
+
+        Does not do any locking.
+        """
+        with self._sql_transaction():
+            generation, seq = self._stored_version()
+            rows = self.connection.execute(
+                'SELECT {0} FROM records'.format(_record_columns)).fetchall()
+
+        self._data = {}
+        self._apply_changes(self._installs(rows), [], self._sqlite_path)
+        self._generation, self._seq = generation, seq
+
+    def _read_changes(self):
+        """Read the records written and removed since they were last read.
+
+        Does not do any locking.
+        """
+        with self._sql_transaction() as connection:
+            generation, seq = self._stored_version()
+            rows = connection.execute(
+                'SELECT {0} FROM records WHERE seq > ?'.format(
+                    _record_columns), (self._seq,)).fetchall()
+            removed = [hash_key for hash_key, in connection.execute(
+                'SELECT hash FROM removed WHERE seq > ?', (self._seq,))]
+
+        self._apply_changes(self._installs(rows), removed, self._sqlite_path)
+        self._generation, self._seq = generation, seq
+
+    @staticmethod
+    def _installs(rows):
+        """Convert rows of the records table to install records in the
+        form they have in ``index.json``."""
+        installs = {}
+        for (hash_key, spec, path, installed, ref_count, explicit,
+             installation_time, deprecated_for) in rows:
+            installs[hash_key] = {
+                'spec': sjson.load(spec),
+                'path': path,
+                'installed': bool(installed),
+                'ref_count': ref_count,
+                'explicit': bool(explicit),
+                'installation_time': installation_time,
+                'deprecated_for': deprecated_for,
+            }
+        return installs
+
+    def _write(self, type, value, traceback):
+        """Write the records changed in memory to the database.
+
+        This is a helper function called by the WriteTransaction context
+        manager.  If there is an exception while the write lock is active,
+        nothing is written and all records are read again at the start of
+        the next transaction.  Records that were pending in
+        ``batched_writes()`` before the transaction started are added again
+        after that read, so a later transaction writes them.
+
+        This routine does no locking.
+        """
+        if type is not None:
+            self._drop_pending_of_failed_write()
+            self._dirty.clear()
+            self._generation = None
+            return
+
+        if not self._dirty and not self._rewrite_index:
+            return
+
+        with self._sql_transaction('BEGIN IMMEDIATE') as connection:
+            generation, seq = self._stored_version()
+            seq += 1
+            if self._rewrite_index or generation is None:
+                generation = str(uuid.uuid4())
+                for table in ('records', 'dependencies', 'removed'):
+                    connection.execute('DELETE FROM {0}'.format(table))
+                keys = list(self._data)
+            else:
+                keys = sorted(self._dirty)
+
+            for hash_key in keys:
+                connection.execute(
+                    'DELETE FROM dependencies WHERE parent = ?', (hash_key,))
+                rec = self._data.get(hash_key)
+                if rec is None:
+                    connection.execute(
+                        'DELETE FROM records WHERE hash = ?', (hash_key,))
+                    connection.execute(
+                        'INSERT OR REPLACE INTO removed VALUES (?, ?)',
+                        (hash_key, seq))
+                    continue
+
+                connection.execute(
+                    'DELETE FROM removed WHERE hash = ?', (hash_key,))
+                connection.execute(
+                    'INSERT OR REPLACE INTO records VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                        hash_key,
+                        rec.spec.name,
+                        str(rec.spec.version),
+                        json.dumps(rec.spec.node_dict_with_hashes(),
+                                   separators=(',', ':')),
+                        rec.path,
+                        rec.installed,
+                        rec.ref_count,
+                        rec.explicit,
+                        rec.installation_time,
+                        rec.deprecated_for,
+                        seq))
+                connection.executemany(
+                    'INSERT INTO dependencies VALUES (?, ?, ?)', [
+                        (hash_key, dep.spec.dag_hash(), ','.join(dep.deptypes))
+                        for dep in rec.spec.dependencies_dict(
+                            spack.database._tracked_deps).values()])
+
+            connection.executemany(
+                'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                [('generation', generation), ('seq', str(seq))])
+
+        self._generation, self._seq = generation, seq
+
+        # Any pending records were written along with the rest.
+        self._dirty.clear()
+        self._pending.clear()
+        self._rewrite_index = False
+
+    def import_index(self):
+        """Replace the stored records with those in ``index.json``."""
+        with lk.WriteTransaction(self.lock):
+            spack.database.Database._read_index(self)
+            self._rewrite_index = True
+            self._write(None, None, None)
+
+    def export_index(self):
+        """Write the stored records to ``index.json``."""
+        with self.read_transaction():
+            self._write_index_file()
+
+    def _candidate_records(self, query_spec):
+        """Look up the hashes and records of the package named by the query
+        spec through the index.
+
+        Versions are left to ``satisfies()``, since equal versions may be
+        spelled differently (e.g., ``1.2`` and ``1-2``), and ranges and
+        lists of versions do not map to a pattern of version strings.
+        """
+        if (self._rewrite_index or
+                not isinstance(query_spec, spack.spec.Spec) or
+                not query_spec.name or
+                spack.repo.path.is_virtual(query_spec.name)):
+            return super(SQLiteDatabase, self)._candidate_records(query_spec)
+
+        query = 'SELECT hash FROM records WHERE name = ?'
+
+        # Records changed in memory may not be stored yet
+        keys = set(hash_key for hash_key, in
+                   self.connection.execute(query, (query_spec.name,)))
+        keys.update(self._dirty)
+        return [(k, self._data[k]) for k in keys if k in self._data]
+
+    @spack.database._autospec
+    def installed_relatives(self, spec, direction='children', transitive=True,
+                            deptype='all'):
+        """Return installed specs related to this one."""
+        deptype = spack.dependency.canonical_deptype(deptype)
+        if (not transitive or self.upstream_dbs or self._dirty or
+                self._rewrite_index or
+                not set(spack.database._tracked_deps) <= set(deptype)):
+            return super(SQLiteDatabase, self).installed_relatives(
+                spec, direction, transitive, deptype)
+        if direction not in ('parents', 'children'):
+            raise ValueError("Invalid direction: %s" % direction)
+
+        if direction == 'children':
+            query = _relatives_query.format('child', 'parent')
+        else:
+            query = _relatives_query.format('parent', 'child')
+
+        relatives = set()
+        for spec in self.query(spec):
+            root = spec.dag_hash()
+            for hash_key, in self.connection.execute(query, (root,)):
+                if hash_key == root:
+                    continue
+
+                record = self._data.get(hash_key)
+                if not record:
+                    reltype = ('Dependent' if direction == 'parents'
+                               else 'Dependency')
+                    msg = ("Inconsistent state! %s %s of %s not in DB"
+                           % (reltype, hash_key, root))
+                    if self._fail_when_missing_deps:
+                        raise spack.database.MissingDependenciesError(msg)
+                    tty.warn(msg)
+                    continue
+
+                if record.installed:
+                    relatives.add(record.spec)
+        return relatives
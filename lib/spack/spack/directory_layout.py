@@ -6,6 +6,7 @@
 import os
 import shutil
 import glob
+import multiprocessing
 import tempfile
 from contextlib import contextmanager
 
@@ -22,6 +23,22 @@
                                '{compiler.name}-{compiler.version}/'
                                '{name}-{version}-{hash}')}
 
+#: Least number of spec files read in a process pool by read_specs()
+parallel_read_threshold = 64
+
+
+def _load_spec_file(path):
+    """Parse a spec file in a worker process of ``read_specs()``.
+
+    Returns the path, the parsed YAML, and the error message if the file
+    could not be read or parsed.
+    """
+    try:
+        with open(path) as f:
+            return path, yaml.load(f), None
+    except Exception as e:
+        return path, None, str(e)
+
 
 def _check_concrete(spec):
     """If the spec is not concrete, raise a ValueError"""
@@ -209,6 +226,10 @@ def __init__(self, root, **kwargs):
                 self.projections[when_spec] = projection.replace(
                     "{hash}", "{hash:%d}" % self.hash_length)
 
+        # Specs read from their prefixes, keyed on DAG hash, that
+        # check_installed() need not read again
+        self._installed_specs = {}
+
         # If any of these paths change, downstream databases may not be able to
         # locate files in older upstream databases
         self.metadata_dir        = '.spack'
@@ -250,6 +271,50 @@ def read_spec(self, path):
         spec._mark_concrete()
         return spec
 
+    def read_specs(self, paths, jobs=None):
+        """Read the specs in many spec files.
+
+        The files are parsed in a pool of ``jobs`` processes (by default,
+        ``config:build_jobs`` up to the number of CPUs) when there are at
+        least ``parallel_read_threshold`` of them.
+
+        Args:
+            paths (list): paths of the spec files
+            jobs (int): number of processes parsing the files
+
+        Returns:
+            (list): the specs, in the same order as the files
+        """
+        if jobs is None:
+            jobs = min(spack.config.get('config:build_jobs', 16),
+                       multiprocessing.cpu_count())
+        if jobs < 2 or len(paths) < parallel_read_threshold:
+            return [self.read_spec(path) for path in paths]
+
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(_load_spec_file, paths,
+                               chunksize=max(1, len(paths) // (4 * jobs)))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        specs = []
+        for path, data, error in results:
+            if error is None:
+                try:
+                    spec = spack.spec.Spec.from_dict(data)
+                except Exception as e:
+                    error = str(e)
+            if error is not None:
+                raise SpecReadError(
+                    'Unable to read file: %s' % path, 'Cause: ' + error)
+
+            # Specs read from actual installations are always concrete
+            spec._mark_concrete()
+            specs.append(spec)
+        return specs
+
     def spec_file_path(self, spec):
         """Gets full path to spec file"""
         _check_concrete(spec)
@@ -285,6 +350,17 @@ def disable_upstream_check(self):
         yield
         self.check_upstream = True
 
+    @contextmanager
+    def known_installed_specs(self, specs):
+        """Within the context, take these specs, which were just read from
+        their prefixes, as installed without reading their spec files
+        again in ``check_installed()``."""
+        self._installed_specs = dict((s.dag_hash(), s) for s in specs)
+        try:
+            yield
+        finally:
+            self._installed_specs = {}
+
     def metadata_path(self, spec):
         return os.path.join(spec.prefix, self.metadata_dir)
 
@@ -319,15 +395,18 @@ def check_installed(self, spec):
         path = self.path_for_spec(spec)
         spec_file_path = self.spec_file_path(spec)
 
-        if not os.path.isdir(path):
-            return None
+        installed_spec = self._installed_specs.get(spec.dag_hash())
+        if installed_spec is None:
+            if not os.path.isdir(path):
+                return None
 
-        if not os.path.isfile(spec_file_path):
-            raise InconsistentInstallDirectoryError(
-                'Install prefix exists but contains no spec.yaml:',
-                "  " + path)
+            if not os.path.isfile(spec_file_path):
+                raise InconsistentInstallDirectoryError(
+                    'Install prefix exists but contains no spec.yaml:',
+                    "  " + path)
+
+            installed_spec = self.read_spec(spec_file_path)
 
-        installed_spec = self.read_spec(spec_file_path)
         if installed_spec == spec:
             return path
 
@@ -344,36 +423,38 @@ def check_installed(self, spec):
             raise InconsistentInstallDirectoryError(
                 'Spec file in %s does not match hash!' % spec_file_path)
 
-    def all_specs(self):
+    def spec_files(self):
+        """Return the paths of the spec files of all the prefixes."""
         if not os.path.isdir(self.root):
             return []
 
-        specs = []
+        spec_files = []
         for _, path_scheme in self.projections.items():
             path_elems = ["*"] * len(path_scheme.split(os.sep))
             path_elems += [self.metadata_dir, self.spec_file_name]
             pattern = os.path.join(self.root, *path_elems)
-            spec_files = glob.glob(pattern)
-            specs.extend([self.read_spec(s) for s in spec_files])
-        return specs
+            spec_files.extend(glob.glob(pattern))
+        return spec_files
+
+    def all_specs(self):
+        return self.read_specs(self.spec_files())
 
     def all_deprecated_specs(self):
         if not os.path.isdir(self.root):
             return []
 
-        deprecated_specs = set()
+        spec_files = []
         for _, path_scheme in self.projections.items():
             path_elems = ["*"] * len(path_scheme.split(os.sep))
             path_elems += [self.metadata_dir, self.deprecated_dir,
                            '*_' + self.spec_file_name]
             pattern = os.path.join(self.root, *path_elems)
-            spec_files = glob.glob(pattern)
-            get_depr_spec_file = lambda x: os.path.join(
-                os.path.dirname(os.path.dirname(x)), self.spec_file_name)
-            deprecated_specs |= set((self.read_spec(s),
-                                     self.read_spec(get_depr_spec_file(s)))
-                                    for s in spec_files)
-        return deprecated_specs
+            spec_files.extend(glob.glob(pattern))
+        get_depr_spec_file = lambda x: os.path.join(
+            os.path.dirname(os.path.dirname(x)), self.spec_file_name)
+        specs = self.read_specs(
+            spec_files + [get_depr_spec_file(s) for s in spec_files])
+        return set(zip(specs[:len(spec_files)], specs[len(spec_files):]))
 
     def specs_by_hash(self):
         by_hash = {}
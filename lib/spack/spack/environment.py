@@ -1581,9 +1581,12 @@ def _read_lockfile_dict(self, d):
         json_specs_by_hash = d['concrete_specs']
         root_hashes = set(self.concretized_order)
 
+        # Nodes share their data with the specs of the same nodes read
+        # elsewhere in the process (see Spec.from_interned_node_dict())
         specs_by_hash = {}
         for dag_hash, node_dict in json_specs_by_hash.items():
-            specs_by_hash[dag_hash] = Spec.from_node_dict(node_dict)
+            specs_by_hash[dag_hash] = Spec.from_interned_node_dict(
+                node_dict, [])
 
         for dag_hash, node_dict in json_specs_by_hash.items():
             for dep_name, dep_hash, deptypes in (
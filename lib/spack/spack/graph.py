@@ -43,7 +43,6 @@
 
 """
 import sys
-from heapq import heapify, heappop, heappush
 
 from llnl.util.tty.color import ColorStream
 
@@ -56,42 +55,11 @@
 def topological_sort(spec, reverse=False, deptype='all'):
     """Topological sort for specs.
 
-    Return a list of dependency specs sorted topologically.  The spec
-    argument is not modified in the process.
+    Return a list of the names of the dependency specs sorted
+    topologically.  The spec argument is not modified in the process.
 
     """
-    deptype = canonical_deptype(deptype)
-
-    if not reverse:
-        parents = lambda s: s.dependents()
-        children = lambda s: s.dependencies()
-    else:
-        parents = lambda s: s.dependencies()
-        children = lambda s: s.dependents()
-
-    # Work on a copy so this is nondestructive.
-    spec = spec.copy(deps=deptype)
-    nodes = spec.index(deptype=deptype)
-
-    topo_order = []
-    par = dict((name, parents(nodes[name])) for name in nodes.keys())
-    remaining = [name for name in nodes.keys() if not parents(nodes[name])]
-    heapify(remaining)
-
-    while remaining:
-        name = heappop(remaining)
-        topo_order.append(name)
-
-        node = nodes[name]
-        for dep in children(node):
-            par[dep.name].remove(node)
-            if not par[dep.name]:
-                heappush(remaining, dep.name)
-
-    if any(par.get(s.name, []) for s in spec.traverse()):
-        raise ValueError("Spec has cycles!")
-    else:
-        return topo_order
+    return [s.name for s in spec.topological_order(deptype, reverse)]
 
 
 def find(seq, predicate):
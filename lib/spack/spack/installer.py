@@ -28,10 +28,13 @@
 """
 
 import copy
+import errno
 import glob
 import heapq
 import itertools
+import multiprocessing
 import os
+import select
 import shutil
 import six
 import sys
@@ -43,6 +46,7 @@
 import llnl.util.lock as lk
 import llnl.util.tty as tty
 import spack.binary_distribution as binary_distribution
+import spack.build_history
 import spack.compilers
 import spack.error
 import spack.hooks
@@ -50,6 +54,8 @@
 import spack.package_prefs as prefs
 import spack.repo
 import spack.store
+import spack.subprocess_context
+import spack.util.spack_json as sjson
 
 from llnl.util.tty.color import colorize
 from llnl.util.tty.log import log_output
@@ -82,6 +88,14 @@
 #: queue invariants).
 STATUS_REMOVED = 'removed'
 
+#: Build time, in seconds, assumed for packages with no recorded build time
+default_build_time = 60.0
+
+#: Maximum number of installed packages, and of seconds since the first of
+#: them was installed, whose database records are written together
+db_batch_size = 32
+db_batch_interval = 10.0
+
 
 def _check_last_phase(pkg):
     """
@@ -272,6 +286,23 @@ def _install_from_cache(pkg, cache_only, explicit, unsigned=False,
     """
     installed_from_cache = _try_install_from_binary_cache(
         pkg, explicit, unsigned=unsigned, full_hash_match=full_hash_match)
+    return _finish_install_from_cache(pkg, installed_from_cache, cache_only)
+
+
+def _finish_install_from_cache(pkg, installed_from_cache, cache_only):
+    """
+    Report the outcome of the attempt to install the package from binary
+    cache and, if it was installed, run its post-install hooks.
+
+    Args:
+        pkg (PackageBase): the package to install from the binary cache
+        installed_from_cache (bool): ``True`` if the package was extracted
+            from binary cache and added to the database
+        cache_only (bool): only extract from binary cache
+
+    Return:
+        (bool) ``installed_from_cache``
+    """
     pkg_id = package_id(pkg)
     if not installed_from_cache:
         pre = 'No binary for {0} found'.format(pkg_id)
@@ -357,6 +388,33 @@ def _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned,
         preferred_mirrors (list): Optional list of urls to prefer when
             attempting to download the tarball
 
+    Return:
+        (bool) ``True`` if the package was extracted from binary cache,
+            else ``False``
+    """
+    if not _extract_binary_cache_tarball(pkg, binary_spec, unsigned,
+                                         preferred_mirrors):
+        return False
+
+    pkg.installed_from_binary_cache = True
+    spack.store.db.add(pkg.spec, spack.store.layout, explicit=explicit)
+    return True
+
+
+def _extract_binary_cache_tarball(pkg, binary_spec, unsigned,
+                                  preferred_mirrors=None):
+    """
+    Download and extract the binary cache tarball without adding the package
+    to the database.
+
+    Args:
+        pkg (PackageBase): the package being installed
+        binary_spec (Spec): the spec  whose cache has been confirmed
+        unsigned (bool): ``True`` if binary package signatures to be checked,
+            otherwise, ``False``
+        preferred_mirrors (list): Optional list of urls to prefer when
+            attempting to download the tarball
+
     Return:
         (bool) ``True`` if the package was extracted from binary cache,
             else ``False``
@@ -373,8 +431,6 @@ def _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned,
     tty.msg('Extracting {0} from binary cache'.format(pkg_id))
     binary_distribution.extract_tarball(binary_spec, tarball, allow_root=False,
                                         unsigned=unsigned, force=False)
-    pkg.installed_from_binary_cache = True
-    spack.store.db.add(pkg.spec, spack.store.layout, explicit=explicit)
     return True
 
 
@@ -389,20 +445,37 @@ def _try_install_from_binary_cache(pkg, explicit, unsigned=False,
         unsigned (bool): ``True`` if binary package signatures to be checked,
             otherwise, ``False``
     """
+    binary_spec, preferred_mirrors = _find_binary(pkg, full_hash_match)
+    if binary_spec is None:
+        return False
+
+    return _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned,
+                                         preferred_mirrors=preferred_mirrors)
+
+
+def _find_binary(pkg, full_hash_match=False):
+    """
+    Look for the package in the binary caches of the configured mirrors.
+
+    Args:
+        pkg (PackageBase): the package to look for
+
+    Return:
+        (tuple) the spec of the binary package and the urls of the mirrors
+            providing it, or ``(None, None)`` if there is no binary package
+    """
     pkg_id = package_id(pkg)
     tty.debug('Searching for binary cache of {0}'.format(pkg_id))
     matches = binary_distribution.get_mirrors_for_spec(
         pkg.spec, force=False, full_hash_match=full_hash_match)
 
     if not matches:
-        return False
+        return None, None
 
     # In the absence of guidance from user or some other reason to prefer one
     # mirror over another, any match will suffice, so just pick the first one.
     preferred_mirrors = [match['mirror_url'] for match in matches]
-    binary_spec = matches[0]['spec']
-    return _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned,
-                                         preferred_mirrors=preferred_mirrors)
+    return matches[0]['spec'], preferred_mirrors
 
 
 def clear_failures():
@@ -640,6 +713,35 @@ def __init__(self, installs=[]):
         # fast then that option applies to all build requests.
         self.fail_fast = False
 
+        # Maximum number of source builds allowed to run at the same time,
+        # which is the largest number requested by the build requests.
+        self.concurrent_builds = 1
+
+        # Build processes in flight, keyed on the package's unique id, with
+        # values of (build task, build process) tuples
+        self.build_procs = {}
+
+        # Maximum number of packages whose sources are fetched in the
+        # background, which is the largest number requested by the build
+        # requests.
+        self.prefetch_jobs = 0
+
+        # Build tasks whose sources are yet to be fetched in the background,
+        # in order, and the fetch processes in flight, keyed on the
+        # package's unique id
+        self.prefetch_queue = []
+        self.prefetches = {}
+
+        # Installed packages whose database records are yet to be written,
+        # and so are still write locked, and when the first was installed
+        self.unflushed = []
+        self.unflushed_since = None
+
+        # Explicit package ids and errors for installs that failed, or whose
+        # prefix already existed, to summarize at the end of the install
+        self.failed_explicits = []
+        self.exists_errors = []
+
     def __repr__(self):
         """Returns a formal representation of the package installer."""
         rep = '{0}('.format(self.__class__.__name__)
@@ -860,10 +962,39 @@ def _cleanup_task(self, pkg):
         """
         self._remove_task(package_id(pkg))
 
+        # Keep the write lock until the database record is written so other
+        # processes do not mistake the prefix for a partial installation.
+        if spack.store.db.is_pending(pkg.spec):
+            if not self.unflushed:
+                self.unflushed_since = time.time()
+            self.unflushed.append(pkg)
+            return
+
         # Ensure we have a read lock to prevent others from uninstalling the
         # spec during our installation.
         self._ensure_locked('read', pkg)
 
+    def _flush_db(self):
+        """
+        Write the pending database records of installed packages and
+        downgrade their write locks to read locks.
+        """
+        spack.store.db.flush()
+        for pkg in self.unflushed:
+            self._ensure_locked('read', pkg)
+        self.unflushed = []
+        self.unflushed_since = None
+
+    def _flush_db_if_due(self):
+        """
+        Write the pending database records once there are ``db_batch_size``
+        of them or the oldest is ``db_batch_interval`` seconds old.
+        """
+        if self.unflushed and (
+                len(self.unflushed) >= db_batch_size or
+                time.time() - self.unflushed_since >= db_batch_interval):
+            self._flush_db()
+
     def _ensure_install_ready(self, pkg):
         """
         Ensure the package is ready to install locally, which includes
@@ -925,8 +1056,9 @@ def _ensure_locked(self, lock_type, pkg):
             # Wait until the other process finishes if there are no more
             # build tasks with priority 0 (i.e., with no uninstalled
             # dependencies).
+            # Also do not wait while our own builds are in flight.
             no_p0 = len(self.build_tasks) == 0 or not self._next_is_pri0()
-            timeout = None if no_p0 else 3
+            timeout = None if no_p0 and not self.build_procs else 3
         else:
             timeout = 1e-9  # Near 0 to iterate through install specs quickly
 
@@ -1074,19 +1206,29 @@ def _add_tasks(self, request, all_deps):
         fail_fast = request.install_args.get('fail_fast')
         self.fail_fast = self.fail_fast or fail_fast
 
-    def _install_task(self, task):
+        # Allow as many concurrent builds as the most demanding request.
+        concurrent_builds = request.install_args.get('concurrent_builds') or 1
+        self.concurrent_builds = max(self.concurrent_builds, concurrent_builds)
+
+        prefetch_jobs = request.install_args.get('prefetch_jobs') or 0
+        self.prefetch_jobs = max(self.prefetch_jobs, prefetch_jobs)
+
+    def _install_task(self, task, wait=True):
         """
         Perform the installation of the requested spec and/or dependency
         represented by the build task.
 
         Args:
-            task (BuildTask): the installation build task for a package"""
+            task (BuildTask): the installation build task for a package
+            wait (bool): ``True`` to wait for the installation from binary
+                cache or build from source to finish; otherwise, the
+                installation process is left running in ``build_procs`` for
+                ``_complete_build`` to finish it"""
 
         install_args = task.request.install_args
         cache_only = install_args.get('cache_only')
         explicit = task.explicit
         full_hash_match = install_args.get('full_hash_match')
-        tests = install_args.get('tests')
         unsigned = install_args.get('unsigned')
         use_cache = install_args.get('use_cache')
 
@@ -1097,14 +1239,37 @@ def _install_task(self, task):
         task.status = STATUS_INSTALLING
 
         # Use the binary cache if requested
-        if use_cache and \
-                _install_from_cache(pkg, cache_only, explicit, unsigned,
-                                    full_hash_match):
-            self._update_installed(task)
-            if task.compiler:
-                spack.compilers.add_compilers_to_config(
-                    spack.compilers.find_compilers([pkg.spec.prefix]))
-            return
+        if use_cache:
+            if not wait:
+                # Download and extract the binary package alongside other
+                # installs but leave adding it to the database (in
+                # dependency order) to the parent.
+                process = spack.build_environment.BuildProcess(
+                    pkg, binary_process, install_args, forward_stdin=False,
+                    setup_env=False)
+                self.build_procs[pkg_id] = (task, process.start())
+                return
+
+            if _install_from_cache(pkg, cache_only, explicit, unsigned,
+                                   full_hash_match):
+                self._update_installed(task)
+                self._register_compiler(task)
+                return
+
+        self._build_from_source(task, wait)
+
+    def _build_from_source(self, task, wait=True):
+        """
+        Build the package of the build task from source.
+
+        Args:
+            task (BuildTask): the installation build task for a package
+            wait (bool): ``True`` to wait for the build to finish; otherwise,
+                the build process is left running in ``build_procs`` for
+                ``_complete_build`` to finish it"""
+        install_args = task.request.install_args
+        tests = install_args.get('tests')
+        pkg, pkg_id = task.pkg, task.pkg_id
 
         pkg.run_tests = (tests is True or tests and pkg.name in tests)
 
@@ -1116,6 +1281,17 @@ def _install_task(self, task):
         try:
             self._setup_install_dir(pkg)
 
+            if not wait:
+                # Leave the child process running alongside any others.
+                # Stdin is not forwarded since builds would compete for it.
+                process = spack.build_environment.BuildProcess(
+                    pkg, build_process, install_args, forward_stdin=False)
+                self.build_procs[pkg_id] = (task, process.start())
+                return
+
+            # Do not leave records pending for the duration of the build.
+            self._flush_db()
+
             # Create a child process to do the actual installation.
             # Preserve verbosity settings across installs.
             spack.package.PackageBase._verbose = (
@@ -1123,22 +1299,162 @@ def _install_task(self, task):
                     pkg, build_process, install_args)
             )
 
-            # Note: PARENT of the build process adds the new package to
-            # the database, so that we don't need to re-read from file.
+            self._register_build(task)
+        except spack.build_environment.StopPhase as e:
+            self._stop_phase(pkg, e)
+
+    def _register_build(self, task):
+        """
+        Add the package just built from source to the database and, if it
+        is a compiler, to the configuration.
+
+        Args:
+            task (BuildTask): the build task for the built package
+        """
+        pkg = task.pkg
+
+        # Note: PARENT of the build process adds the new package to
+        # the database, so that we don't need to re-read from file.
+        spack.store.db.add(pkg.spec, spack.store.layout,
+                           explicit=task.explicit)
+        self._record_build_history(pkg)
+        self._register_compiler(task)
+
+    def _register_binary(self, task, extracted):
+        """
+        Add the package just extracted from binary cache to the database
+        and, if it is a compiler, to the configuration.  Build the package
+        from source instead if it was not available in the binary cache.
+
+        Args:
+            task (BuildTask): the build task for the package
+            extracted (bool): ``True`` if the package was extracted from
+                binary cache, otherwise ``False``
+        """
+        pkg = task.pkg
+        if extracted:
+            pkg.installed_from_binary_cache = True
             spack.store.db.add(pkg.spec, spack.store.layout,
-                               explicit=explicit)
+                               explicit=task.explicit)
+
+        cache_only = task.request.install_args.get('cache_only')
+        if _finish_install_from_cache(pkg, extracted, cache_only):
+            self._register_compiler(task)
+        else:
+            self._build_from_source(task, wait=False)
+
+    def _register_compiler(self, task):
+        """
+        Add the package just installed to the compiler configuration if it
+        is a compiler.
+
+        Args:
+            task (BuildTask): the build task for the installed package
+        """
+        if task.compiler:
+            spack.compilers.add_compilers_to_config(
+                spack.compilers.find_compilers([task.pkg.spec.prefix]))
 
-            # If a compiler, ensure it is added to the configuration
-            if task.compiler:
-                spack.compilers.add_compilers_to_config(
-                    spack.compilers.find_compilers([pkg.spec.prefix]))
+    def _record_build_history(self, pkg):
+        """
+        Append the times and resource usage of the package just built from
+        source to the build history of the install tree.
+
+        Args:
+            pkg (Package): the package that was built
+        """
+        if not os.path.exists(pkg.times_log_path):
+            return
+
+        try:
+            with open(pkg.times_log_path) as times_file:
+                times = sjson.load(times_file)
+            spack.store.history.add(pkg.spec, times)
+        except Exception as e:
+            tty.warn('Could not record the build of {0} in the build history: '
+                     '{1}'.format(package_id(pkg), str(e)))
+
+    def _stop_phase(self, pkg, exc):
+        """
+        Report the early termination of the package's build.
+
+        A StopPhase exception means that do_install was asked to stop early
+        from clients, and is not an error at this point.
+
+        Args:
+            pkg (PackageBase): the package whose build was stopped
+            exc (StopPhase): the associated exception
+        """
+        pid = '{0}: '.format(pkg.pid) if tty.show_pid() else ''
+        tty.debug('{0}{1}'.format(pid, str(exc)))
+        tty.debug('Package stage directory: {0}'
+                  .format(pkg.stage.source_path))
+
+    def _complete_build(self, task, process):
+        """
+        Wait for the build process started for the task to finish and
+        register the resulting installation.
+
+        Args:
+            task (BuildTask): the build task for the package
+            process (BuildProcess): the associated build process
+        """
+        tty.debug('Completing the build of {0}'.format(task.pkg_id))
+        try:
+            result = process.complete()
+            if process.function is binary_process:
+                self._register_binary(task, result)
+                return
+
+            # Preserve verbosity settings across installs.
+            spack.package.PackageBase._verbose = result
+            self._register_build(task)
         except spack.build_environment.StopPhase as e:
-            # A StopPhase exception means that do_install was asked to
-            # stop early from clients, and is not an error at this point
-            pid = '{0}: '.format(pkg.pid) if tty.show_pid() else ''
-            tty.debug('{0}{1}'.format(pid, str(e)))
-            tty.debug('Package stage directory: {0}'
-                      .format(pkg.stage.source_path))
+            self._stop_phase(task.pkg, e)
+
+    def _wait_for_build(self):
+        """
+        Wait for at least one of the build processes in flight to finish.
+
+        Return:
+            (BuildTask, BuildProcess) tuple for a finished build
+        """
+        procs = dict((process.fileno(), pkg_id) for pkg_id, (_, process)
+                     in self.build_procs.items())
+        tty.debug('Waiting for one of {0} builds to finish'
+                  .format(len(procs)))
+        while True:
+            # Write pending database records once due while waiting.
+            timeout = None
+            if self.unflushed:
+                timeout = max(0.0, self.unflushed_since + db_batch_interval -
+                              time.time())
+            try:
+                ready, _, _ = select.select(list(procs), [], [], timeout)
+            except select.error as exc:
+                # Retry if interrupted by a signal (for Python < 3.5).
+                if exc.args[0] != errno.EINTR:
+                    raise
+                continue
+            if ready:
+                break
+            self._flush_db()
+        return self.build_procs.pop(procs[ready[0]])
+
+    def _terminate_builds(self):
+        """Terminate any build processes that are still running."""
+        for pkg_id, (task, process) in self.build_procs.items():
+            tty.warn('Terminating the build of {0}'.format(pkg_id))
+            try:
+                process.terminate()
+            except Exception as exc:
+                tty.warn('{0} exception when terminating the build of {1}: '
+                         '{2}'.format(exc.__class__.__name__, pkg_id,
+                                      str(exc)))
+            finally:
+                if not task.request.install_args.get('keep_prefix'):
+                    task.pkg.remove_prefix()
+        self.build_procs.clear()
 
     def _next_is_pri0(self):
         """
@@ -1382,38 +1698,338 @@ def _init_queue(self):
                 for dependent_id in dependents.difference(task.dependents):
                     task.add_dependent(dependent_id)
 
+        self._prioritize_critical_paths()
+        self._start_prefetches()
+
+    def _start_prefetches(self):
+        """
+        Queue the packages that are to be installed for downloading their
+        binary packages or fetching their sources in the background, in the
+        order they will likely be installed, and start the first
+        ``prefetch_jobs`` fetches.
+        """
+        if not self.prefetch_jobs:
+            return
+
+        checksum = spack.config.get('config:checksum')
+        for _, task in sorted(self.build_pq):
+            pkg, install_args = task.pkg, task.request.install_args
+            if task.pkg_id in self.installed or install_args.get('fake') or \
+                    pkg.spec.external or pkg.installed_upstream or \
+                    pkg.installed:
+                continue
+
+            # Leave fetches that may prompt the user to the build, and do
+            # not fetch development sources.
+            sources = pkg.has_code and not install_args.get('cache_only') \
+                and not (checksum and pkg.version not in pkg.versions) \
+                and pkg.stage.managed_by_spack
+
+            use_cache = install_args.get('use_cache')
+            if not (sources or use_cache):
+                continue
+
+            self.prefetch_queue.append((task, {
+                'use_cache': use_cache,
+                'full_hash_match': install_args.get('full_hash_match'),
+                'sources': sources,
+            }))
+
+        tty.debug('Fetching {0} packages in the background'
+                  .format(len(self.prefetch_queue)))
+        self._schedule_prefetches()
+
+    def _schedule_prefetches(self):
+        """Reap finished background fetches and start queued ones."""
+        for pkg_id, process in list(self.prefetches.items()):
+            if not process.is_alive():
+                process.join()
+                del self.prefetches[pkg_id]
+
+        while self.prefetch_queue and \
+                len(self.prefetches) < self.prefetch_jobs:
+            task, kwargs = self.prefetch_queue.pop(0)
+            # Fetchers change the working directory, so each fetch runs in
+            # its own process, which gets the same configuration, repos,
+            # etc. as builds do, whatever the start method.
+            serialized_pkg = spack.subprocess_context.PackageInstallContext(
+                task.pkg)
+            process = multiprocessing.Process(
+                target=_prefetch_in_child, args=(serialized_pkg, kwargs))
+            process.start()
+            self.prefetches[task.pkg_id] = process
+
+    def _wait_for_prefetch(self, task):
+        """
+        Make sure no background fetch for the package is running, or will
+        be started, so its stage is not modified while preparing for the
+        install.  Anything that was not fetched yet is fetched by the
+        install.
+
+        Args:
+            task (BuildTask): the build task for the package
+        """
+        self.prefetch_queue = [(t, kwargs) for t, kwargs in self.prefetch_queue
+                               if t.pkg_id != task.pkg_id]
+        process = self.prefetches.pop(task.pkg_id, None)
+        if process is not None:
+            if process.is_alive():
+                tty.debug('Waiting for the sources of {0}'
+                          .format(task.pkg_id))
+            process.join()
+
+    def _stop_prefetches(self):
+        """Stop all background fetches."""
+        self.prefetch_queue = []
+        for process in self.prefetches.values():
+            process.terminate()
+            process.join()
+        self.prefetches = {}
+
+    def _prioritize_critical_paths(self):
+        """
+        Order the build tasks with no uninstalled dependencies by the
+        estimated time needed to build them and their transitive dependents
+        (i.e., by their remaining critical path), longest first.
+
+        Estimates are based on the times recorded in the build history for
+        previous builds of the same packages, preferably of the same version.
+        """
+        tasks = self.build_tasks
+        times = spack.store.history.build_times(
+            set(t.pkg.name for t in tasks.values()))
+
+        def build_time(pkg):
+            for key in ((pkg.name, pkg.version), (pkg.name, None)):
+                if key in times:
+                    return times[key]
+            return default_build_time
+
+        paths = {}
+
+        def critical_path(task):
+            if task.pkg_id not in paths:
+                dependents = [critical_path(tasks[dep_id])
+                              for dep_id in task.dependents
+                              if dep_id in tasks]
+                paths[task.pkg_id] = build_time(task.pkg) + max(
+                    dependents or [0.0])
+            return paths[task.pkg_id]
+
+        for task in tasks.values():
+            task.critical_path = critical_path(task)
+
+        self.build_pq = [(task.key, task) for task in tasks.values()]
+        heapq.heapify(self.build_pq)
+
+    def _overwrite_install_task(self, task):
+        """
+        Perform the installation of a spec that is to be overwritten, which
+        replaces any existing installation transactionally.
+
+        Args:
+            task (BuildTask): the installation build task for a package
+        """
+        rec, _ = self._check_db(task.pkg.spec)
+        if rec and rec.installed:
+            if rec.installation_time < task.request.overwrite_time:
+                # If it's actually overwriting, do a fs transaction
+                if os.path.exists(rec.path):
+                    with fs.replace_directory_transaction(rec.path):
+                        self._install_task(task)
+                else:
+                    tty.debug("Missing installation to overwrite")
+                    self._install_task(task)
+        else:
+            # overwriting nothing
+            self._install_task(task)
+
+    def _run_install(self, task, install):
+        """
+        Run (the rest of) the installation of the package and update the
+        installer's state based on the outcome.
+
+        If ``install`` leaves a build process running for the package, the
+        outcome is not known yet so the state is left as is.
+
+        Args:
+            task (BuildTask): the installation build task for a package
+            install (callable): argless function performing the installation
+        """
+        pkg, pkg_id = task.pkg, task.pkg_id
+        keep_prefix = task.request.install_args.get('keep_prefix')
+        fail_fast_err = 'Terminating after first install failure'
+        single_explicit_spec = len(self.build_requests) == 1
+        in_progress = False
+
+        try:
+            install()
+
+            # The build continues in its own process.
+            in_progress = pkg_id in self.build_procs
+            if in_progress:
+                return
+
+            self._update_installed(task)
+
+            # If we installed then we should keep the prefix
+            stop_before_phase = getattr(pkg, 'stop_before_phase', None)
+            last_phase = getattr(pkg, 'last_phase', None)
+            keep_prefix = keep_prefix or \
+                (stop_before_phase is None and last_phase is None)
+
+        except spack.directory_layout.InstallDirectoryAlreadyExistsError \
+                as exc:
+            tty.debug('Install prefix for {0} exists, keeping {1} in '
+                      'place.'.format(pkg.name, pkg.prefix))
+            self._update_installed(task)
+
+            # Only terminate at this point if a single build request was
+            # made.
+            if task.explicit and single_explicit_spec:
+                raise
+
+            if task.explicit:
+                self.exists_errors.append((pkg_id, str(exc)))
+
+        except KeyboardInterrupt as exc:
+            # The build has been terminated with a Ctrl-C so terminate
+            # regardless of the number of remaining specs.
+            err = 'Failed to install {0} due to {1}: {2}'
+            tty.error(err.format(pkg.name, exc.__class__.__name__,
+                      str(exc)))
+            raise
+
+        except (Exception, SystemExit) as exc:
+            self._update_failed(task, True, exc)
+
+            # Best effort installs suppress the exception and mark the
+            # package as a failure.
+            if (not isinstance(exc, spack.error.SpackError) or
+                not exc.printed):
+                # SpackErrors can be printed by the build process or at
+                # lower levels -- skip printing if already printed.
+                # TODO: sort out this and SpackError.print_context()
+                tty.error('Failed to install {0} due to {1}: {2}'
+                          .format(pkg.name, exc.__class__.__name__,
+                                  str(exc)))
+            # Terminate if requested to do so on the first failure.
+            if self.fail_fast:
+                raise InstallError('{0}: {1}'
+                                   .format(fail_fast_err, str(exc)))
+
+            # Terminate at this point if the single explicit spec has
+            # failed to install.
+            if single_explicit_spec and task.explicit:
+                raise
+
+            # Track explicit spec id and error to summarize when done
+            if task.explicit:
+                self.failed_explicits.append((pkg_id, str(exc)))
+
+        finally:
+            if not in_progress:
+                # Remove the install prefix if anything went wrong during
+                # install.
+                if not keep_prefix:
+                    pkg.remove_prefix()
+
+                # The subprocess *may* have removed the build stage. Mark it
+                # not created so that the next time pkg.stage is invoked, we
+                # check the filesystem for it.
+                pkg.stage.created = False
+
+        # Perform basic task cleanup for the installed spec to
+        # include downgrading the write to a read lock
+        self._cleanup_task(pkg)
+
     def install(self):
         """
         Install the requested package(s) and or associated dependencies.
 
+        Up to ``concurrent_builds`` packages whose dependencies are all
+        installed are built from source at the same time, while the sources
+        of up to ``prefetch_jobs`` packages are fetched in the background.
+
         Args:
             pkg (Package): the package to be built and installed"""
         self._init_queue()
 
         fail_fast_err = 'Terminating after first install failure'
-        single_explicit_spec = len(self.build_requests) == 1
-        failed_explicits = []
-        exists_errors = []
+        self.failed_explicits = []
+        self.exists_errors = []
+
+        try:
+            # Database records are written in batches (see _cleanup_task)
+            with spack.store.db.batched_writes():
+                self._install_tasks(fail_fast_err)
+        finally:
+            # Do not leave builds running if anything went wrong
+            if self.build_procs:
+                self._terminate_builds()
+            self._stop_prefetches()
+            self._flush_db()
+
+        # Cleanup, which includes releasing all of the read locks
+        self._cleanup_all_tasks()
+
+        # Ensure we properly report if one or more explicit specs failed
+        if self.exists_errors or self.failed_explicits:
+            for pkg_id, err in self.exists_errors:
+                tty.error('{0}: {1}'.format(pkg_id, err))
+
+            for pkg_id, err in self.failed_explicits:
+                tty.error('{0}: {1}'.format(pkg_id, err))
+
+            raise InstallError('Installation request failed.  Refer to '
+                               'recent errors for specific package(s).')
+
+    def _install_tasks(self, fail_fast_err):
+        """
+        Process the build tasks until the queue is empty and no builds are
+        left in flight.
+
+        Args:
+            fail_fast_err (str): message for terminating on first failure
+        """
+        while self.build_pq or self.build_procs:
+            if self.prefetch_queue or self.prefetches:
+                self._schedule_prefetches()
+
+            self._flush_db_if_due()
+
+            # Finish a build in flight once the maximum number of concurrent
+            # builds is reached or no other build task is ready to go.
+            if self.build_procs and (
+                    len(self.build_procs) >= self.concurrent_builds or
+                    not self.build_tasks or not self._next_is_pri0()):
+                task, process = self._wait_for_build()
+                self._run_install(
+                    task, lambda: self._complete_build(task, process))
+                continue
 
-        while self.build_pq:
             task = self._pop_task()
             if task is None:
                 continue
 
-            install_args = task.request.install_args
-            keep_prefix = install_args.get('keep_prefix')
-
             pkg, pkg_id, spec = task.pkg, task.pkg_id, task.pkg.spec
             tty.verbose('Processing {0}: task={1}'.format(pkg_id, task))
             # Ensure that the current spec has NO uninstalled dependencies,
             # which is assumed to be reflected directly in its priority.
             #
-            # If the spec has uninstalled dependencies, then there must be
-            # a bug in the code (e.g., priority queue or uninstalled
+            # Dependencies may still be building in our own processes, in
+            # which case the task is requeued until they are done.
+            #
+            # Otherwise, if the spec has uninstalled dependencies, then there
+            # must be a bug in the code (e.g., priority queue or uninstalled
             # dependencies handling).  So terminate under the assumption that
             # all subsequent tasks will have non-zero priorities or may be
             # dependencies of this task.
             if task.priority != 0:
+                if self.build_procs:
+                    self._push_task(task)
+                    continue
+
                 tty.error('Detected uninstalled dependencies for {0}: {1}'
                           .format(pkg_id, task.uninstalled_deps))
                 left = [dep_id for dep_id in task.uninstalled_deps if
@@ -1470,6 +2086,7 @@ def install(self):
                 task.request.overwrite_time = time.time()
 
             # Determine state of installation artifacts and adjust accordingly.
+            self._wait_for_prefetch(task)
             self._prepare_for_install(task)
 
             # Flag an already installed package
@@ -1513,111 +2130,88 @@ def install(self):
                 continue
 
             # Proceed with the installation since we have an exclusive write
-            # lock on the package.
-            try:
-                if pkg.spec.dag_hash() in task.request.overwrite:
-                    rec, _ = self._check_db(pkg.spec)
-                    if rec and rec.installed:
-                        if rec.installation_time < task.request.overwrite_time:
-                            # If it's actually overwriting, do a fs transaction
-                            if os.path.exists(rec.path):
-                                with fs.replace_directory_transaction(
-                                        rec.path):
-                                    self._install_task(task)
-                            else:
-                                tty.debug("Missing installation to overwrite")
-                                self._install_task(task)
-                    else:
-                        # overwriting nothing
-                        self._install_task(task)
-                else:
-                    self._install_task(task)
-
-                self._update_installed(task)
+            # lock on the package.  Overwrites are always performed in the
+            # foreground since they replace the existing installation.
+            if pkg.spec.dag_hash() in task.request.overwrite:
+                install = lambda: self._overwrite_install_task(task)
+            elif self.concurrent_builds > 1:
+                install = lambda: self._install_task(task, wait=False)
+            else:
+                install = lambda: self._install_task(task)
+            self._run_install(task, install)
 
-                # If we installed then we should keep the prefix
-                stop_before_phase = getattr(pkg, 'stop_before_phase', None)
-                last_phase = getattr(pkg, 'last_phase', None)
-                keep_prefix = keep_prefix or \
-                    (stop_before_phase is None and last_phase is None)
 
-            except spack.directory_layout.InstallDirectoryAlreadyExistsError \
-                    as exc:
-                tty.debug('Install prefix for {0} exists, keeping {1} in '
-                          'place.'.format(pkg.name, pkg.prefix))
-                self._update_installed(task)
-
-                # Only terminate at this point if a single build request was
-                # made.
-                if task.explicit and single_explicit_spec:
-                    raise
+def _prefetch_in_child(serialized_pkg, kwargs):
+    """
+    Restore the package in a child process and fetch it with ``_prefetch``.
 
-                if task.explicit:
-                    exists_errors.append((pkg_id, str(exc)))
+    Args:
+        serialized_pkg (PackageInstallContext): the package to fetch, with
+            the state of the parent process
+        kwargs (dict): arguments of ``_prefetch``
+    """
+    _prefetch(serialized_pkg.restore(), kwargs)
 
-            except KeyboardInterrupt as exc:
-                # The build has been terminated with a Ctrl-C so terminate
-                # regardless of the number of remaining specs.
-                err = 'Failed to install {0} due to {1}: {2}'
-                tty.error(err.format(pkg.name, exc.__class__.__name__,
-                          str(exc)))
-                raise
 
-            except (Exception, SystemExit) as exc:
-                self._update_failed(task, True, exc)
-
-                # Best effort installs suppress the exception and mark the
-                # package as a failure.
-                if (not isinstance(exc, spack.error.SpackError) or
-                    not exc.printed):
-                    # SpackErrors can be printed by the build process or at
-                    # lower levels -- skip printing if already printed.
-                    # TODO: sort out this and SpackError.print_context()
-                    tty.error('Failed to install {0} due to {1}: {2}'
-                              .format(pkg.name, exc.__class__.__name__,
-                                      str(exc)))
-                # Terminate if requested to do so on the first failure.
-                if self.fail_fast:
-                    raise InstallError('{0}: {1}'
-                                       .format(fail_fast_err, str(exc)))
+def _prefetch(pkg, kwargs):
+    """
+    Download the binary package or, if there is none, fetch the sources
+    (and patches) of a package ahead of its install.
 
-                # Terminate at this point if the single explicit spec has
-                # failed to install.
-                if single_explicit_spec and task.explicit:
-                    raise
+    This runs in a separate process.  Failures are left for the install to
+    report, since it fetches anything that is still missing.
 
-                # Track explicit spec id and error to summarize when done
-                if task.explicit:
-                    failed_explicits.append((pkg_id, str(exc)))
+    Args:
+        pkg (Package): the package to fetch
+        kwargs (dict): ``use_cache`` and ``full_hash_match`` to look for the
+            binary package as the install does, and ``sources`` to fetch the
+            sources if there is no binary package
 
-            finally:
-                # Remove the install prefix if anything went wrong during
-                # install.
-                if not keep_prefix:
-                    pkg.remove_prefix()
+    Return:
+        (bool) ``True`` if the binary package or sources were fetched,
+            ``False`` otherwise
+    """
+    pkg_id = package_id(pkg)
+    try:
+        if kwargs.get('use_cache'):
+            binary_spec, preferred_mirrors = _find_binary(
+                pkg, kwargs.get('full_hash_match', False))
+            if binary_spec is not None:
+                return binary_distribution.download_tarball(
+                    binary_spec, preferred_mirrors) is not None
+
+        if kwargs.get('sources'):
+            pkg.do_fetch()
+            return True
+    except Exception as e:
+        tty.debug('Fetching {0} ahead of its install failed: {1}'
+                  .format(pkg_id, str(e)))
+    return False
 
-                # The subprocess *may* have removed the build stage. Mark it
-                # not created so that the next time pkg.stage is invoked, we
-                # check the filesystem for it.
-                pkg.stage.created = False
 
-            # Perform basic task cleanup for the installed spec to
-            # include downgrading the write to a read lock
-            self._cleanup_task(pkg)
+def binary_process(pkg, kwargs):
+    """
+    Download and extract the package from binary cache, if available.
 
-        # Cleanup, which includes releasing all of the read locks
-        self._cleanup_all_tasks()
+    This runs in a separate process, which is started without setting up
+    the build environment.  The package is added to the database by the
+    parent process.
 
-        # Ensure we properly report if one or more explicit specs failed
-        if exists_errors or failed_explicits:
-            for pkg_id, err in exists_errors:
-                tty.error('{0}: {1}'.format(pkg_id, err))
+    Args:
+        pkg (PackageBase): the package to extract from the binary cache
+        kwargs (dict): install arguments of the package
 
-            for pkg_id, err in failed_explicits:
-                tty.error('{0}: {1}'.format(pkg_id, err))
+    Return:
+        (bool) ``True`` if the package was extracted from binary cache,
+            otherwise ``False``
+    """
+    binary_spec, preferred_mirrors = _find_binary(
+        pkg, kwargs.get('full_hash_match', False))
+    if binary_spec is None:
+        return False
 
-            raise InstallError('Installation request failed.  Refer to '
-                               'recent errors for specific package(s).')
+    return _extract_binary_cache_tarball(
+        pkg, binary_spec, kwargs.get('unsigned', False), preferred_mirrors)
 
 
 def build_process(pkg, kwargs):
@@ -1636,6 +2230,7 @@ def build_process(pkg, kwargs):
     verbose = kwargs.get('verbose', False)
 
     start_time = time.time()
+    start_usage = spack.build_history.resource_usage()
     if not fake:
         if not skip_patch:
             pkg.do_patch()
@@ -1693,6 +2288,7 @@ def build_process(pkg, kwargs):
 
                 # Spawn a daemon that reads from a pipe and redirects
                 # everything to log_path
+                phases = []
                 with log_output(pkg.log_path, echo, True,
                                 env=unmodified_env) as logger:
 
@@ -1707,12 +2303,29 @@ def build_process(pkg, kwargs):
                             tty.set_debug(inner_debug_level)
 
                         # Redirect stdout and stderr to daemon pipe
+                        phase_usage = spack.build_history.resource_usage()
                         phase = getattr(pkg, phase_attr)
                         phase(pkg.spec, pkg.prefix)
 
+                        usage = spack.build_history.usage_since(phase_usage)
+                        usage['name'] = phase_name
+                        phases.append(usage)
+
             echo = logger.echo
             log(pkg)
 
+            # Record the times and resource usage for scheduling future
+            # installs of the package and for the build history, before the
+            # install manifest is written by post-install hooks.
+            total_time = time.time() - start_time
+            times = spack.build_history.usage_since(start_usage)
+            times.update({'fetch': pkg._fetch_time,
+                          'build': total_time - pkg._fetch_time,
+                          'total': total_time,
+                          'phases': phases})
+            with open(pkg.times_log_path, 'w') as times_file:
+                sjson.dump(times, times_file)
+
         # Run post install hooks before build stage is removed.
         spack.hooks.post_install(pkg.spec)
 
@@ -1827,6 +2440,11 @@ def __init__(self, pkg, request, compiler, start, attempts, status,
         self.uninstalled_deps = set(pkg_id for pkg_id in self.dependencies if
                                     pkg_id not in installed)
 
+        # Estimated time, in seconds, to build the package and everything
+        # that depends on it, which is set by the installer to start long
+        # chains of builds first.
+        self.critical_path = 0.0
+
         # Ensure key sequence-related properties are updated accordingly.
         self.attempts = 0
         self._update()
@@ -1905,8 +2523,9 @@ def explicit(self):
 
     @property
     def key(self):
-        """The key is the tuple (# uninstalled dependencies, sequence)."""
-        return (self.priority, self.sequence)
+        """The key is the tuple (# uninstalled dependencies, negated
+        critical path, sequence)."""
+        return (self.priority, -self.critical_path, self.sequence)
 
     def next_attempt(self, installed):
         """Create a new, updated task for the next installation attempt."""
@@ -1983,6 +2602,8 @@ def __str__(self):
     def _add_default_args(self):
         """Ensure standard install options are set to at least the default."""
         for arg, default in [('cache_only', False),
+                             ('concurrent_builds', 1),
+                             ('prefetch_jobs', 0),
                              ('context', 'build'),  # installs *always* build
                              ('dirty', False),
                              ('fail_fast', False),
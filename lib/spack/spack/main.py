@@ -34,6 +34,7 @@
 import spack.environment as ev
 import spack.paths
 import spack.repo
+import spack.spec
 import spack.store
 import spack.util.debug
 import spack.util.path
@@ -604,6 +605,10 @@ def _profile_wrapper(command, parser, args, unknown_args):
         stats.sort_stats(*sortby)
         stats.print_stats(nlines)
 
+        tty.msg('Spec.satisfies() cache: {0}'.format(
+            spack.spec.satisfies_cache))
+        tty.msg('Spec parse cache: {0}'.format(spack.spec.parse_cache))
+
 
 def print_setup_info(*info):
     """Print basic information needed by setup-env.[c]sh.
@@ -73,6 +73,9 @@
 # Filename for the Spack configure args file.
 _spack_configure_argsfile = 'spack-configure-args.txt'
 
+# Filename for the Spack install times file.
+_spack_times_log = 'install_times.json'
+
 
 class InstallPhase(object):
     """Manages a single phase of the installation.
@@ -1088,6 +1091,11 @@ def install_configure_args_path(self):
         """Return the configure args file path on successful installation."""
         return os.path.join(self.metadata_dir, _spack_configure_argsfile)
 
+    @property
+    def times_log_path(self):
+        """Return the times log json file."""
+        return os.path.join(self.metadata_dir, _spack_times_log)
+
     @property
     def install_test_root(self):
         """Return the install test root directory."""
@@ -1658,6 +1666,8 @@ def do_install(self, **kwargs):
 
         Args:
             cache_only (bool): Fail if binary package unavailable.
+            concurrent_builds (int): Maximum number of packages to build from
+                source at the same time (default 1).
             dirty (bool): Don't clean the build environment before installing.
             explicit (bool): True if package was explicitly installed, False
                 if package was implicitly installed (as a dependency).
@@ -1675,6 +1685,8 @@ def do_install(self, **kwargs):
             keep_stage (bool): By default, stage is destroyed only if there
                 are no exceptions during build. Set to True to keep the stage
                 even with exceptions.
+            prefetch_jobs (int): Number of packages whose sources are fetched
+                in the background ahead of their builds (default 0).
             restage (bool): Force spack to restage the package source.
             skip_patch (bool): Skip patch stage of build if True.
             stop_before (InstallPhase): stop execution before this
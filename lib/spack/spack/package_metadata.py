@@ -0,0 +1,293 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Index of the metadata that directives declare in package classes.
+
+Commands that need to look at every package in a repository (e.g.,
+``spack dependents``, ``spack maintainers`` or ``spack list -d``) only
+need what the directives of each package evaluated to: versions,
+variants, dependencies, conflicts, provided virtuals, patches, etc.
+Importing thousands of ``package.py`` files to get it is slow, so the
+``MetadataIndex`` keeps it in the misc cache, where it is updated like
+the other indexes of a ``RepoIndex``.
+
+The metadata of each package is read through ``PackageMetadata``, which
+holds only strings and plain data: specs and versions are kept in their
+string form, and variant values given as callables are not recorded.
+"""
+import os
+
+import six
+
+import spack.paths
+import spack.repo
+import spack.util.spack_json as sjson
+import spack.variant
+from spack.version import Version
+
+#: Files outside of the repositories whose changes may change the metadata
+#: of the packages (e.g., variants added by build systems)
+core_modules = [
+    os.path.join(spack.paths.module_path, 'directives.py'),
+    os.path.join(spack.paths.module_path, 'package.py'),
+    spack.paths.build_systems_path,
+]
+
+_scalar_types = six.string_types + (bool, int, float, type(None))
+
+
+def _scalar(value):
+    """Return the value if JSON can store it as is, else its string."""
+    return value if isinstance(value, _scalar_types) else str(value)
+
+
+def _variant_values(variant):
+    """Return the sorted list of values allowed for a variant, or None if
+    they are checked by a callable."""
+    values = variant.values
+    if values is None:
+        return None
+    if isinstance(values, spack.variant.DisjointSetsOfValues):
+        union = set()
+        for s in values.sets:
+            union.update(s)
+        values = union
+    return sorted((_scalar(v) for v in values), key=str)
+
+
+def core_mtime(paths=None):
+    """Time the core modules the metadata depends on were last updated.
+
+    Args:
+        paths (list): files or directories of Python modules to check
+            instead of ``core_modules``
+    """
+    mtimes = []
+    for path in paths or core_modules:
+        if os.path.isdir(path):
+            mtimes.extend(
+                os.path.getmtime(os.path.join(path, f))
+                for f in os.listdir(path) if f.endswith('.py'))
+        elif os.path.exists(path):
+            mtimes.append(os.path.getmtime(path))
+    return max(mtimes) if mtimes else 0
+
+
+def _class_attribute(pkg_class, name, default=None):
+    """Return an attribute of a package class.
+
+    Attributes defined as properties (e.g., ``homepage`` of Python
+    packages) are evaluated with the class in place of an instance, since
+    they usually only depend on other class attributes.
+    """
+    value = getattr(pkg_class, name, default)
+    if isinstance(value, property):
+        try:
+            value = value.fget(pkg_class)
+        except Exception:
+            value = default
+    return value
+
+
+def metadata_from_class(pkg_class):
+    """Return the metadata of a package class as a JSON-serializable dict."""
+    variants = {}
+    for name, variant in pkg_class.variants.items():
+        variants[name] = {
+            'default': _scalar(variant.default),
+            'description': variant.description,
+            'multi': variant.multi,
+            'values': _variant_values(variant),
+        }
+
+    dependencies = {}
+    for name, conditions in pkg_class.dependencies.items():
+        dependencies[name] = sorted((
+            {'when': str(when),
+             'spec': str(dep.spec),
+             'type': sorted(dep.type)}
+            for when, dep in conditions.items()), key=lambda d: d['when'])
+
+    conflicts = {}
+    for trigger, constraints in pkg_class.conflicts.items():
+        conflicts[trigger] = [
+            [str(when), msg] for when, msg in constraints]
+
+    patches = {}
+    for when, patch_list in pkg_class.patches.items():
+        patches[str(when)] = [p.sha256 for p in patch_list]
+
+    return {
+        'name': pkg_class.name,
+        'namespace': pkg_class.namespace,
+        'description': pkg_class.__doc__,
+        'homepage': _class_attribute(pkg_class, 'homepage'),
+        'maintainers': list(_class_attribute(pkg_class, 'maintainers', [])),
+        'tags': list(_class_attribute(pkg_class, 'tags', [])),
+        'versions': dict(
+            (str(v), dict((k, _scalar(a)) for k, a in attrs.items()))
+            for v, attrs in pkg_class.versions.items()),
+        'variants': variants,
+        'dependencies': dependencies,
+        'conflicts': conflicts,
+        'provided': dict(
+            (str(vspec), sorted(str(w) for w in whens))
+            for vspec, whens in pkg_class.provided.items()),
+        'extendees': dict(
+            (name, str(spec))
+            for name, (spec, kwargs) in pkg_class.extendees.items()),
+        'patches': patches,
+    }
+
+
+class PackageMetadata(object):
+    """Read-only view of the metadata of a package, as stored in the
+    ``MetadataIndex``.
+
+    Attributes have the names of the corresponding attributes of package
+    classes, but hold plain data: e.g., ``dependencies`` maps the name of
+    each dependency to a list of dicts with the ``when`` condition, the
+    dependency ``spec`` and its deptypes (``type``).
+    """
+
+    def __init__(self, data):
+        self._data = data
+
+    @classmethod
+    def from_package_class(cls, pkg_class):
+        return cls(metadata_from_class(pkg_class))
+
+    def to_dict(self):
+        return self._data
+
+    @property
+    def name(self):
+        return self._data['name']
+
+    @property
+    def namespace(self):
+        return self._data['namespace']
+
+    @property
+    def fullname(self):
+        return '%s.%s' % (self.namespace, self.name)
+
+    @property
+    def description(self):
+        """Docstring of the package class, or None if it has none."""
+        return self._data['description']
+
+    @property
+    def homepage(self):
+        return self._data['homepage']
+
+    @property
+    def maintainers(self):
+        return list(self._data['maintainers'])
+
+    @property
+    def tags(self):
+        return list(self._data['tags'])
+
+    @property
+    def versions(self):
+        """Dict mapping each ``Version`` of the package to the arguments
+        of its ``version()`` directive."""
+        return dict((Version(v), dict(attrs))
+                    for v, attrs in self._data['versions'].items())
+
+    @property
+    def variants(self):
+        return self._data['variants']
+
+    @property
+    def dependencies(self):
+        return self._data['dependencies']
+
+    @property
+    def conflicts(self):
+        return self._data['conflicts']
+
+    @property
+    def provided(self):
+        return self._data['provided']
+
+    @property
+    def extendees(self):
+        return self._data['extendees']
+
+    @property
+    def patches(self):
+        return self._data['patches']
+
+    def dependencies_of_type(self, *deptypes):
+        """Names of the dependencies that can have any of these deptypes.
+
+        See ``PackageBase.dependencies_of_type()``.
+        """
+        return [
+            name for name, conditions in self.dependencies.items()
+            if any(dt in c['type'] for c in conditions for dt in deptypes)]
+
+    def __repr__(self):
+        return 'PackageMetadata(%r)' % self.fullname
+
+
+class MetadataIndex(object):
+    """Maps the names of the packages in a repository to their metadata.
+
+    The index is structured like this in a file (this is YAML, but we
+    write JSON)::
+
+        packages:
+            package1:
+                <metadata of package1>
+            package2:
+                <metadata of package2>
+            ... etc. ...
+    """
+
+    def __init__(self, packages=None):
+        self.packages = {} if packages is None else packages
+
+    @staticmethod
+    def from_json(stream):
+        d = sjson.load(stream)
+        if 'packages' not in d:
+            raise spack.repo.IndexError(
+                'invalid package metadata index; try `spack clean -m`')
+        return MetadataIndex(d['packages'])
+
+    def to_json(self, stream):
+        sjson.dump({'packages': self.packages}, stream)
+
+    def __getitem__(self, name):
+        return PackageMetadata(self.packages[name])
+
+    def __contains__(self, name):
+        return name in self.packages
+
+    def __iter__(self):
+        return iter(self.packages)
+
+    def __len__(self):
+        return len(self.packages)
+
+    def update_package(self, pkg_fullname):
+        """Update the metadata of a package in the index.
+
+        Args:
+            pkg_fullname (str): name of the package, with its namespace
+        """
+        pkg_class = spack.repo.path.get_pkg_class(pkg_fullname)
+        self.packages[pkg_class.name] = metadata_from_class(pkg_class)
+
+    def remove_package(self, pkg_fullname):
+        """Remove the metadata of a package from the index, if present."""
+        self.packages.pop(pkg_fullname.split('.')[-1], None)
+
+    def update(self, other):
+        """Update this index with the contents of another."""
+        self.packages.update(other.packages)
@@ -11,6 +11,12 @@
 
 import spack.error
 
+#: Quotes and escapes, which only shlex.split() handles
+_shell_syntax = re.compile(r'[\'"\\]')
+
+#: A word of a string without shell syntax, split as shlex.split() does
+_shell_word = re.compile(r'[^ \t\r\n]+')
+
 
 class Token(object):
     """Represents tokens; generated from input by lexer and fed to parse()."""
@@ -35,52 +41,54 @@ def __eq__(self, other):
 
 
 class Lexer(object):
-    """Base class for Lexers that keep track of line numbers."""
+    """Base class for Lexers that keep track of line numbers.
+
+    Each lexicon is a list of ``(regex, action)`` rules, tried in order as
+    with ``re.Scanner``.  The rules of a lexicon are combined into a single
+    compiled regular expression, so each token is found with one match
+    whatever the number of rules.  The action is called with the lexer
+    and the matched text, and returns a token or ``None`` to skip the text.
+    A token with a type in ``mode_switches_01`` switches the lexer to
+    ``lexicon1`` for the text that follows, and one with a type in
+    ``mode_switches_10`` switches it back.
+    """
 
     def __init__(self, lexicon0, mode_switches_01=[],
                  lexicon1=[], mode_switches_10=[]):
-        self.scanner0 = re.Scanner(lexicon0)
+        self.scanner0 = _Scanner(lexicon0)
         self.mode_switches_01 = mode_switches_01
-        self.scanner1 = re.Scanner(lexicon1)
+        self.scanner1 = _Scanner(lexicon1)
         self.mode_switches_10 = mode_switches_10
         self.mode = 0
+        self.match = None
 
     def token(self, type, value=''):
-        if self.mode == 0:
-            return Token(type, value,
-                         self.scanner0.match.start(0),
-                         self.scanner0.match.end(0))
-        else:
-            return Token(type, value,
-                         self.scanner1.match.start(0),
-                         self.scanner1.match.end(0))
+        return Token(type, value, self.match.start(0), self.match.end(0))
 
     def lex_word(self, word):
-        scanner = self.scanner0
-        mode_switches = self.mode_switches_01
-        if self.mode == 1:
-            scanner = self.scanner1
-            mode_switches = self.mode_switches_10
-
-        tokens, remainder = scanner.scan(word)
-        remainder_used = 0
-
-        for i, t in enumerate(tokens):
-            if t.type in mode_switches:
-                # Combine post-switch tokens with remainder and
-                # scan in other mode
-                self.mode = 1 - self.mode  # swap 0/1
-                remainder_used = 1
-                tokens = tokens[:i + 1] + self.lex_word(
-                    word[word.index(t.value) + len(t.value):])
-                break
-
-        if remainder and not remainder_used:
-            raise LexError("Invalid character", word, word.index(remainder))
+        tokens = []
+        pos, end = 0, len(word)
+        while pos < end:
+            if self.mode == 0:
+                scanner, mode_switches = self.scanner0, self.mode_switches_01
+            else:
+                scanner, mode_switches = self.scanner1, self.mode_switches_10
+
+            self.match = scanner.match(word, pos)
+            if self.match is None:
+                raise LexError("Invalid character", word, pos)
+            pos = self.match.end()
+
+            t = scanner.actions[self.match.lastindex](self, self.match.group())
+            if t is not None:
+                tokens.append(t)
+                if t.type in mode_switches:
+                    self.mode = 1 - self.mode  # swap 0/1
 
         return tokens
 
     def lex(self, text):
+        self.mode = 0
         lexed = []
         for word in text:
             tokens = self.lex_word(word)
@@ -88,6 +96,34 @@ def lex(self, text):
         return lexed
 
 
+class _Scanner(object):
+    """The rules of a lexicon, combined into one regular expression."""
+
+    def __init__(self, lexicon):
+        # Each rule is a group of the expression, so the last group closed
+        # by a match (its lastindex) is the rule that matched, whatever
+        # groups the rule has of its own.
+        self.actions = [None]
+        for regex, action in lexicon:
+            self.actions.append(action)
+            self.actions.extend([None] * re.compile(regex).groups)
+
+        self.regex = None
+        if lexicon:
+            self.regex = re.compile(
+                '|'.join('(%s)' % regex for regex, _ in lexicon))
+
+    def match(self, text, pos):
+        """Match the first rule at ``pos``, or return ``None`` if no rule
+        matches a non-empty string there."""
+        if self.regex is None:
+            return None
+        match = self.regex.match(text, pos)
+        if match is None or match.end() == pos:
+            return None
+        return match
+
+
 class Parser(object):
     """Base class for simple recursive descent parsers."""
 
@@ -143,7 +179,12 @@ def expect(self, id):
 
     def setup(self, text):
         if isinstance(text, string_types):
-            text = shlex.split(str(text))
+            text = str(text)
+            if _shell_syntax.search(text):
+                text = shlex.split(text)
+            else:
+                # Same words as shlex.split(), without its overhead
+                text = _shell_word.findall(text)
         self.text = text
         self.push_tokens(self.lexer.lex(text))
 
@@ -8,17 +8,20 @@
 import contextlib
 import errno
 import functools
+import hashlib
 import inspect
 import itertools
+import multiprocessing
 import os
 import re
 import shutil
 import six
 import stat
 import sys
+import time
 import traceback
 import types
-from typing import Dict  # novm
+from typing import Dict, Set  # novm
 
 if sys.version_info >= (3, 5):
     from collections.abc import Mapping  # novm
@@ -33,6 +36,7 @@
 import spack.config
 import spack.caches
 import spack.error
+import spack.package_metadata
 import spack.patch
 import spack.spec
 import spack.util.spack_json as sjson
@@ -59,6 +63,17 @@ def get_full_namespace(namespace):
 packages_dir_name  = 'packages'    # Top-level repo directory containing pkgs.
 package_file_name  = 'package.py'  # Filename for packages in a repository.
 
+#: Minimum number of packages needing an update for indexes to be updated
+#: in parallel
+parallel_index_threshold = 64
+
+#: Directory of the misc cache where compiled package modules are kept
+bytecode_cache_dir = 'bytecode'
+
+#: Seconds after the last change to a repository directory before the
+#: packages in it are recorded in a snapshot
+snapshot_settle_time = 2
+
 #: Guaranteed unused default value for some functions.
 NOT_PROVIDED = object()
 
@@ -133,25 +148,102 @@ class FastPackageChecker(Mapping):
     For each repository a cache is maintained at class level, and shared among
     all instances referring to it. Update of the global cache is done lazily
     during instance initialization.
+
+    Finding the packages takes a ``scandir()`` of the repository, which
+    only yields its directory entries, and a ``stat()`` of the
+    ``package.py`` file in each of them.  The names of the packages found
+    are kept in a snapshot in the misc cache, which is used instead as long
+    as the repository directory is not modified, so that the package files
+    are not stat()ed one by one (only the directories that had no package
+    file are checked again).  The snapshot does not hold the stats: editing
+    a package file does not modify the repository directory, so they are
+    only collected when first needed (e.g., to check whether the indexes of
+    the repository are up to date), again with one ``stat()`` per package.
+    Package files that were removed since the snapshot was taken are found
+    then, and from that point on the packages are the ones that have stats.
     """
     #: Global cache, reused by every instance
     _paths_cache = {}  # type: Dict[str, Dict[str, os.stat_result]]
 
+    #: Names of the packages in each repository, reused by every instance
+    _names_cache = {}  # type: Dict[str, Set[str]]
+
     def __init__(self, packages_path):
         # The path of the repository managed by this instance
         self.packages_path = packages_path
 
-        # If the cache we need is not there yet, then build it appropriately
-        if packages_path not in self._paths_cache:
-            self._paths_cache[packages_path] = self._create_new_cache()
-
-        #: Reference to the appropriate entry in the global cache
-        self._packages_to_stats = self._paths_cache[packages_path]
+        # If the names we need are not there yet, then find them
+        self._package_names
 
     def invalidate(self):
         """Regenerate cache for this checker."""
-        self._paths_cache[self.packages_path] = self._create_new_cache()
-        self._packages_to_stats = self._paths_cache[self.packages_path]
+        self._paths_cache.pop(self.packages_path, None)
+        self._names_cache[self.packages_path] = self._find_packages(
+            use_snapshot=False)
+
+    @property
+    def _package_names(self):
+        # Once they are taken, the stats tell which packages still exist
+        stats = self._paths_cache.get(self.packages_path)
+        if stats is not None:
+            return stats
+
+        if self.packages_path not in self._names_cache:
+            self._names_cache[self.packages_path] = self._find_packages()
+        return self._names_cache[self.packages_path]
+
+    @property
+    def _packages_to_stats(self):
+        if self.packages_path not in self._paths_cache:
+            self._paths_cache[self.packages_path] = self._create_new_cache()
+        return self._paths_cache[self.packages_path]
+
+    def _stat_package(self, pkg_name):
+        """Return the stats of the package file of a package, or None if
+        there is no readable package file."""
+        pkg_file = os.path.join(
+            self.packages_path, pkg_name, package_file_name)
+
+        # Use stat here to avoid lots of calls to the filesystem.
+        try:
+            sinfo = os.stat(pkg_file)
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                # No package.py file here.
+                return None
+            elif e.errno == errno.EACCES:
+                tty.warn("Can't read package file %s." % pkg_file)
+                return None
+            raise e
+
+        # If it's not a file, skip it.
+        if stat.S_ISDIR(sinfo.st_mode):
+            return None
+        return sinfo
+
+    def _candidates(self):
+        """Names of the entries in the repository that may be packages."""
+        if sys.version_info >= (3, 5):
+            entries = [(e.name, e.is_dir())
+                       for e in os.scandir(self.packages_path)]  # novm
+        else:
+            entries = [(x, True) for x in os.listdir(self.packages_path)]
+
+        candidates = []
+        for pkg_name, is_dir in entries:
+            # Warn about invalid names that look like packages.
+            if not nm.valid_module_name(pkg_name):
+                if not pkg_name.startswith('.'):
+                    tty.warn('Skipping package at {0}. "{1}" is not '
+                             'a valid Spack module name.'.format(
+                                 os.path.join(self.packages_path, pkg_name),
+                                 pkg_name))
+                continue
+
+            # Skip non-directories in the package root.
+            if is_dir:
+                candidates.append(pkg_name)
+        return candidates
 
     def _create_new_cache(self):  # type: () -> Dict[str, os.stat_result]
         """Create a new cache for packages in a repo.
@@ -164,44 +256,72 @@ def _create_new_cache(self):  # type: () -> Dict[str, os.stat_result]
         # Create a dictionary that will store the mapping between a
         # package name and its stat info
         cache = {}  # type: Dict[str, os.stat_result]
-        for pkg_name in os.listdir(self.packages_path):
-            # Skip non-directories in the package root.
-            pkg_dir = os.path.join(self.packages_path, pkg_name)
+        for pkg_name in self._package_names:
+            sinfo = self._stat_package(pkg_name)
+            if sinfo is not None:
+                cache[pkg_name] = sinfo
+        return cache
 
-            # Warn about invalid names that look like packages.
-            if not nm.valid_module_name(pkg_name):
-                if not pkg_name.startswith('.'):
-                    tty.warn('Skipping package at {0}. "{1}" is not '
-                             'a valid Spack module name.'.format(
-                                 pkg_dir, pkg_name))
-                continue
+    def _snapshot_key(self):
+        digest = hashlib.sha1(self.packages_path.encode('utf-8')).hexdigest()
+        return 'packages/{0}.json'.format(digest)
 
-            # Construct the file name from the directory
-            pkg_file = os.path.join(
-                self.packages_path, pkg_name, package_file_name
-            )
+    def _find_packages(self, use_snapshot=True):
+        """Return the names of the packages in the repository.
 
-            # Use stat here to avoid lots of calls to the filesystem.
-            try:
-                sinfo = os.stat(pkg_file)
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    # No package.py file here.
-                    continue
-                elif e.errno == errno.EACCES:
-                    tty.warn("Can't read package file %s." % pkg_file)
-                    continue
-                raise e
-
-            # If it's not a file, skip it.
-            if stat.S_ISDIR(sinfo.st_mode):
-                continue
-
-            # If it is a file, then save the stats under the
-            # appropriate key
-            cache[pkg_name] = sinfo
+        Directories that are not packages are recorded in the snapshot
+        too, and checked again whenever it is used, in case their package
+        file was added later.
+        """
+        try:
+            repo_mtime = os.stat(self.packages_path).st_mtime
+        except OSError:
+            repo_mtime = None
 
-        return cache
+        misc_cache = spack.caches.misc_cache
+        key = self._snapshot_key()
+        if use_snapshot and repo_mtime is not None:
+            try:
+                if misc_cache.init_entry(key):
+                    with misc_cache.read_transaction(key) as f:
+                        snapshot = sjson.load(f)
+                    if (snapshot['path'] == self.packages_path and
+                            snapshot['mtime'] == repo_mtime):
+                        names = set(snapshot['packages'])
+                        names.update(x for x in snapshot['other']
+                                     if self._stat_package(x) is not None)
+                        return names
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                pass
+
+        # Scan the repository, and take the stats we have to take anyway
+        cache = {}  # type: Dict[str, os.stat_result]
+        other = []
+        for pkg_name in self._candidates():
+            sinfo = self._stat_package(pkg_name)
+            if sinfo is None:
+                other.append(pkg_name)
+            else:
+                cache[pkg_name] = sinfo
+        self._paths_cache[self.packages_path] = cache
+
+        # Changes made within the resolution of the mtime of the repository
+        # may not modify it, so recently modified repositories are not
+        # recorded until they settle.
+        if (repo_mtime is not None and
+                time.time() - repo_mtime > snapshot_settle_time):
+            try:
+                with misc_cache.write_transaction(key) as (old, new):
+                    sjson.dump({'path': self.packages_path,
+                                'mtime': repo_mtime,
+                                'packages': sorted(cache),
+                                'other': sorted(other)}, new)
+            except (IOError, OSError):
+                # The snapshot is an optimization; e.g., the misc cache
+                # may not be writable
+                pass
+
+        return set(cache)
 
     def last_mtime(self):
         return max(
@@ -210,11 +330,20 @@ def last_mtime(self):
     def __getitem__(self, item):
         return self._packages_to_stats[item]
 
+    def items(self):
+        return self._packages_to_stats.items()
+
+    def values(self):
+        return self._packages_to_stats.values()
+
+    def __contains__(self, item):
+        return item in self._package_names
+
     def __iter__(self):
-        return iter(self._packages_to_stats)
+        return iter(self._package_names)
 
     def __len__(self):
-        return len(self._packages_to_stats)
+        return len(self._package_names)
 
 
 class TagIndex(Mapping):
@@ -256,15 +385,33 @@ def update_package(self, pkg_name):
         package = path.get(pkg_name)
 
         # Remove the package from the list of packages, if present
-        for pkg_list in self._tag_dict.values():
-            if pkg_name in pkg_list:
-                pkg_list.remove(pkg_name)
+        self.remove_package(package.name)
 
         # Add it again under the appropriate tags
         for tag in getattr(package, 'tags', []):
             tag = tag.lower()
             self._tag_dict[tag].append(package.name)
 
+    def remove_package(self, pkg_name):
+        """Removes a package from the lists of all tags.
+
+        Args:
+            pkg_name (str): name of the package, without namespace
+        """
+        for pkg_list in self._tag_dict.values():
+            if pkg_name in pkg_list:
+                pkg_list.remove(pkg_name)
+
+    def merge(self, other):
+        """Merge another tag index into this one.
+
+        Args:
+            other (TagIndex): tag index to be merged
+        """
+        for tag, pkg_list in other.items():
+            tag_list = self._tag_dict[tag]
+            tag_list.extend(p for p in pkg_list if p not in tag_list)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Indexer(object):
@@ -293,6 +440,15 @@ def needs_update(self, pkg):
         """
         return False
 
+    def last_mtime(self):
+        """Time files other than the package files were last updated.
+
+        Indexes that also depend on other files (e.g., on the build
+        systems in Spack's core) return the time those files were last
+        changed, and the whole index is updated if it is older.
+        """
+        return 0
+
     @abc.abstractmethod
     def read(self, stream):
         """Read this index from a provided file object."""
@@ -305,6 +461,20 @@ def update(self, pkg_fullname):
     def write(self, stream):
         """Write the index to a file object."""
 
+    @abc.abstractmethod
+    def merge(self, pkg_fullnames, other):
+        """Replace what the index holds about some packages with what
+        another index of the same kind holds about them.
+
+        Indexes are updated in parallel by updating new, empty indexes
+        with a few packages each in separate processes, and merging them
+        into the stored index.
+
+        Args:
+            pkg_fullnames (list): names of the packages, with namespace
+            other (object): index updated with only these packages
+        """
+
 
 class TagIndexer(Indexer):
     """Lifecycle methods for a TagIndex on a Repo."""
@@ -320,6 +490,11 @@ def update(self, pkg_fullname):
     def write(self, stream):
         self.index.to_json(stream)
 
+    def merge(self, pkg_fullnames, other):
+        for pkg_fullname in pkg_fullnames:
+            self.index.remove_package(pkg_fullname.split('.')[-1])
+        self.index.merge(other)
+
 
 class ProviderIndexer(Indexer):
     """Lifecycle methods for virtual package providers."""
@@ -339,6 +514,11 @@ def update(self, pkg_fullname):
     def write(self, stream):
         self.index.to_json(stream)
 
+    def merge(self, pkg_fullnames, other):
+        for pkg_fullname in pkg_fullnames:
+            self.index.remove_provider(pkg_fullname)
+        self.index.merge(other)
+
 
 class PatchIndexer(Indexer):
     """Lifecycle methods for patch cache."""
@@ -361,6 +541,61 @@ def write(self, stream):
     def update(self, pkg_fullname):
         self.index.update_package(pkg_fullname)
 
+    def merge(self, pkg_fullnames, other):
+        for pkg_fullname in pkg_fullnames:
+            self.index.remove_package(pkg_fullname)
+        self.index.update(other)
+
+
+class MetadataIndexer(Indexer):
+    """Lifecycle methods for the index of package metadata."""
+    def _create(self):
+        return spack.package_metadata.MetadataIndex()
+
+    def last_mtime(self):
+        return spack.package_metadata.core_mtime()
+
+    def read(self, stream):
+        self.index = spack.package_metadata.MetadataIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+    def merge(self, pkg_fullnames, other):
+        for pkg_fullname in pkg_fullnames:
+            self.index.remove_package(pkg_fullname)
+        self.index.update(other)
+
+
+def _index_packages(indexer_packages):
+    """Update empty indexes with some packages, in a worker process.
+
+    Args:
+        indexer_packages (dict): maps the name of each indexer to its type
+            and the names of the packages to index, with namespace
+
+    Returns:
+        (dict): maps the name of each indexer to the index it built, as
+            JSON, or None if any package could not be indexed
+    """
+    fragments = {}
+    try:
+        for name, (indexer_type, pkg_fullnames) in indexer_packages.items():
+            indexer = indexer_type()
+            indexer.create()
+            for pkg_fullname in pkg_fullnames:
+                indexer.update(pkg_fullname)
+            stream = six.StringIO()
+            indexer.write(stream)
+            fragments[name] = stream.getvalue()
+    except Exception:
+        # The parent updates these packages itself, and reports the error
+        return None
+    return fragments
+
 
 class RepoIndex(object):
     """Container class that manages a set of Indexers for a Repo.
@@ -408,7 +643,7 @@ def __getitem__(self, name):
 
         return self.indexes[name]
 
-    def _build_all_indexes(self):
+    def _build_all_indexes(self, jobs=None):
         """Build all the indexes at once.
 
         We regenerate *all* indexes whenever *any* index needs an update,
@@ -417,41 +652,141 @@ def _build_all_indexes(self):
         rather only pay that cost once rather than on several
         invocations.
 
+        When at least ``parallel_index_threshold`` packages need an
+        update, they are loaded and indexed in a pool of ``jobs``
+        processes (by default, ``config:build_jobs`` up to the number of
+        CPUs), whose indexes are merged into the stored ones.
+
         """
+        needs_update = {}
+        stale = set()
         for name, indexer in self.indexers.items():
-            self.indexes[name] = self._build_index(name, indexer)
+            pkg_names = self._needs_update(name, indexer)
+            needs_update[name] = pkg_names
+            stale.update(self.checker if pkg_names is None else pkg_names)
+
+        if jobs is None:
+            jobs = min(spack.config.get('config:build_jobs', 16),
+                       multiprocessing.cpu_count())
+        fragments = {}
+        # Daemonic processes (e.g., builds) cannot have children
+        if (jobs >= 2 and len(stale) >= parallel_index_threshold and
+                not multiprocessing.current_process().daemon):
+            fragments = self._index_in_parallel(
+                sorted(stale), needs_update, jobs)
 
-    def _build_index(self, name, indexer):
-        """Determine which packages need an update, and update indexes."""
+        for name, indexer in self.indexers.items():
+            self.indexes[name] = self._build_index(
+                name, indexer, needs_update[name], fragments.get(name, []))
 
-        # Filename of the provider index cache (we assume they're all json)
+    def _needs_update(self, name, indexer):
+        """Return the names of the packages whose entries in an index need
+        an update, or None if the index does not exist yet."""
         cache_filename = '{0}/{1}-index.json'.format(name, self.namespace)
+        misc_cache = spack.caches.misc_cache
+        if not misc_cache.init_entry(cache_filename):
+            return None
 
         # Compute which packages needs to be updated in the cache
-        misc_cache = spack.caches.misc_cache
         index_mtime = misc_cache.mtime(cache_filename)
+        if indexer.last_mtime() > index_mtime:
+            return list(self.checker)
 
-        needs_update = [
+        return [
             x for x, sinfo in self.checker.items()
             if sinfo.st_mtime > index_mtime
         ]
 
-        index_existed = misc_cache.init_entry(cache_filename)
-        if index_existed and not needs_update:
+    def _index_in_parallel(self, stale, needs_update, jobs):
+        """Index the packages that need an update in a pool of processes.
+
+        Args:
+            stale (list): names of the packages that need an update in
+                any index
+            needs_update (dict): maps the name of each indexer to the
+                names of the packages it needs to update, or None for all
+            jobs (int): number of processes indexing packages
+
+        Returns:
+            (dict): maps the name of each indexer to a list of tuples with
+                the names of some packages and an index of only them
+        """
+        chunksize = max(1, len(stale) // (4 * jobs))
+
+        tasks = []
+        for i in range(0, len(stale), chunksize):
+            chunk = set(stale[i:i + chunksize])
+            task = {}
+            for name, indexer in self.indexers.items():
+                pkg_names = needs_update[name]
+                if pkg_names is not None:
+                    pkg_names = chunk.intersection(pkg_names)
+                pkg_fullnames = sorted(
+                    '%s.%s' % (self.namespace, x)
+                    for x in (chunk if pkg_names is None else pkg_names))
+                if pkg_fullnames:
+                    task[name] = (type(indexer), pkg_fullnames)
+            tasks.append(task)
+
+        pool = llnl.util.lang.fork_context.Pool(jobs)
+        try:
+            results = pool.map(_index_packages, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        fragments = collections.defaultdict(list)
+        for task, result in zip(tasks, results):
+            if result is None:
+                # Leave packages that failed to the serial update
+                continue
+            for name, (indexer_type, pkg_fullnames) in task.items():
+                fragment = indexer_type()
+                fragment.read(six.StringIO(result[name]))
+                fragments[name].append((pkg_fullnames, fragment.index))
+        return fragments
+
+    def _build_index(self, name, indexer, needs_update, fragments):
+        """Update an index with the packages that need an update, and the
+        indexes of some of them built in parallel.
+
+        Args:
+            name (str): name of the indexer
+            indexer (Indexer): indexer of the index
+            needs_update (list): names of the packages whose entries need
+                an update, or None to update all packages
+            fragments (list): tuples of the names of some packages and
+                indexes of only them, as returned by
+                ``_index_in_parallel()``
+        """
+        # Filename of the provider index cache (we assume they're all json)
+        cache_filename = '{0}/{1}-index.json'.format(name, self.namespace)
+        misc_cache = spack.caches.misc_cache
+
+        if needs_update is not None and not needs_update:
             # If the index exists and doesn't need an update, read it
             with misc_cache.read_transaction(cache_filename) as f:
                 indexer.read(f)
+            return indexer.index
 
-        else:
-            # Otherwise update it and rewrite the cache file
-            with misc_cache.write_transaction(cache_filename) as (old, new):
-                indexer.read(old) if old else indexer.create()
+        if needs_update is None:
+            needs_update = list(self.checker)
+
+        # Otherwise update it and rewrite the cache file
+        with misc_cache.write_transaction(cache_filename) as (old, new):
+            indexer.read(old) if old else indexer.create()
 
-                for pkg_name in needs_update:
-                    namespaced_name = '%s.%s' % (self.namespace, pkg_name)
+            merged = set()
+            for pkg_fullnames, fragment in fragments:
+                indexer.merge(pkg_fullnames, fragment)
+                merged.update(pkg_fullnames)
+
+            for pkg_name in needs_update:
+                namespaced_name = '%s.%s' % (self.namespace, pkg_name)
+                if namespaced_name not in merged:
                     indexer.update(namespaced_name)
 
-                indexer.write(new)
+            indexer.write(new)
 
         return indexer.index
 
@@ -566,6 +901,10 @@ def all_package_classes(self):
         for name in self.all_package_names():
             yield self.get_pkg_class(name)
 
+    def all_package_metadata(self):
+        for name in self.all_package_names():
+            yield self.package_metadata(name)
+
     @property
     def provider_index(self):
         """Merged ProviderIndex from all Repos in the RepoPath."""
@@ -682,6 +1021,10 @@ def get_pkg_class(self, pkg_name):
         """Find a class for the spec's package and return the class object."""
         return self.repo_for_pkg(pkg_name).get_pkg_class(pkg_name)
 
+    def package_metadata(self, pkg_name):
+        """Get the metadata of a package without loading its class."""
+        return self.repo_for_pkg(pkg_name).package_metadata(pkg_name)
+
     @autospec
     def dump_provenance(self, spec, path):
         """Dump provenance information for a spec to a particular path.
@@ -977,6 +1320,7 @@ def index(self):
             self._repo_index.add_indexer('providers', ProviderIndexer())
             self._repo_index.add_indexer('tags', TagIndexer())
             self._repo_index.add_indexer('patches', PatchIndexer())
+            self._repo_index.add_indexer('metadata', MetadataIndexer())
         return self._repo_index
 
     @property
@@ -994,6 +1338,41 @@ def patch_index(self):
         """Index of patches and packages they're defined on."""
         return self.index['patches']
 
+    @property
+    def metadata_index(self):
+        """Index of the metadata of the packages in this repo."""
+        return self.index['metadata']
+
+    def package_metadata(self, pkg_name):
+        """Get the metadata of a package without loading its class.
+
+        Returns:
+            (spack.package_metadata.PackageMetadata): metadata declared by
+                the directives of the package
+        """
+        namespace, _, name = pkg_name.rpartition('.')
+        if namespace and namespace != self.namespace:
+            raise InvalidNamespaceError(
+                'Invalid namespace for %s repo: %s'
+                % (self.namespace, namespace))
+
+        if not self.exists(name):
+            raise UnknownPackageError(name, self)
+
+        index = self.metadata_index
+        if name in index:
+            return index[name]
+
+        # The package file may be older than the index (e.g., if it was
+        # copied into the repo), so it was never indexed
+        return spack.package_metadata.PackageMetadata.from_package_class(
+            self.get_pkg_class(name))
+
+    def all_package_metadata(self):
+        """Iterator over the metadata of all packages in the repository."""
+        for name in self.all_package_names():
+            yield self.package_metadata(name)
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -1099,8 +1478,10 @@ def _get_pkg_module(self, pkg_name):
             fullname = "%s.%s" % (self.full_namespace, pkg_name)
 
             try:
-                module = simp.load_source(fullname, file_path,
-                                          prepend=_package_prepend)
+                module = simp.load_source(
+                    fullname, file_path, prepend=_package_prepend,
+                    bytecode_dir=spack.caches.misc_cache.cache_path(
+                        bytecode_cache_dir))
             except SyntaxError as e:
                 # SyntaxError strips the path from the filename so we need to
                 # manually construct the error message in order to give the
@@ -82,12 +82,18 @@
             'dirty': {'type': 'boolean'},
             'build_language': {'type': 'string'},
             'build_jobs': {'type': 'integer', 'minimum': 1},
+            'jobserver': {'type': 'boolean'},
             'ccache': {'type': 'boolean'},
             'concretizer': {
                 'type': 'string',
                 'enum': ['original', 'clingo']
             },
+            'concretization_cache': {'type': 'boolean'},
             'db_lock_timeout': {'type': 'integer', 'minimum': 1},
+            'database_backend': {
+                'type': 'string',
+                'enum': ['json', 'sqlite']
+            },
             'package_lock_timeout': {
                 'anyOf': [
                     {'type': 'integer', 'minimum': 1},
@@ -52,6 +52,7 @@
                     },
                 },
                 'version': {'type': 'string'},
+                'journal': {'type': 'string'},
             }
         },
     },
@@ -80,10 +80,12 @@
 import sys
 import collections
 import hashlib
+import heapq
 import itertools
 import operator
 import os
 import re
+import weakref
 
 import six
 import ruamel.yaml as yaml
@@ -175,6 +177,319 @@
 default_format += '{%compiler.name}{@compiler.version}{compiler_flags}'
 default_format += '{variants}{arch=architecture}'
 
+#: Concrete nodes read from databases, environment lockfiles and build
+#: cache indices, whose data is shared by all the specs of the same nodes
+#: read in the process
+_interned_nodes = weakref.WeakValueDictionary()  # type: ignore
+
+
+class SpecCache(object):
+    """Bounded cache of results computed for specs.
+
+    Results may depend on some state of Spack besides their keys, returned
+    by ``state()``, and are dropped whenever that changes.  The cache is
+    emptied whenever it holds ``max_size`` results.
+    """
+
+    def __init__(self, max_size=65536):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results = {}
+        self._state = None
+
+    def state(self):
+        """Return the state of Spack that the cached results depend on."""
+        return None
+
+    def get(self, key):
+        """Return the cached result for a key, or None."""
+        state = self.state()
+        if state != self._state:
+            self.clear()
+            self._state = state
+
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if len(self._results) >= self.max_size:
+            self._results.clear()
+        self._results[key] = result
+
+    def clear(self):
+        self._results.clear()
+
+    def hit_rate(self):
+        """Fraction of lookups that found a cached result."""
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def __str__(self):
+        return '%d hits, %d misses (%.1f%% hit rate), %d results cached' % (
+            self.hits, self.misses, 100 * self.hit_rate(), len(self._results))
+
+
+class SatisfiesCache(SpecCache):
+    """Bounded cache of the results of ``Spec.satisfies()`` for concrete
+    specs.
+
+    Results are keyed on the DAG and build hashes of the concrete spec, a
+    canonical form of the constraint (the string it was given as, or the
+    comparison key of the constraint spec) and the arguments of the call.
+    Whether a package provides a virtual dependency depends on the package
+    repository, and operating systems and targets in string constraints are
+    resolved for the current platform, so results are dropped when either
+    of them changes.
+    """
+
+    def state(self):
+        return spack.repo.path, spack.architecture.platform().name
+
+
+class ParseCache(SpecCache):
+    """Bounded cache of the specs parsed from strings by ``Spec()``.
+
+    Specs are keyed on the string they were parsed from.  Operating systems
+    and targets are resolved for the current platform, so specs are dropped
+    when that changes.  Callers must copy the cached specs, which are
+    mutable.
+    """
+
+    def __init__(self, max_size=8192):
+        super(ParseCache, self).__init__(max_size)
+
+    def state(self):
+        return spack.architecture.platform().name
+
+
+#: Results of satisfies() for concrete specs
+satisfies_cache = SatisfiesCache()
+
+#: Specs parsed from strings by the Spec constructor
+parse_cache = ParseCache()
+
+
+class FormatAttribute(object):
+    """An attribute of a ``Spec.format()`` string, such as ``{@version}``
+    or ``{^mpi.name}``, parsed into the parts it is printed from."""
+
+    __slots__ = ('dep', 'attribute', 'sig', 'parts', 'is_hash', 'hash_length',
+                 'color')
+
+    def __init__(self, attribute):
+        self.dep = None
+        if attribute.startswith('^'):
+            attribute = attribute[1:]
+            self.dep, attribute = attribute.split('.', 1)
+
+        if attribute == '':
+            raise SpecFormatStringError(
+                'Format string attributes must be non-empty')
+        attribute = attribute.lower()
+
+        sig = ''
+        if attribute[0] in '@%/':
+            # color sigils that are inside braces
+            sig = attribute[0]
+            attribute = attribute[1:]
+        elif attribute.startswith('arch='):
+            sig = ' arch='  # include space as separator
+            attribute = attribute[5:]
+
+        parts = attribute.split('.')
+        assert parts
+
+        # check that the sigil is valid for the attribute.
+        if sig == '@' and parts[-1] not in ('versions', 'version'):
+            raise SpecFormatSigilError(sig, 'versions', attribute)
+        elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
+            raise SpecFormatSigilError(sig, 'compilers', attribute)
+        elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
+            raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
+        elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
+            raise SpecFormatSigilError(sig, 'the architecture', attribute)
+
+        self.attribute = attribute
+        self.sig = sig
+        self.parts = parts
+
+        # Hashes are printed with an optional length
+        self.is_hash = bool(re.match(r'hash(:\d)?', attribute))
+        self.hash_length = None
+        if self.is_hash and ':' in attribute:
+            _, length = attribute.split(':')
+            self.hash_length = int(length)
+
+        # Set color codes for various attributes
+        self.color = None
+        if self.is_hash:
+            self.color = '#'
+        elif 'variants' in parts:
+            self.color = '+'
+        elif 'architecture' in parts:
+            self.color = '='
+        elif 'compiler' in parts or 'compiler_flags' in parts:
+            self.color = '%'
+        elif 'version' in parts:
+            self.color = '@'
+
+    def value(self, spec, transform):
+        """Return the text printed for this attribute of a spec, or None if
+        nothing is printed."""
+        current = spec[self.dep] if self.dep else spec
+
+        morph = transform.get(self.attribute) if transform else None
+        if morph is None:
+            morph = _identity_morph
+
+        # Special cases for non-spec attributes and hashes.
+        # These must be the only non-dep component of the format attribute
+        if self.attribute == 'spack_root':
+            return morph(spec, spack.paths.spack_root)
+        elif self.attribute == 'spack_install':
+            return morph(spec, spack.store.layout.root)
+        elif self.is_hash:
+            return self.sig + morph(spec, spec.dag_hash(self.hash_length))
+
+        # Iterate over components using getattr to get next element
+        for idx, part in enumerate(self.parts):
+            if not part:
+                raise SpecFormatStringError(
+                    'Format string attributes must be non-empty'
+                )
+            if part.startswith('_'):
+                raise SpecFormatStringError(
+                    'Attempted to format private attribute'
+                )
+            if isinstance(current, vt.VariantMap):
+                # subscript instead of getattr for variant names
+                current = current[part]
+            else:
+                # aliases
+                if part == 'arch':
+                    part = 'architecture'
+                elif part == 'version':
+                    # Version requires concrete spec, versions does not
+                    # when concrete, they print the same thing
+                    part = 'versions'
+                try:
+                    current = getattr(current, part)
+                except AttributeError:
+                    parent = '.'.join(self.parts[:idx])
+                    m = 'Attempted to format attribute %s.' % self.attribute
+                    m += 'Spec.%s has no attribute %s' % (parent, part)
+                    raise SpecFormatStringError(m)
+                if isinstance(current, vn.VersionList):
+                    if current == _any_version:
+                        # We don't print empty version lists
+                        return None
+
+            if callable(current):
+                raise SpecFormatStringError(
+                    'Attempted to format callable object'
+                )
+            if not current:
+                # We're not printing anything
+                return None
+
+        return self.sig + morph(spec, str(current))
+
+
+def _identity_morph(spec, value):
+    return value
+
+
+class FormatTemplate(object):
+    """A ``Spec.format()`` string, parsed into its literal text and the
+    attributes it prints.
+
+    Templates are parsed once per format string (see ``format_template()``)
+    and can print any number of specs.
+    """
+
+    def __init__(self, format_string):
+        #: Literal strings and FormatAttributes, in order
+        self.pieces = []
+
+        literal = ''
+        attribute = ''
+        in_attribute = False
+        escape = False
+
+        for c in format_string:
+            if escape:
+                literal += c
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif in_attribute:
+                if c == '}':
+                    if literal:
+                        self.pieces.append(literal)
+                        literal = ''
+                    self.pieces.append(FormatAttribute(attribute))
+                    attribute = ''
+                    in_attribute = False
+                else:
+                    attribute += c
+            else:
+                if c == '}':
+                    raise SpecFormatStringError(
+                        'Encountered closing } before opening {'
+                    )
+                elif c == '{':
+                    in_attribute = True
+                else:
+                    literal += c
+        if in_attribute:
+            raise SpecFormatStringError(
+                'Format string terminated while reading attribute.'
+                'Missing terminating }.'
+            )
+        if literal:
+            self.pieces.append(literal)
+
+    def render(self, spec, color=False, transform=None):
+        """Print a spec with this template.
+
+        Args:
+            spec (Spec): spec to print
+            color (bool): True if returned string is colored
+            transform (dict): maps attributes to a callable that accepts
+                the spec and a string and returns another string
+        """
+        if color is None:
+            color = clr.get_color_when()
+
+        out = []
+        for piece in self.pieces:
+            if not isinstance(piece, FormatAttribute):
+                out.append(piece)
+                continue
+
+            value = piece.value(spec, transform)
+            if value is None:
+                continue
+            value = six.text_type(value)
+            if color:
+                value = clr.cescape(value)
+                if piece.color is not None:
+                    value = color_formats[piece.color] + value + '@.'
+                value = clr.colorize(value, color=color)
+            out.append(value)
+        return ''.join(out)
+
+
+@lang.memoized
+def format_template(format_string):
+    """Return the FormatTemplate for a ``Spec.format()`` string."""
+    return FormatTemplate(format_string)
+
 
 def colorize_spec(spec):
     """Returns a spec colorized according to the colors specified in
@@ -198,6 +513,11 @@ def __call__(self, match):
 
 @lang.key_ordering
 class ArchSpec(object):
+    __slots__ = ('_platform', '_os', '_target')
+
+    __getstate__ = lang.getstate_with_slots
+    __setstate__ = lang.setstate_with_slots
+
     def __init__(self, spec_or_platform_tuple=(None, None, None)):
         """ Architecture specification a package should be built with.
 
@@ -533,6 +853,11 @@ class CompilerSpec(object):
        versions that a package should be built with.  CompilerSpecs have a
        name and a version list. """
 
+    __slots__ = ('name', 'versions')
+
+    __getstate__ = lang.getstate_with_slots
+    __setstate__ = lang.setstate_with_slots
+
     def __init__(self, *args):
         nargs = len(args)
         if nargs == 1:
@@ -657,6 +982,11 @@ class DependencySpec(object):
     - deptypes: list of strings, representing dependency relationships.
     """
 
+    __slots__ = ('parent', 'spec', 'deptypes')
+
+    __getstate__ = lang.getstate_with_slots
+    __setstate__ = lang.setstate_with_slots
+
     def __init__(self, parent, spec, deptypes):
         self.parent = parent
         self.spec = spec
@@ -696,6 +1026,8 @@ def __str__(self):
 
 class FlagMap(lang.HashableMap):
 
+    __slots__ = ('spec',)
+
     def __init__(self, spec):
         super(FlagMap, self).__init__()
         self.spec = spec
@@ -756,6 +1088,8 @@ class DependencyMap(lang.HashableMap):
     """Each spec has a DependencyMap containing specs for its dependencies.
        The DependencyMap is keyed by name. """
 
+    __slots__ = ()
+
     def __str__(self):
         return "{deps: %s}" % ', '.join(str(d) for d in sorted(self.values()))
 
@@ -1012,8 +1346,19 @@ def __init__(self, spec, name, query_parameters):
 @lang.key_ordering
 class Spec(object):
 
-    #: Cache for spec's prefix, computed lazily in the corresponding property
-    _prefix = None
+    # Most attributes are kept in slots, which take far less memory than
+    # an instance dictionary.  Packages still set their own attributes on
+    # specs (e.g. ``spec.mpicc``), which go into ``__dict__``.
+    __slots__ = (
+        'name', 'versions', 'variants', 'architecture', 'compiler',
+        'compiler_flags', '_dependents', '_dependencies', 'namespace',
+        '_hash', '_build_hash', '_full_hash', '_cmp_key_cache', '_package',
+        '_normal', '_concrete', 'external_path', 'external_modules',
+        '_hashes_final', 'extra_attributes', '_prefix', '_interned',
+        '__dict__', '__weakref__')
+
+    __getstate__ = lang.getstate_with_slots
+    __setstate__ = lang.setstate_with_slots
 
     def __init__(self, spec_like=None,
                  normal=False, concrete=False, external_path=None,
@@ -1056,6 +1401,14 @@ def __init__(self, spec_like=None,
         self._cmp_key_cache = None
         self._package = None
 
+        #: Cache for spec's prefix, computed lazily in the corresponding
+        #: property
+        self._prefix = None
+
+        #: Node whose data this spec shares with the other specs of the same
+        #: node read in the process (see ``from_interned_node_dict()``)
+        self._interned = None
+
         # Most of these are internal implementation details that can be
         # set by internal Spack calls in the constructor.
         #
@@ -1082,15 +1435,39 @@ def __init__(self, spec_like=None,
         self.extra_attributes = None
 
         if isinstance(spec_like, six.string_types):
-            spec_list = SpecParser(self).parse(spec_like)
-            if len(spec_list) > 1:
-                raise ValueError("More than one spec in string: " + spec_like)
-            if len(spec_list) < 1:
-                raise ValueError("String contains no specs: " + spec_like)
+            self._parse(spec_like)
 
         elif spec_like is not None:
             raise TypeError("Can't make spec out of %s" % type(spec_like))
 
+    def _parse(self, string):
+        """Parse a string with a single spec into this spec.
+
+        Results are cached in ``parse_cache``, except for strings that
+        may refer to installed specs by hash or to spec files.
+        """
+        cacheable = '/' not in string
+        if cacheable:
+            parsed = parse_cache.get(string)
+            if parsed is not None:
+                # Keep the attributes given to the constructor, which
+                # parsing does not set.
+                attrs = (self._normal, self._concrete, self.external_path,
+                         self.external_modules, self._full_hash)
+                self._dup(parsed)
+                (self._normal, self._concrete, self.external_path,
+                 self.external_modules, self._full_hash) = attrs
+                return
+
+        spec_list = SpecParser(self).parse(string)
+        if len(spec_list) > 1:
+            raise ValueError("More than one spec in string: " + string)
+        if len(spec_list) < 1:
+            raise ValueError("String contains no specs: " + string)
+
+        if cacheable:
+            parse_cache.put(string, self.copy())
+
     @staticmethod
     def _format_module_list(modules):
         """Return a module list that is suitable for YAML serialization
@@ -1375,53 +1752,111 @@ def validate(name, val, allowed_values):
 
         if visited is None:
             visited = set()
-        key = key_fun(self)
 
-        # Node traversal does not yield visited nodes.
-        if key in visited and cover == 'nodes':
-            return
+        if direction == 'children':
+            where = operator.attrgetter('_dependencies')
+            succ = operator.attrgetter('spec')
+        else:
+            where = operator.attrgetter('_dependents')
+            succ = operator.attrgetter('parent')
 
-        def return_val(dspec):
+        def return_val(node, d, dspec):
             if not dspec:
                 # make a fake dspec for the root.
                 if direction == 'parents':
-                    dspec = DependencySpec(self, None, ())
+                    dspec = DependencySpec(node, None, ())
                 else:
-                    dspec = DependencySpec(None, self, ())
+                    dspec = DependencySpec(None, node, ())
             return (d, dspec) if depth else dspec
 
-        yield_me = yield_root or d > 0
+        # The traversal is depth-first, without recursion.  The stack holds
+        # the nodes on the path from the root to the current node, each
+        # with an iterator over the edges to its successors that are left
+        # to traverse, so deep DAGs do not nest generators or calls.
+        stack = []
+        entering = (self, d, dep_spec)
+        while True:
+            if entering:
+                node, d, dspec = entering
+                entering = None
+                key = key_fun(node)
+
+                # Node traversal does not yield visited nodes.
+                if not (key in visited and cover == 'nodes'):
+                    yield_me = yield_root or d > 0
+
+                    # Preorder traversal yields before successors
+                    if yield_me and order == 'pre':
+                        yield return_val(node, d, dspec)
+
+                    # Edge traversal yields but skips children of visited
+                    # nodes
+                    edges = ()
+                    if not (key in visited and cover == 'edges'):
+                        visited.add(key)
+                        edges = sorted(where(node).items())
+                    stack.append((node, d, dspec, yield_me, iter(edges)))
+
+            if not stack:
+                break
 
-        # Preorder traversal yields before successors
-        if yield_me and order == 'pre':
-            yield return_val(dep_spec)
+            node, d, dspec, yield_me, edges = stack[-1]
+            for name, edge in edges:
+                dt = edge.deptypes
+                if dt and not any(t in deptype for t in dt):
+                    continue
+                entering = (succ(edge), d + 1, edge)
+                break
+            else:
+                stack.pop()
 
-        # Edge traversal yields but skips children of visited nodes
-        if not (key in visited and cover == 'edges'):
-            visited.add(key)
+                # Postorder traversal yields after successors
+                if yield_me and order == 'post':
+                    yield return_val(node, d, dspec)
 
-            # This code determines direction and yields the children/parents
-            if direction == 'children':
-                where = self._dependencies
-                succ = lambda dspec: dspec.spec
-            elif direction == 'parents':
-                where = self._dependents
-                succ = lambda dspec: dspec.parent
-            else:
-                raise ValueError('Invalid traversal direction: %s' % direction)
+    def topological_order(self, deptype='all', reverse=False):
+        """Return the nodes of this spec's DAG in topological order.
 
-            for name, dspec in sorted(where.items()):
-                dt = dspec.deptypes
-                if dt and not any(d in deptype for d in dt):
-                    continue
+        Each node comes before its dependencies, or after them if
+        ``reverse`` is True.  Of the nodes that may come next, the one with
+        the first name comes first, so equal DAGs have the same order.
 
-                for child in succ(dspec).traverse_edges(
-                        visited, d + 1, deptype, dspec, **kwargs):
-                    yield child
+        Args:
+            deptype (str or tuple): dependency types to follow
+            reverse (bool): whether to order dependencies first
 
-        # Postorder traversal yields after successors
-        if yield_me and order == 'post':
-            yield return_val(dep_spec)
+        Raises:
+            ValueError: if the DAG has cycles
+        """
+        deptype = dp.canonical_deptype(deptype)
+        nodes = dict((id(s), s) for s in self.traverse(deptype=deptype))
+
+        successors = dict((key, []) for key in nodes)
+        predecessors = dict.fromkeys(nodes, 0)
+        for key, node in nodes.items():
+            for dspec in node._find_deps(node._dependencies, deptype):
+                edge = (key, id(dspec.spec))
+                if reverse:
+                    edge = edge[::-1]
+                successors[edge[0]].append(edge[1])
+                predecessors[edge[1]] += 1
+
+        ready = [(nodes[key].name or '', key)
+                 for key, count in predecessors.items() if not count]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            _, key = heapq.heappop(ready)
+            order.append(nodes[key])
+            for succ in successors[key]:
+                predecessors[succ] -= 1
+                if not predecessors[succ]:
+                    heapq.heappush(ready, (nodes[succ].name or '', succ))
+
+        if len(order) < len(nodes):
+            raise ValueError("Spec has cycles!")
+        return order
 
     @property
     def short_spec(self):
@@ -1465,7 +1900,7 @@ def _spec_hash(self, hash):
         # TODO: curently we strip build dependencies by default.  Rethink
         # this when we move to using package hashing on all specs.
         node_dict = self.to_node_dict(hash=hash)
-        yaml_text = syaml.dump(node_dict, default_flow_style=True)
+        yaml_text = syaml.dump_flow(node_dict)
         sha = hashlib.sha1(yaml_text.encode('utf-8'))
         b32_hash = base64.b32encode(sha.digest()).lower()
 
@@ -1849,6 +2284,50 @@ def from_node_dict(node):
 
         return spec
 
+    @staticmethod
+    def from_interned_node_dict(node, dependencies):
+        """Construct a concrete spec from its node dict and the specs of its
+        dependencies, sharing its data with the specs of the same node read
+        before in the process.
+
+        Databases, environment lockfiles and build cache indices read the
+        same concrete nodes over and over.  The versions, architecture,
+        compiler and variants of a concrete node are frozen, so they are
+        read once for each name and hashes and shared, like copies of
+        concrete specs share them (see ``_dup_node_data()``), as long as a
+        spec of that node is in use.  Each spec still has its own
+        dependencies, dependents, prefix and package, which depend on where
+        it is read from.  Nodes without a DAG hash, or not concrete, are not
+        shared.
+
+        Arguments:
+            node (dict): node dict of the spec
+            dependencies (list): ``(spec, deptypes)`` tuple for each of the
+                dependencies of the spec
+        """
+        name = next(iter(node))
+        fields = node[name]
+        if not (fields.get('hash') and fields.get('concrete', True)):
+            spec = Spec.from_node_dict(node)
+        else:
+            key = (name, fields['hash'], fields.get('full_hash'),
+                   fields.get('build_hash'))
+            interned = _interned_nodes.get(key)
+            if interned is None:
+                interned = Spec.from_node_dict(node)
+                _interned_nodes[key] = interned
+
+            spec = Spec.__new__(Spec)
+            spec._dup(interned, deps=False, caches=False)
+            spec._hash = interned._hash
+            spec._full_hash = interned._full_hash
+            spec._build_hash = interned._build_hash
+            spec._interned = interned
+
+        for dep, deptypes in dependencies:
+            spec._add_dependency(dep, deptypes)
+        return spec
+
     @staticmethod
     def dependencies_from_node_dict(node):
         name = next(iter(node))
@@ -2286,7 +2765,6 @@ def feq(cfield, sfield):
                 if spec._dup(replacement, deps=False, cleardeps=False):
                     changed = True
 
-                spec._dependencies.owner = spec
                 self_index.update(spec)
                 done = False
                 break
@@ -2524,11 +3002,30 @@ def concretize(self, tests=False):
                 if a list of names activate them for the packages in the list,
                 if True activate 'test' dependencies for all packages.
         """
+        import spack.concretization_cache
+
+        key = None
+        if self.name and not self._concrete:
+            key = spack.concretization_cache.cache_key([self], tests=tests)
+
+        if key:
+            cached = spack.concretization_cache.get(key)
+            if cached:
+                self._dup(cached[0])
+                self._mark_concrete()
+                if spack.config.get('config:concretizer') != "clingo":
+                    Spec.ensure_no_deprecated(self)
+                return
+            abstract = self.copy()
+
         if spack.config.get('config:concretizer') == "clingo":
             self._new_concretize(tests)
         else:
             self._old_concretize(tests)
 
+        if key:
+            spack.concretization_cache.put(key, [abstract], [self])
+
     def _mark_concrete(self, value=True):
         """Mark this spec and its dependencies as concrete.
 
@@ -2538,6 +3035,9 @@ def _mark_concrete(self, value=True):
         for s in self.traverse():
             if (not value) and s.concrete and s.package.installed:
                 continue
+            if (not value) and s._concrete:
+                # Stop sharing node data with copies of the spec
+                s._dup_node_data(s)
             s._normal = value
             s._concrete = value
 
@@ -3134,7 +3634,32 @@ def satisfies(self, other, deps=True, strict=False, strict_deps=False):
 
           * `strict`: strict means that we *must* meet all the
             constraints specified on other.
+
+        Results for concrete specs are cached in ``satisfies_cache``.
         """
+        if not self.concrete:
+            return self._satisfies(other, deps, strict, strict_deps)
+
+        # Constraints given as strings are not even parsed again, unless
+        # they refer to hashes, which are looked up in the database.
+        if isinstance(other, six.string_types) and '/' not in other:
+            constraint = other
+        else:
+            other = self._autospec(other)
+            if other.concrete:
+                return self._satisfies(other, deps, strict, strict_deps)
+            constraint = other._cmp_key()
+
+        key = (self.dag_hash(), self.build_hash(), constraint,
+               deps, strict, strict_deps)
+        result = satisfies_cache.get(key)
+        if result is None:
+            result = self._satisfies(other, deps, strict, strict_deps)
+            satisfies_cache.put(key, result)
+        return result
+
+    def _satisfies(self, other, deps, strict, strict_deps):
+        """Non-caching version of satisfies()."""
         other = self._autospec(other)
 
         # The only way to satisfy a concrete spec is to match its hash exactly.
@@ -3339,29 +3864,15 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
                        self.compiler_flags != other.compiler_flags)
 
         self._package = None
+        self._prefix = None
+        self._interned = None
 
         # Local node attributes get copied first.
         self.name = other.name
-        self.versions = other.versions.copy()
-        self.architecture = other.architecture.copy() if other.architecture \
-            else None
-        self.compiler = other.compiler.copy() if other.compiler else None
         if cleardeps:
             self._dependents = DependencyMap()
             self._dependencies = DependencyMap()
-        self.compiler_flags = other.compiler_flags.copy()
-        self.compiler_flags.spec = self
-        self.variants = other.variants.copy()
-
-        # FIXME: we manage _patches_in_order_of_appearance specially here
-        # to keep it from leaking out of spec.py, but we should figure
-        # out how to handle it more elegantly in the Variant classes.
-        for k, v in other.variants.items():
-            patches = getattr(v, '_patches_in_order_of_appearance', None)
-            if patches:
-                self.variants[k]._patches_in_order_of_appearance = patches
-
-        self.variants.spec = self
+        self._dup_node_data(other, share=other._concrete)
         self.external_path = other.external_path
         self.external_modules = other.external_modules
         self.extra_attributes = other.extra_attributes
@@ -3400,6 +3911,43 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
 
         return changed
 
+    def _dup_node_data(self, other, share=False):
+        """Copy the versions, architecture, compiler, compiler flags and
+        variants of another spec node into this one.
+
+        Concrete specs are frozen, so copies of concrete nodes share these
+        with the original (``share=True``) instead of copying them.  Shared
+        data is copied by ``_mark_concrete(False)`` before it can change.
+        """
+        if share:
+            self.versions = other.versions
+            self.architecture = other.architecture
+            self.compiler = other.compiler
+            self.compiler_flags = FlagMap(self)
+            self.compiler_flags.dict.update(other.compiler_flags.dict)
+            self.variants = vt.VariantMap(self)
+            self.variants.dict.update(other.variants.dict)
+            return
+
+        self.versions = other.versions.copy()
+        self.architecture = other.architecture.copy() if other.architecture \
+            else None
+        self.compiler = other.compiler.copy() if other.compiler else None
+        self.compiler_flags = other.compiler_flags.copy()
+        self.compiler_flags.spec = self
+        variants = other.variants.copy()
+
+        # FIXME: we manage _patches_in_order_of_appearance specially here
+        # to keep it from leaking out of spec.py, but we should figure
+        # out how to handle it more elegantly in the Variant classes.
+        for k, v in other.variants.items():
+            patches = getattr(v, '_patches_in_order_of_appearance', None)
+            if patches:
+                variants[k]._patches_in_order_of_appearance = patches
+
+        variants.spec = self
+        self.variants = variants
+
     def _dup_deps(self, other, deptypes, caches):
         new_specs = {self.name: self}
         for dspec in other.traverse_edges(cover='edges',
@@ -3691,159 +4239,9 @@ def format(self, format_string=default_format, **kwargs):
         if re.search(r'[^\\]*\$', format_string):
             return self.old_format(format_string, **kwargs)
 
-        color = kwargs.get('color', False)
-        transform = kwargs.get('transform', {})
-
-        out = six.StringIO()
-
-        def write(s, c=None):
-            f = clr.cescape(s)
-            if c is not None:
-                f = color_formats[c] + f + '@.'
-            clr.cwrite(f, stream=out, color=color)
-
-        def write_attribute(spec, attribute, color):
-            current = spec
-            if attribute.startswith('^'):
-                attribute = attribute[1:]
-                dep, attribute = attribute.split('.', 1)
-                current = self[dep]
-
-            if attribute == '':
-                raise SpecFormatStringError(
-                    'Format string attributes must be non-empty')
-            attribute = attribute.lower()
-
-            sig = ''
-            if attribute[0] in '@%/':
-                # color sigils that are inside braces
-                sig = attribute[0]
-                attribute = attribute[1:]
-            elif attribute.startswith('arch='):
-                sig = ' arch='  # include space as separator
-                attribute = attribute[5:]
-
-            parts = attribute.split('.')
-            assert parts
-
-            # check that the sigil is valid for the attribute.
-            if sig == '@' and parts[-1] not in ('versions', 'version'):
-                raise SpecFormatSigilError(sig, 'versions', attribute)
-            elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
-                raise SpecFormatSigilError(sig, 'compilers', attribute)
-            elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
-                raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
-            elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
-                raise SpecFormatSigilError(sig, 'the architecture', attribute)
-
-            # find the morph function for our attribute
-            morph = transform.get(attribute, lambda s, x: x)
-
-            # Special cases for non-spec attributes and hashes.
-            # These must be the only non-dep component of the format attribute
-            if attribute == 'spack_root':
-                write(morph(spec, spack.paths.spack_root))
-                return
-            elif attribute == 'spack_install':
-                write(morph(spec, spack.store.layout.root))
-                return
-            elif re.match(r'hash(:\d)?', attribute):
-                col = '#'
-                if ':' in attribute:
-                    _, length = attribute.split(':')
-                    write(sig + morph(spec, spec.dag_hash(int(length))), col)
-                else:
-                    write(sig + morph(spec, spec.dag_hash()), col)
-                return
-
-            # Iterate over components using getattr to get next element
-            for idx, part in enumerate(parts):
-                if not part:
-                    raise SpecFormatStringError(
-                        'Format string attributes must be non-empty'
-                    )
-                if part.startswith('_'):
-                    raise SpecFormatStringError(
-                        'Attempted to format private attribute'
-                    )
-                else:
-                    if isinstance(current, vt.VariantMap):
-                        # subscript instead of getattr for variant names
-                        current = current[part]
-                    else:
-                        # aliases
-                        if part == 'arch':
-                            part = 'architecture'
-                        elif part == 'version':
-                            # Version requires concrete spec, versions does not
-                            # when concrete, they print the same thing
-                            part = 'versions'
-                        try:
-                            current = getattr(current, part)
-                        except AttributeError:
-                            parent = '.'.join(parts[:idx])
-                            m = 'Attempted to format attribute %s.' % attribute
-                            m += 'Spec.%s has no attribute %s' % (parent, part)
-                            raise SpecFormatStringError(m)
-                        if isinstance(current, vn.VersionList):
-                            if current == _any_version:
-                                # We don't print empty version lists
-                                return
-
-                    if callable(current):
-                        raise SpecFormatStringError(
-                            'Attempted to format callable object'
-                        )
-                    if not current:
-                        # We're not printing anything
-                        return
-
-            # Set color codes for various attributes
-            col = None
-            if 'variants' in parts:
-                col = '+'
-            elif 'architecture' in parts:
-                col = '='
-            elif 'compiler' in parts or 'compiler_flags' in parts:
-                col = '%'
-            elif 'version' in parts:
-                col = '@'
-
-            # Finally, write the ouptut
-            write(sig + morph(spec, str(current)), col)
-
-        attribute = ''
-        in_attribute = False
-        escape = False
-
-        for c in format_string:
-            if escape:
-                out.write(c)
-                escape = False
-            elif c == '\\':
-                escape = True
-            elif in_attribute:
-                if c == '}':
-                    write_attribute(self, attribute, color)
-                    attribute = ''
-                    in_attribute = False
-                else:
-                    attribute += c
-            else:
-                if c == '}':
-                    raise SpecFormatStringError(
-                        'Encountered closing } before opening {'
-                    )
-                elif c == '{':
-                    in_attribute = True
-                else:
-                    out.write(c)
-        if in_attribute:
-            raise SpecFormatStringError(
-                'Format string terminated while reading attribute.'
-                'Missing terminating }.'
-            )
-        return out.getvalue()
+        template = format_template(format_string)
+        return template.render(self, color=kwargs.get('color', False),
+                               transform=kwargs.get('transform'))
 
     def old_format(self, format_string='$_$@$%@+$+$=', **kwargs):
         """
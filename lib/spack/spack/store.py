@@ -31,9 +31,11 @@
 import llnl.util.tty as tty
 
 import spack.paths
+import spack.build_history
 import spack.config
 import spack.util.path
 import spack.database
+import spack.database_sqlite
 import spack.directory_layout
 
 
@@ -140,6 +142,8 @@ class Store(object):
     not, though we don't recommend that). The database is a signle file
     that caches metadata for the entire Spack installation.  It prevents
     us from having to spider the install tree to figure out what's there.
+    The build history next to the database records the resources used by
+    each build from source.
 
     Args:
         root (str): path to the root of the install tree
@@ -157,14 +161,15 @@ def __init__(
     ):
         self.root = root
         self.unpadded_root = unpadded_root or root
-        self.db = spack.database.Database(
-            root, upstream_dbs=retrieve_upstream_dbs())
+        self.db = create_database(root, upstream_dbs=retrieve_upstream_dbs())
         self.layout = spack.directory_layout.YamlDirectoryLayout(
             root, projections=projections, hash_length=hash_length)
+        self.history = spack.build_history.BuildHistory(
+            os.path.join(root, spack.database._db_dirname))
 
-    def reindex(self):
+    def reindex(self, incremental=False):
         """Convenience function to reindex the store DB with its own layout."""
-        return self.db.reindex(self.layout)
+        return self.db.reindex(self.layout, incremental=incremental)
 
 
 def _store():
@@ -198,11 +203,48 @@ def _store_layout():
     return store.layout
 
 
+def _store_history():
+    return store.history
+
+
 # convenience accessors for parts of the singleton store
 root = llnl.util.lang.LazyReference(_store_root)
 unpadded_root = llnl.util.lang.LazyReference(_store_unpadded_root)
 db = llnl.util.lang.LazyReference(_store_db)
 layout = llnl.util.lang.LazyReference(_store_layout)
+history = llnl.util.lang.LazyReference(_store_history)
+
+
+def create_database(root, upstream_dbs=None, is_upstream=False):
+    """Create the database of the install tree at ``root``.
+
+    The database is kept in SQLite if ``config:database_backend`` is
+    ``sqlite``, and in ``index.json`` otherwise.  Upstream databases are read
+    from SQLite if the Spack instance they belong to keeps them there.
+
+    Args:
+        root (str): path to the root of the install tree
+        upstream_dbs (list): databases of the upstream install trees
+        is_upstream (bool): whether the install tree is an upstream one
+
+    Returns:
+        (spack.database.Database): database of the install tree
+    """
+    if is_upstream:
+        use_sqlite = os.path.exists(os.path.join(
+            root, spack.database._db_dirname,
+            spack.database_sqlite.sqlite_file_name))
+    else:
+        use_sqlite = spack.config.get('config:database_backend') == 'sqlite'
+
+    if use_sqlite and spack.database_sqlite.sqlite3 is None:
+        tty.warn('Python was built without SQLite support: using the JSON '
+                 'database of {0}'.format(root))
+        use_sqlite = False
+
+    db_class = (spack.database_sqlite.SQLiteDatabase if use_sqlite
+                else spack.database.Database)
+    return db_class(root, upstream_dbs=upstream_dbs, is_upstream=is_upstream)
 
 
 def retrieve_upstream_dbs():
@@ -220,7 +262,7 @@ def _construct_upstream_dbs_from_install_roots(
     accumulated_upstream_dbs = []
     for install_root in reversed(install_roots):
         upstream_dbs = list(accumulated_upstream_dbs)
-        next_db = spack.database.Database(
+        next_db = create_database(
             install_root, is_upstream=True, upstream_dbs=upstream_dbs)
         next_db._fail_when_missing_deps = _test
         next_db._read()
@@ -14,7 +14,9 @@
 import platform
 import spack.repo
 import spack.store
+import spack.util.spack_json as sjson
 import spack.binary_distribution as bindist
+import spack.database
 import spack.cmd.buildcache as buildcache
 import spack.cmd.install as install
 import spack.cmd.uninstall as uninstall
@@ -671,3 +673,30 @@ def mock_list_url(url, recursive=False):
     err = capfd.readouterr()[1]
     expect = 'Encountered problem listing packages at {0}'.format(test_url)
     assert expect in err
+
+
+def test_built_specs_share_nodes_with_database(mutable_database, tmpdir):
+    """Test specs read from a build cache index share the data of their
+    nodes with the specs read from databases."""
+    with open(mutable_database._index_path) as f:
+        index = sjson.load(f)
+    for record in index['database']['installs'].values():
+        record['installed'] = False
+
+    cache = bindist.BinaryCacheIndex(str(tmpdir))
+    cache._init_local_index_cache()
+    cache_key = 'index.json'
+    cache._index_file_cache.init_entry(cache_key)
+    with cache._index_file_cache.write_transaction(cache_key) as (old, new):
+        sjson.dump(index, new)
+    cache._associate_built_specs_with_mirror(cache_key, 'file:///mirror')
+
+    db = spack.database.Database(mutable_database.root)
+    spec = db.query_one('mpileaks ^mpich')
+    built_spec = cache.find_built_spec(spec)[0]['spec']
+    assert built_spec is not spec
+    assert built_spec.dag_hash() == spec.dag_hash()
+    for s, t in zip(spec.traverse(), built_spec.traverse()):
+        assert s.versions is t.versions
+        assert s.architecture is t.architecture
+        assert s.compiler is t.compiler
@@ -0,0 +1,77 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.build_history
+import spack.installer as inst
+import spack.spec
+import spack.store
+import spack.util.spack_json as sjson
+import spack.version
+
+
+def test_usage_since():
+    start = spack.build_history.resource_usage()
+    sum(range(100000))
+    usage = spack.build_history.usage_since(start)
+
+    assert set(usage) == set(spack.build_history.metrics)
+    assert usage['wall'] >= 0.0
+    assert usage['cpu'] is None or usage['cpu'] >= 0.0
+    assert usage['max_rss'] is None or usage['max_rss'] > 0
+
+
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_build_history_records(tmpdir):
+    history = spack.build_history.BuildHistory(str(tmpdir))
+    assert history.records() == []
+
+    for name in ('libelf', 'libdwarf', 'libelf'):
+        spec = spack.spec.Spec(name).concretized()
+        history.add(spec, {'wall': 1.0, 'phases': []})
+
+    # A partially written record does not hide the others
+    with open(history.path, 'a') as f:
+        f.write('{"name": "libel')
+
+    records = history.records()
+    assert [r['name'] for r in records] == ['libelf', 'libdwarf', 'libelf']
+    assert records[0]['hash'] == spack.spec.Spec('libelf').concretized(
+    ).dag_hash()
+    assert records[0]['wall'] == 1.0
+
+    assert len(history.records(['libelf'])) == 2
+
+
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_build_history_build_times(tmpdir):
+    history = spack.build_history.BuildHistory(str(tmpdir))
+    for spec, total in (('libelf@0.8.13', 10.0), ('libelf@0.8.12', 20.0),
+                        ('libelf@0.8.13', 30.0), ('libdwarf', 40.0)):
+        history.add(spack.spec.Spec(spec).concretized(), {'total': total})
+
+    times = history.build_times(['libelf'])
+    assert times == {
+        ('libelf', spack.version.Version('0.8.13')): 30.0,
+        ('libelf', spack.version.Version('0.8.12')): 20.0,
+        ('libelf', None): 30.0,
+    }
+
+
+def test_install_records_build_history(install_mockery, mock_fetch):
+    spec = spack.spec.Spec('a').concretized()
+    installer = inst.PackageInstaller([(spec.package, {})])
+    installer.install()
+
+    with open(spec.package.times_log_path) as f:
+        times = sjson.load(f)
+    assert [p['name'] for p in times['phases']] == spec.package.phases
+    for metric in spack.build_history.metrics:
+        assert metric in times
+        assert metric in times['phases'][0]
+
+    records = spack.store.history.records(['a'])
+    assert [r['hash'] for r in records] == [spec.dag_hash()]
+    assert records[0]['total'] == times['total']
@@ -41,7 +41,7 @@ def test_build_task_basics(install_mockery):
                           inst.STATUS_ADDED, [])
     assert task.explicit  # package was "explicitly" requested
     assert task.priority == len(task.uninstalled_deps)
-    assert task.key == (task.priority, task.sequence)
+    assert task.key == (task.priority, -task.critical_path, task.sequence)
 
     # Ensure flagging installed works as expected
     assert len(task.uninstalled_deps) > 0
@@ -0,0 +1,60 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.cmd.build_stats
+import spack.store
+from spack.main import SpackCommand
+
+build_stats = SpackCommand('build-stats')
+
+
+def _records():
+    return [
+        {'name': 'libelf', 'version': '0.8.13', 'compiler': 'gcc@4.5.0',
+         'wall': 10.0, 'cpu': 20.0, 'max_rss': 1024, 'bytes_written': None,
+         'phases': [{'name': 'install', 'wall': 10.0, 'cpu': 20.0,
+                     'max_rss': 1024, 'bytes_written': None}]},
+        {'name': 'libelf', 'version': '0.8.12', 'compiler': 'gcc@4.5.0',
+         'wall': 30.0, 'cpu': 40.0, 'max_rss': 2048, 'bytes_written': None,
+         'phases': []},
+        {'name': 'libdwarf', 'version': '20130729', 'compiler': 'gcc@4.5.0',
+         'wall': 5.0, 'cpu': 5.0, 'max_rss': 4096, 'bytes_written': 100},
+    ]
+
+
+def test_summarize():
+    summaries = dict(spack.cmd.build_stats.summarize(_records()))
+    assert summaries[('libelf',)]['builds'] == 2
+    assert summaries[('libelf',)]['wall'] == 20.0
+    assert summaries[('libelf',)]['max_wall'] == 30.0
+    assert summaries[('libelf',)]['bytes_written'] is None
+    assert summaries[('libdwarf',)]['bytes_written'] == 100
+
+
+def test_summarize_grouped():
+    summaries = dict(spack.cmd.build_stats.summarize(_records(), 'version'))
+    assert summaries[('libelf', '0.8.12')]['wall'] == 30.0
+
+    summaries = dict(
+        spack.cmd.build_stats.summarize(_records(), 'compiler', phases=True))
+    assert list(summaries) == [('libelf', 'gcc@4.5.0', 'install')]
+
+
+@pytest.mark.usefixtures('mock_packages', 'mock_fetch', 'install_mockery')
+def test_build_stats():
+    assert 'No builds recorded' in build_stats()
+
+    SpackCommand('install')('libdwarf')
+    assert len(spack.store.history.records()) == 2
+
+    out = build_stats('--sort', 'cpu', '--group-by', 'version')
+    assert 'libelf' in out and 'libdwarf' in out
+
+    out = build_stats('--phases', 'libelf')
+    assert 'install' in out and 'libdwarf' not in out
+
+    out = build_stats('-n', '1', '--sort', 'max_rss')
+    assert len(out.strip().splitlines()) == 2
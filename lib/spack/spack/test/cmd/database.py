@@ -0,0 +1,38 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import pytest
+
+import spack.database
+import spack.database_sqlite
+import spack.store
+from spack.main import SpackCommand
+
+database = SpackCommand('database')
+
+pytestmark = pytest.mark.skipif(
+    spack.database_sqlite.sqlite3 is None,
+    reason='Python was built without SQLite support')
+
+
+def test_database_requires_sqlite(mutable_database):
+    output = database('export', fail_on_error=False)
+    assert database.returncode != 0
+    assert 'not kept in SQLite' in output
+
+
+def test_database_export_import(mutable_database, monkeypatch):
+    sqlite_db = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    monkeypatch.setattr(spack.store.store, 'db', sqlite_db)
+
+    sqlite_db.remove('mpileaks ^zmpi')
+    database('export')
+    json_db = spack.database.Database(mutable_database.root)
+    assert not json_db.query('mpileaks ^zmpi')
+
+    json_db.remove('mpileaks ^mpich')
+    database('import')
+    assert not sqlite_db.query('mpileaks ^mpich')
+    assert (sorted(sqlite_db.query(installed=any)) ==
+            sorted(json_db.query(installed=any)))
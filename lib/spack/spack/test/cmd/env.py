@@ -444,6 +444,32 @@ def test_init_from_lockfile(tmpdir):
         assert s1 == s2
 
 
+def test_lockfile_specs_are_shared(tmpdir):
+    """Test that environments read from the same lockfile share the data
+    of their nodes."""
+    initial_yaml = StringIO("""\
+env:
+  specs:
+  - mpileaks
+  - libelf
+""")
+    e1 = ev.create('test', initial_yaml)
+    e1.concretize()
+    e1.write()
+
+    e2 = ev.Environment(str(tmpdir.join('e2')), e1.lock_path)
+    e3 = ev.Environment(str(tmpdir.join('e3')), e1.lock_path)
+    assert e2.concretized_order
+    for h in e2.concretized_order:
+        s2, s3 = e2.specs_by_hash[h], e3.specs_by_hash[h]
+        assert s2 is not s3
+        assert s2 == s3 == e1.specs_by_hash[h]
+        for x, y in zip(s2.traverse(), s3.traverse()):
+            assert x.versions is y.versions
+            assert x.architecture is y.architecture
+            assert x.compiler is y.compiler
+
+
 def test_init_from_yaml(tmpdir):
     """Test that an environment can be instantiated from a lockfile."""
     initial_yaml = StringIO("""\
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import os
 from spack.main import SpackCommand
+import spack.directory_layout
 import spack.store
 
 install = SpackCommand('install')
@@ -51,3 +52,41 @@ def test_reindex_with_deprecated_packages(mock_packages, mock_archive,
 
     assert spack.store.db.query(installed=any) == all_installed
     assert spack.store.db.query(installed=True) == non_deprecated
+
+
+def test_reindex_incremental(mock_packages, mock_archive, mock_fetch,
+                             install_mockery, monkeypatch):
+    install('libelf@0.8.13')
+    install('libelf@0.8.12')
+
+    all_installed = spack.store.db.query()
+    spec_files = [spack.store.layout.spec_file_path(s) for s in all_installed]
+
+    read = []
+    read_specs = spack.directory_layout.YamlDirectoryLayout.read_specs
+
+    def _read_specs(layout, paths, jobs=None):
+        read.extend(paths)
+        return read_specs(layout, paths, jobs)
+
+    monkeypatch.setattr(spack.directory_layout.YamlDirectoryLayout,
+                        'read_specs', _read_specs)
+    reindex()
+    assert sorted(read) == sorted(spec_files)
+
+    # Spec files older than the index are not read again
+    index_mtime = os.path.getmtime(spack.store.db._index_path)
+    for path in spec_files:
+        os.utime(path, (index_mtime - 10, index_mtime - 10))
+
+    del read[:]
+    reindex('--incremental')
+    assert spack.store.db.query() == all_installed
+    assert not read
+
+    # Modified spec files are read
+    index_mtime = os.path.getmtime(spack.store.db._index_path)
+    os.utime(spec_files[0], (index_mtime + 10, index_mtime + 10))
+    reindex('--incremental')
+    assert spack.store.db.query() == all_installed
+    assert read == spec_files[:1]
@@ -0,0 +1,165 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import os
+import time
+
+import pytest
+
+import spack.caches
+import spack.concretization_cache
+import spack.concretize
+import spack.config
+import spack.paths
+import spack.repo
+from spack.spec import Spec
+from spack.util.file_cache import FileCache
+
+package_template = '''\
+from spack import *
+
+
+class Cachedpkg(Package):
+    homepage = "http://www.example.com"
+    url = "http://www.example.com/cachedpkg-1.0.tar.gz"
+
+{0}
+    depends_on('libelf')
+'''
+
+provider_template = '''\
+from spack import *
+
+
+class Cachedprovider(Package):
+    homepage = "http://www.example.com"
+    url = "http://www.example.com/cachedprovider-1.0.tar.gz"
+
+    version('1.0', '0123456789abcdef0123456789abcdef')
+{0}
+'''
+
+
+@pytest.fixture()
+def concretization_cache(mutable_config, tmpdir, monkeypatch):
+    """Use an empty misc cache and store concretization results in it."""
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+    spack.config.set('config:concretization_cache', True)
+    yield spack.caches.misc_cache.cache_path(
+        spack.concretization_cache.cache_dir)
+
+
+def _entries(path):
+    return [f for f in os.listdir(path) if f.endswith('.json')]
+
+
+def _no_concretization(*args, **kwargs):
+    raise AssertionError('specs should be read from the cache')
+
+
+def test_cache_hit(concretization_cache, mock_packages, monkeypatch):
+    expected = Spec('mpileaks ^mpich').concretized()
+    assert len(_entries(concretization_cache)) == 1
+
+    monkeypatch.setattr(Spec, '_old_concretize', _no_concretization)
+    spec = Spec('mpileaks ^mpich').concretized()
+    assert spec.concrete
+    assert spec == expected
+    assert spec.dag_hash() == expected.dag_hash()
+    assert spec.build_hash() == expected.build_hash()
+    assert spec['mpi'].name == 'mpich'
+
+
+def test_cache_disabled_by_default(mutable_config, mock_packages,
+                                   tmpdir, monkeypatch):
+    defaults = spack.config.ConfigScope('defaults', os.path.join(
+        spack.paths.etc_path, 'spack', 'defaults'))
+    enabled = defaults.get_section('config')['config']['concretization_cache']
+    assert enabled is False
+
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+    spack.config.set('config:concretization_cache', enabled)
+    Spec('libelf').concretized()
+    assert not os.path.exists(spack.caches.misc_cache.cache_path(
+        spack.concretization_cache.cache_dir))
+
+
+def test_configuration_changes_key(concretization_cache, mock_packages):
+    assert Spec('mpileaks').concretized().satisfies('@2.3')
+
+    spack.config.set('packages:mpileaks', {'version': ['2.2']})
+    assert Spec('mpileaks').concretized().satisfies('@2.2')
+    assert len(_entries(concretization_cache)) == 2
+
+
+def test_concretize_together_cached(concretization_cache, mock_packages,
+                                    monkeypatch):
+    expected = spack.concretize.concretize_specs_together(
+        'mpileaks', 'libelf')
+    assert len(_entries(concretization_cache)) == 1
+
+    monkeypatch.setattr(Spec, '_old_concretize', _no_concretization)
+    specs = spack.concretize.concretize_specs_together('mpileaks', 'libelf')
+    assert [s.build_hash() for s in specs] == [
+        s.build_hash() for s in expected]
+    assert specs[0]['libelf'].dag_hash() == specs[1].dag_hash()
+
+
+def test_package_changes_invalidate(concretization_cache, mutable_mock_repo,
+                                    tmpdir):
+    repo_root, _ = spack.repo.create_repo(
+        str(tmpdir.join('repo')), 'cachetest')
+    package_py = tmpdir.join('repo', 'packages', 'cachedpkg', 'package.py')
+    package_py.ensure()
+
+    def concretize(versions):
+        package_py.write(package_template.format(''.join(
+            "    version('{0}', '0123456789abcdef0123456789abcdef')\n".format(
+                v) for v in versions)))
+        with spack.repo.additional_repository(spack.repo.Repo(repo_root)):
+            return Spec('cachedpkg').concretized()
+
+    assert concretize(['1.0']).satisfies('@1.0')
+    assert concretize(['1.0']).satisfies('@1.0')
+    assert len(_entries(concretization_cache)) == 1
+
+    assert concretize(['1.0', '2.0']).satisfies('@2.0')
+
+
+def test_new_provider_invalidates(concretization_cache, mutable_mock_repo,
+                                  tmpdir, monkeypatch):
+    repo_root, _ = spack.repo.create_repo(
+        str(tmpdir.join('repo')), 'cachetest')
+    package_py = tmpdir.join(
+        'repo', 'packages', 'cachedprovider', 'package.py')
+    package_py.ensure()
+
+    packages_path = str(tmpdir.join('repo', 'packages'))
+    checker_type = spack.repo.FastPackageChecker
+
+    def use_repo(directives, mtime):
+        # The package must look newer than the indexes of the repository,
+        # and its stats are taken again as they would in a new process
+        package_py.write(provider_template.format(directives))
+        os.utime(str(package_py), (mtime, mtime))
+        monkeypatch.delitem(
+            checker_type._paths_cache, packages_path, raising=False)
+        monkeypatch.delitem(
+            checker_type._names_cache, packages_path, raising=False)
+        return spack.repo.additional_repository(spack.repo.Repo(repo_root))
+
+    # The package is not a possible dependency of mpileaks, until it
+    # provides mpi
+    with use_repo('', time.time() - 10):
+        Spec('mpileaks').concretized()
+        key = spack.concretization_cache.cache_key([Spec('mpileaks')])
+        assert spack.concretization_cache.get(key)
+
+    with use_repo("    provides('mpi')", time.time() + 10):
+        assert spack.concretization_cache.cache_key(
+            [Spec('mpileaks')]) == key
+        assert spack.concretization_cache.get(key) is None
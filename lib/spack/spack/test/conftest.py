@@ -130,9 +130,22 @@ def pytest_addoption(parser):
     group.addoption(
         '--fast', action='store_true', default=False,
         help='runs only "fast" unit tests, instead of the whole suite')
+    group.addoption(
+        '--benchmarks', action='store_true', default=False,
+        help='runs the benchmarks too, and reports their timings')
 
 
 def pytest_collection_modifyitems(config, items):
+    if not config.getoption('--benchmarks'):
+        # Timings depend on the machine, so benchmarks don't pass or fail
+        skip_benchmark = pytest.mark.skip(
+            reason='skipped benchmark [--benchmarks command line option '
+                   'not given]'
+        )
+        for item in items:
+            if 'benchmark' in item.keywords:
+                item.add_marker(skip_benchmark)
+
     if not config.getoption('--fast'):
         # --fast not given, run all the tests
         return
@@ -146,6 +159,27 @@ def pytest_collection_modifyitems(config, items):
             item.add_marker(skip_as_slow)
 
 
+#: Timings reported by benchmarks, printed at the end of the session
+_benchmark_timings = []
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _benchmark_timings:
+        terminalreporter.section('benchmark timings')
+        for line in _benchmark_timings:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture()
+def report_timing(request):
+    """Function reporting how long a benchmark took to do something, in
+    seconds, in the summary at the end of the session."""
+    def _report(what, seconds):
+        _benchmark_timings.append('{0}: {1}: {2:.4f}s'.format(
+            request.node.nodeid, what, seconds))
+    return _report
+
+
 #
 # These fixtures are applied to all tests
 #
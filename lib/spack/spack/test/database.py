@@ -10,6 +10,7 @@
 import datetime
 import functools
 import os
+import shutil
 import pytest
 import json
 try:
@@ -21,6 +22,7 @@
 
 from jsonschema import validate
 
+import llnl.util.filesystem as fs
 import llnl.util.lock as lk
 from llnl.util.tty.colify import colify
 
@@ -31,6 +33,7 @@
 import spack.spec
 from spack.util.mock_package import MockPackageMultiRepo
 from spack.util.executable import Executable
+from spack.version import Version
 from spack.schema.database_index import schema
 
 
@@ -910,3 +913,319 @@ def _raise(db, spec):
     with pytest.raises(Exception):
         with spack.store.db.prefix_write_lock(s):
             assert False
+
+
+def test_batched_writes(mutable_database):
+    spec = mutable_database.query_one('libelf')
+    mutable_database.remove(spec)
+
+    def on_disk():
+        db = spack.database.Database(mutable_database.root)
+        with db.read_transaction():
+            return db.query('libelf')
+
+    with mutable_database.batched_writes():
+        mutable_database.add(spec, spack.store.layout)
+        assert mutable_database.is_pending(spec)
+        assert mutable_database.query('libelf') == [spec]
+        assert not on_disk()
+
+        # Pending records survive rereading the index written by others
+        other = spack.database.Database(mutable_database.root)
+        other.update_explicit(other.query_one('mpileaks ^zmpi'), False)
+        with mutable_database.read_transaction():
+            assert mutable_database.query('libelf') == [spec]
+            assert not mutable_database.query('mpileaks ^zmpi', explicit=True)
+        mutable_database._check_ref_counts()
+
+        mutable_database.flush()
+        assert not mutable_database.is_pending(spec)
+        assert on_disk() == [spec]
+
+
+def test_batched_writes_flushed_on_error(mutable_database):
+    spec = mutable_database.query_one('libelf')
+    mutable_database.remove(spec)
+
+    with pytest.raises(ValueError):
+        with mutable_database.batched_writes():
+            mutable_database.add(spec, spack.store.layout)
+            raise ValueError('Mock failure')
+
+    assert not mutable_database.is_pending(spec)
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert db.query('libelf') == [spec]
+
+
+def test_batched_writes_survive_failed_transaction(mutable_database):
+    spec = mutable_database.query_one('libelf')
+    mutable_database.remove(spec)
+
+    with mutable_database.batched_writes():
+        mutable_database.add(spec, spack.store.layout)
+
+        with pytest.raises(ValueError):
+            with mutable_database.write_transaction():
+                raise ValueError('Mock failure')
+
+        # The record is added again after the index is read
+        assert mutable_database.is_pending(spec)
+        assert mutable_database.query('libelf') == [spec]
+
+    assert not mutable_database.is_pending(spec)
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert db.query('libelf') == [spec]
+
+
+def test_journal(mutable_database, monkeypatch):
+    with open(mutable_database._index_path) as f:
+        index = f.read()
+
+    spec = mutable_database.query_one('mpileaks ^zmpi')
+    mutable_database.remove(spec)
+    assert os.path.exists(mutable_database._journal_path)
+
+    # Changes are appended to the journal, leaving the index alone
+    with open(mutable_database._index_path) as f:
+        assert f.read() == index
+
+    other = spack.database.Database(mutable_database.root)
+    with other.read_transaction():
+        assert not other.query('mpileaks ^zmpi')
+
+    # Readers only apply the changes made since they last read
+    def _read_from_file(db, filename):
+        raise AssertionError('The index should not be read again')
+
+    monkeypatch.setattr(
+        spack.database.Database, '_read_from_file', _read_from_file)
+    other.update_explicit(other.query_one('mpileaks ^mpich'), False)
+    with mutable_database.read_transaction():
+        assert not mutable_database.query('mpileaks ^mpich', explicit=True)
+        assert not mutable_database.query('mpileaks ^zmpi')
+    mutable_database._check_ref_counts()
+
+
+def test_journal_compaction(mutable_database, monkeypatch):
+    monkeypatch.setattr(spack.database, '_journal_compaction_ratio', 0)
+    mutable_database.remove('mpileaks ^zmpi')
+    assert not os.path.exists(mutable_database._journal_path)
+
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert not db.query('mpileaks ^zmpi')
+        db._check_ref_counts()
+
+
+def test_journal_incomplete_entry(mutable_database):
+    mutable_database.remove('mpileaks ^zmpi')
+    with open(mutable_database._journal_path, 'ab') as f:
+        f.write(b'{"installs": {"interrupted')
+
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert not db.query('mpileaks ^zmpi')
+        assert db.query('mpileaks ^mpich')
+
+    # The next write replaces the incomplete entry
+    db.remove('mpileaks ^mpich')
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert not db.query('mpileaks ^mpich')
+        db._check_ref_counts()
+
+
+def test_journal_of_replaced_index(mutable_database):
+    mutable_database.remove('mpileaks ^zmpi')
+
+    # An index written without the journal makes the journal stale
+    with open(mutable_database._index_path) as f:
+        db_obj = json.load(f)
+    del db_obj['database']['journal']
+    with open(mutable_database._index_path, 'w') as f:
+        json.dump(db_obj, f)
+
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert db.query('mpileaks ^zmpi')
+
+
+def test_journal_not_read_by_older_versions(mutable_database, monkeypatch):
+    mutable_database.remove('mpileaks ^zmpi')
+
+    # Spack versions that do not know about the journal reject the index
+    monkeypatch.setattr(spack.database, '_db_version', Version('5'))
+    db = spack.database.Database(mutable_database.root)
+    with pytest.raises(spack.database.InvalidDatabaseVersionError):
+        with db.read_transaction():
+            pass
+
+
+def test_journal_of_older_index(mutable_database, monkeypatch):
+    mutable_database.remove('mpileaks ^zmpi')
+
+    # An index written by an older Spack makes the journal stale
+    with open(mutable_database._index_path) as f:
+        db_obj = json.load(f)
+    db_obj['database']['version'] = '5'
+    with open(mutable_database._index_path, 'w') as f:
+        json.dump(db_obj, f)
+
+    def _reindex(db, directory_layout):
+        raise AssertionError('The index should not be rebuilt')
+
+    monkeypatch.setattr(spack.database.Database, 'reindex', _reindex)
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        assert db.query('mpileaks ^zmpi')
+
+    # The first write upgrades the index
+    db.remove('mpileaks ^mpich')
+    with open(mutable_database._index_path) as f:
+        db_obj = json.load(f)
+    assert db_obj['database']['version'] == str(spack.database._db_version)
+    assert db_obj['database']['journal']
+
+
+def test_query_by_name(database, monkeypatch):
+    def _hashes(query):
+        return sorted(s.dag_hash() for s in database.query(query, installed=any))
+
+    expected = dict((query, _hashes(query))
+                    for query in ('mpi', 'mpich', 'mpileaks ^mpich2',
+                                  'callpath@1.0', 'nosuchpackage', '%gcc'))
+
+    # Only the records of the package, or of the providers of a virtual
+    # package, are checked against the query
+    satisfies = spack.spec.Spec.satisfies
+    checked = []
+
+    def _satisfies(spec, other, *args, **kwargs):
+        checked.append(spec.name)
+        return satisfies(spec, other, *args, **kwargs)
+
+    monkeypatch.setattr(spack.spec.Spec, 'satisfies', _satisfies)
+    assert len(database.query('mpileaks', installed=any)) == 3
+    assert checked == ['mpileaks'] * 3
+
+    monkeypatch.setattr(database, '_candidate_records',
+                        lambda query_spec: database._data.items())
+    for query, hashes in expected.items():
+        assert _hashes(query) == hashes
+
+
+def test_get_by_hash_prefix(database):
+    for spec in database.query(installed=any):
+        assert spec in database.get_by_hash(spec.dag_hash()[:7])
+    assert database.get_by_hash('0' * 32) is None
+
+
+def test_install_record_dict(database):
+    records = spack.database.InstallRecordDict(database._data)
+    mpileaks = records.items_with_name('mpileaks')
+    assert len(mpileaks) == 3
+
+    hash_key, record = mpileaks[0]
+    records.pop(hash_key)
+    assert len(records.items_with_name('mpileaks')) == 2
+    assert not records.with_hash_prefix(hash_key)
+
+    records[hash_key] = record
+    del records[mpileaks[1][0]]
+    assert (sorted(h for h, _ in records.items_with_name('mpileaks')) ==
+            sorted([hash_key, mpileaks[2][0]]))
+    assert records.with_hash_prefix(hash_key[:4])[0] is record
+
+    records.clear()
+    assert not records.items_with_name('mpileaks')
+
+
+def test_lazy_records(mutable_database):
+    db = spack.database.Database(mutable_database.root)
+    with db.read_transaction():
+        records = db._data
+        assert all(isinstance(rec, spack.database.LazyInstallRecord)
+                   for rec in records.values())
+
+        # Only the specs of the records a query touches are read, along
+        # with those of their dependencies
+        spec = db.query_one('callpath ^mpich')
+        read = set(h for h, rec in records.items() if rec.spec_is_read)
+        assert read == set(s.dag_hash() for callpath in
+                           mutable_database.query('callpath')
+                           for s in callpath.traverse())
+        assert len(read) < len(records)
+
+        # Specs are shared among records, as when read all at once
+        mpich = db.query_one('mpich')
+        assert any(s is mpich for s in spec.traverse())
+        assert spec == mutable_database.query_one('callpath ^mpich')
+
+        # Dependents are found among all records
+        dependents = db.installed_relatives(mpich, 'parents', False)
+        assert all(rec.spec_is_read for rec in records.values())
+        expected = mutable_database.installed_relatives(
+            mpich, 'parents', False)
+        assert (sorted(s.dag_hash() for s in dependents) ==
+                sorted(s.dag_hash() for s in expected))
+
+
+def test_lazy_records_written_as_read(mutable_database):
+    with open(mutable_database._index_path) as f:
+        expected = json.load(f)['database']['installs']
+
+    db = spack.database.Database(mutable_database.root)
+    db.query_one('callpath ^mpich')
+    with db.write_transaction():
+        db._rewrite_index = True
+
+    with open(mutable_database._index_path) as f:
+        assert json.load(f)['database']['installs'] == expected
+
+
+def _node_data(spec):
+    return [spec.versions, spec.architecture, spec.compiler] + [
+        v for _, v in sorted(spec.variants.items())]
+
+
+def test_specs_shared_among_databases(mutable_database, tmpdir):
+    db = spack.database.Database(mutable_database.root)
+    other = spack.database.Database(str(tmpdir))
+    fs.mkdirp(other._db_dir)
+    shutil.copy(mutable_database._index_path, other._index_path)
+
+    # Each database has its own specs, which share the data of their nodes
+    spec = spack.database.Database(mutable_database.root).query_one(
+        'mpileaks ^mpich')
+    for reader in (db, other):
+        read = reader.query_one('mpileaks ^mpich')
+        assert read is not spec
+        assert read == spec
+        for s, t in zip(spec.traverse(), read.traverse()):
+            assert all(x is y for x, y in zip(_node_data(s), _node_data(t)))
+
+    # Removed specs are not dependents anymore, in their database only
+    callpath = db.query_one('callpath ^mpich')
+    db.remove(db.query_one('mpileaks ^mpich'))
+    assert not db.installed_relatives(callpath, 'parents')
+    assert 'mpileaks' not in callpath._dependents
+    assert 'mpileaks' in spec['callpath']._dependents
+
+
+def test_specs_read_from_database_cache_prefix_and_package(
+        mutable_database, monkeypatch):
+    db = spack.database.Database(mutable_database.root)
+    spec = db.query_one('mpileaks ^mpich')
+    assert spec._interned is not None
+    prefix = spec.prefix
+    assert spec.package is spec.package
+    assert spec.package.spec is spec
+
+    def _query_by_spec_hash(*args, **kwargs):
+        raise AssertionError('the prefix should be cached')
+
+    monkeypatch.setattr(
+        spack.database.Database, 'query_by_spec_hash', _query_by_spec_hash)
+    assert spec.prefix is prefix
@@ -0,0 +1,175 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import os
+
+import pytest
+
+import spack.config
+import spack.database
+import spack.database_sqlite
+import spack.store
+
+pytestmark = [
+    pytest.mark.db,
+    pytest.mark.skipif(spack.database_sqlite.sqlite3 is None,
+                       reason='Python was built without SQLite support'),
+]
+
+
+def _hashes(specs):
+    return sorted(s.dag_hash() for s in specs)
+
+
+@pytest.fixture()
+def sqlite_db(mutable_database):
+    """SQLite database importing the records of the mock database."""
+    db = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    with db.read_transaction():
+        pass
+    return db
+
+
+def test_import(mutable_database, sqlite_db):
+    assert os.path.exists(sqlite_db._sqlite_path)
+
+    with sqlite_db.read_transaction():
+        sqlite_db._check_ref_counts()
+    assert (_hashes(sqlite_db.query(installed=any)) ==
+            _hashes(mutable_database.query(installed=any)))
+    assert (_hashes(sqlite_db.query(explicit=True)) ==
+            _hashes(mutable_database.query(explicit=True)))
+
+    # A new instance reads the stored records
+    db = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    assert (_hashes(db.query(installed=any)) ==
+            _hashes(mutable_database.query(installed=any)))
+
+
+@pytest.mark.parametrize('query', [
+    'mpileaks', 'mpileaks ^mpich', 'libelf@0.8', 'libelf@0.8.13',
+    'libelf@0.8.12:', 'libelf@0-8-13', 'libelf@0_8', 'libelf@0.8.10,0.8.13',
+    'mpi', 'callpath@1.0', 'nosuchpackage',
+])
+def test_query(mutable_database, sqlite_db, query):
+    assert (_hashes(sqlite_db.query(query, installed=any)) ==
+            _hashes(mutable_database.query(query, installed=any)))
+
+
+def test_query_version_spelled_differently(mutable_database, sqlite_db):
+    # Versions are equal regardless of their separators
+    expected = _hashes(mutable_database.query('libelf@0.8.13'))
+    assert expected
+    assert _hashes(sqlite_db.query('libelf@0-8-13')) == expected
+    assert _hashes(sqlite_db.query('libelf@0_8_13')) == expected
+
+
+def test_changes(mutable_database, sqlite_db, monkeypatch):
+    sqlite_db.remove('mpileaks ^zmpi')
+
+    other = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    assert not other.query('mpileaks ^zmpi')
+
+    # Readers only read the records changed since they last read them
+    def _read_index(db):
+        raise AssertionError('All records should not be read again')
+
+    monkeypatch.setattr(
+        spack.database_sqlite.SQLiteDatabase, '_read_index', _read_index)
+    other.update_explicit(other.query_one('mpileaks ^mpich'), False)
+    spec = other.query_one('libelf')
+    other.remove(spec)
+    with sqlite_db.read_transaction():
+        assert not sqlite_db.query('mpileaks ^zmpi')
+        assert not sqlite_db.query('mpileaks ^mpich', explicit=True)
+        assert not sqlite_db.query('libelf')
+        sqlite_db._check_ref_counts()
+
+    other.add(spec, spack.store.layout)
+    assert sqlite_db.query('libelf') == [spec]
+    with sqlite_db.read_transaction():
+        sqlite_db._check_ref_counts()
+
+
+def test_batched_writes(mutable_database, sqlite_db):
+    spec = sqlite_db.query_one('libelf')
+    sqlite_db.remove(spec)
+
+    with sqlite_db.batched_writes():
+        sqlite_db.add(spec, spack.store.layout)
+        assert sqlite_db.is_pending(spec)
+        assert sqlite_db.query('libelf') == [spec]
+
+        other = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+        assert not other.query('libelf')
+
+    assert other.query('libelf') == [spec]
+
+
+def test_batched_writes_survive_failed_transaction(
+        mutable_database, sqlite_db):
+    spec = sqlite_db.query_one('libelf')
+    sqlite_db.remove(spec)
+
+    with sqlite_db.batched_writes():
+        sqlite_db.add(spec, spack.store.layout)
+
+        with pytest.raises(ValueError):
+            with sqlite_db.write_transaction():
+                raise ValueError('Mock failure')
+
+        assert sqlite_db.is_pending(spec)
+        assert sqlite_db.query('libelf') == [spec]
+
+    other = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    assert other.query('libelf') == [spec]
+
+
+@pytest.mark.parametrize('direction', ['children', 'parents'])
+@pytest.mark.parametrize('transitive', [True, False])
+def test_installed_relatives(
+        mutable_database, sqlite_db, direction, transitive):
+    for spec in mutable_database.query():
+        expected = mutable_database.installed_relatives(
+            spec, direction, transitive)
+        relatives = sqlite_db.installed_relatives(spec, direction, transitive)
+        assert _hashes(relatives) == _hashes(expected)
+
+
+def test_reindex(mutable_database, sqlite_db):
+    expected = _hashes(sqlite_db.query(installed=any))
+    sqlite_db.reindex(spack.store.layout)
+    assert _hashes(sqlite_db.query(installed=any)) == expected
+
+    db = spack.database_sqlite.SQLiteDatabase(mutable_database.root)
+    assert _hashes(db.query(installed=any)) == expected
+
+
+def test_export(mutable_database, sqlite_db):
+    sqlite_db.remove('mpileaks ^zmpi')
+    sqlite_db.export_index()
+
+    db = spack.database.Database(mutable_database.root)
+    assert (_hashes(db.query(installed=any)) ==
+            _hashes(sqlite_db.query(installed=any)))
+    assert not db.query('mpileaks ^zmpi')
+
+
+def test_create_database(mutable_database, mutable_config):
+    root = mutable_database.root
+    db = spack.store.create_database(root)
+    assert type(db) is spack.database.Database
+
+    spack.config.set('config:database_backend', 'sqlite')
+    db = spack.store.create_database(root)
+    assert isinstance(db, spack.database_sqlite.SQLiteDatabase)
+
+    # Upstream databases are read from SQLite once it holds their records
+    db = spack.store.create_database(root, is_upstream=True)
+    assert type(db) is spack.database.Database
+    with spack.store.create_database(root).read_transaction():
+        pass
+    db = spack.store.create_database(root, is_upstream=True)
+    assert isinstance(db, spack.database_sqlite.SQLiteDatabase)
@@ -9,6 +9,7 @@
 import os
 import pytest
 
+import spack.directory_layout
 import spack.paths
 import spack.repo
 from spack.directory_layout import YamlDirectoryLayout
@@ -232,6 +233,46 @@ def test_find(layout_and_dir, config, mock_packages):
         assert found_specs[name].eq_dag(spec)
 
 
+def test_read_specs_in_parallel(
+        layout_and_dir, config, mock_packages, monkeypatch):
+    layout, _ = layout_and_dir
+    for name in ('libelf', 'libdwarf', 'mpileaks'):
+        spec = Spec(name).concretized()
+        layout.create_install_directory(spec)
+
+    spec_files = layout.spec_files()
+    serial = layout.read_specs(spec_files, jobs=1)
+    assert len(serial) == 3
+
+    monkeypatch.setattr(spack.directory_layout, 'parallel_read_threshold', 1)
+    parallel = layout.read_specs(spec_files, jobs=2)
+    assert [s.dag_hash() for s in parallel] == [s.dag_hash() for s in serial]
+    assert all(s.concrete for s in parallel)
+
+    with open(spec_files[0], 'w') as f:
+        f.write('{ not a spec')
+    with pytest.raises(spack.directory_layout.SpecReadError):
+        layout.read_specs(spec_files, jobs=2)
+
+
+def test_known_installed_specs(layout_and_dir, config, mock_packages,
+                               monkeypatch):
+    layout, _ = layout_and_dir
+    spec = Spec('libelf').concretized()
+    layout.create_install_directory(spec)
+    installed_spec = layout.read_spec(layout.spec_file_path(spec))
+
+    def _read_spec(path):
+        raise AssertionError('The spec file should not be read')
+
+    with layout.known_installed_specs([installed_spec]):
+        monkeypatch.setattr(layout, 'read_spec', _read_spec)
+        assert layout.check_installed(spec) == spec.prefix
+
+    with pytest.raises(AssertionError):
+        layout.check_installed(spec)
+
+
 def test_yaml_directory_layout_build_path(tmpdir, config):
     """This tests build path method."""
     spec = Spec('python')
@@ -13,12 +13,16 @@
 
 import spack.binary_distribution
 import spack.compilers
+import spack.database
 import spack.directory_layout as dl
+import spack.fetch_strategy
 import spack.installer as inst
+import spack.package
 import spack.package_prefs as prefs
 import spack.repo
 import spack.spec
 import spack.store
+import spack.subprocess_context
 import spack.util.lock as lk
 
 
@@ -1174,3 +1178,217 @@ def test_install_skip_patch(install_mockery, mock_fetch):
 
     spec, install_args = const_arg[0]
     assert inst.package_id(spec.package) in installer.installed
+
+
+def test_install_concurrent_builds(install_mockery, mock_fetch):
+    """Test keeping several builds in flight from one installer."""
+    const_arg = installer_args(['mpileaks'],
+                               {'fake': True, 'concurrent_builds': 3})
+    installer = create_installer(const_arg)
+    installer.install()
+
+    spec, _ = const_arg[0]
+    assert installer.concurrent_builds == 3
+    assert not installer.build_procs
+    for dep in spec.traverse():
+        assert inst.package_id(dep.package) in installer.installed
+        assert dep.package.installed
+
+
+def test_install_batched_db_writes(install_mockery, mock_fetch, monkeypatch):
+    """Test database records are written in batches."""
+    writes = []
+    orig_write = spack.database.Database._write_to_file
+
+    def _write_to_file(db, stream):
+        writes.append(set(db._pending))
+        return orig_write(db, stream)
+
+    monkeypatch.setattr(spack.database.Database, '_write_to_file',
+                        _write_to_file)
+    monkeypatch.setattr(inst, 'db_batch_interval', 3600.0)
+
+    const_arg = installer_args(['mpileaks'],
+                               {'fake': True, 'concurrent_builds': 3})
+    installer = create_installer(const_arg)
+    installer.install()
+
+    spec, _ = const_arg[0]
+    hashes = set(s.dag_hash() for s in spec.traverse() if not s.external)
+    assert set.union(*writes) == hashes
+    assert len(writes) < len(hashes)
+    assert not installer.unflushed
+
+    # The write locks were downgraded once the records were written
+    assert installer.locks
+    for _, (ltype, _) in installer.locks.items():
+        assert ltype == 'read'
+
+
+def test_install_prefetch(install_mockery, mock_fetch, monkeypatch, tmpdir):
+    """Test fetching sources in the background ahead of the builds."""
+    orig_prefetch = inst._prefetch
+    traces = tmpdir.mkdir('prefetched')
+
+    def _prefetch(pkg, kwargs):
+        # Runs in a separate process, so leave a trace on the file system
+        traces.ensure(pkg.name)
+        return orig_prefetch(pkg, kwargs)
+
+    monkeypatch.setattr(inst, '_prefetch', _prefetch)
+
+    const_arg = installer_args(['a'], {'prefetch_jobs': 2})
+    installer = create_installer(const_arg)
+    installer.install()
+
+    spec, _ = const_arg[0]
+    assert installer.prefetch_jobs == 2
+    assert sorted(traces.listdir()) == [traces.join('a'), traces.join('b')]
+    assert not installer.prefetch_queue and not installer.prefetches
+    assert spec.package.installed
+
+
+def test_prefetch_failure(install_mockery, monkeypatch):
+    """Test fetch failures are left for the build to report."""
+    def _fetch(pkg):
+        raise spack.fetch_strategy.FetchError('Mock fetch failure')
+
+    monkeypatch.setattr(spack.package.PackageBase, 'do_fetch', _fetch)
+
+    spec = spack.spec.Spec('a').concretized()
+    assert not inst._prefetch(spec.package, {'sources': True})
+
+
+def test_prefetch_process_context(install_mockery, monkeypatch):
+    """Test background fetches get the package with the parent's state."""
+    processes = []
+
+    class _Process(object):
+        def __init__(self, target, args):
+            processes.append((target, args))
+
+        def start(self):
+            pass
+
+        def is_alive(self):
+            return False
+
+        def join(self):
+            pass
+
+    fetched = []
+    monkeypatch.setattr(inst.multiprocessing, 'Process', _Process)
+    monkeypatch.setattr(
+        inst, '_prefetch', lambda pkg, kwargs: fetched.append(pkg.name))
+
+    const_arg = installer_args(['a'], {'prefetch_jobs': 1})
+    installer = create_installer(const_arg)
+    installer._init_queue()
+    assert len(processes) == 1
+
+    # The dependency is fetched first
+    target, (serialized_pkg, kwargs) = processes[0]
+    assert target is inst._prefetch_in_child
+    assert isinstance(serialized_pkg,
+                      spack.subprocess_context.PackageInstallContext)
+    target(serialized_pkg, kwargs)
+    assert fetched == ['b']
+
+
+def test_install_concurrent_from_cache(install_mockery, mock_fetch,
+                                       monkeypatch):
+    """Test extracting binary packages alongside builds from source."""
+    def _find_binary(pkg, full_hash_match=False):
+        if pkg.name == 'b':
+            return pkg.spec, ['notused']
+        return None, None
+
+    def _extract(pkg, binary_spec, unsigned, preferred_mirrors=None):
+        # Runs in the child process, which must not touch the database
+        spack.store.layout.create_install_directory(pkg.spec)
+        inst._do_fake_install(pkg)
+        return True
+
+    monkeypatch.setattr(inst, '_find_binary', _find_binary)
+    monkeypatch.setattr(inst, '_extract_binary_cache_tarball', _extract)
+
+    const_arg = installer_args(['a'], {'concurrent_builds': 2})
+    installer = create_installer(const_arg)
+    installer.install()
+
+    spec, _ = const_arg[0]
+    assert not installer.build_procs
+    assert spec.package.installed
+
+    # Only the package missing from the binary cache was built from source
+    assert os.path.isfile(spec.package.times_log_path)
+    assert not os.path.isfile(spec['b'].package.times_log_path)
+    assert spec['b'].package.installed
+
+
+def test_install_concurrent_cache_only(install_mockery, monkeypatch):
+    """Test a package missing from the binary cache fails with cache-only."""
+    monkeypatch.setattr(inst, '_find_binary', lambda pkg, f=False: (None, None))
+
+    const_arg = installer_args(['b'],
+                               {'concurrent_builds': 2, 'cache_only': True})
+    installer = create_installer(const_arg)
+    with pytest.raises(SystemExit):
+        installer.install()
+
+    assert not installer.build_procs
+    assert not const_arg[0][0].package.installed
+
+
+@pytest.mark.disable_clean_stage_check
+def test_install_concurrent_builds_failed(install_mockery, mock_fetch, capfd):
+    """Test a failed build in flight removes its dependents' tasks."""
+    const_arg = installer_args(['failing-build', 'b'],
+                               {'concurrent_builds': 2})
+    installer = create_installer(const_arg)
+
+    with pytest.raises(inst.InstallError, match='request failed'):
+        installer.install()
+
+    assert not installer.build_procs
+    failing, _ = const_arg[0]
+    assert inst.package_id(failing.package) in installer.failed
+    b, _ = const_arg[1]
+    assert inst.package_id(b.package) in installer.installed
+
+
+def test_critical_path_priority(install_mockery, monkeypatch):
+    """Test ready tasks are ordered by their remaining critical path."""
+    const_arg = installer_args(['mpileaks'], {})
+    installer = create_installer(const_arg)
+    installer._init_queue()
+
+    spec, _ = const_arg[0]
+    tasks = dict((task.pkg.name, task)
+                 for task in installer.build_tasks.values())
+    assert tasks['mpileaks'].critical_path == inst.default_build_time
+    # libelf -> libdwarf -> dyninst -> callpath -> mpileaks
+    assert tasks['libelf'].critical_path == 5 * inst.default_build_time
+    # mpich -> callpath -> mpileaks
+    assert tasks['mpich'].critical_path == 3 * inst.default_build_time
+    assert installer._pop_task().pkg.name == 'libelf'
+
+    # A long recorded build time for mpich makes it the first to go
+    monkeypatch.setattr(spack.store.history, 'build_times',
+                        lambda names: {('mpich', None): 7200.0})
+    installer = create_installer(const_arg)
+    installer._init_queue()
+    assert installer._pop_task().pkg.name == 'mpich'
+
+
+def test_recorded_build_times(install_mockery, mock_fetch):
+    """Test build times are recorded and looked up for later installs."""
+    const_arg = installer_args(['b'], {})
+    installer = create_installer(const_arg)
+    installer.install()
+
+    spec, _ = const_arg[0]
+    times = spack.store.history.build_times(set(['b', 'c']))
+    assert times[('b', spec.version)] == times[('b', None)]
+    assert times[('b', None)] > 0.0
+    assert ('c', None) not in times
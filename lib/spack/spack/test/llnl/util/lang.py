@@ -5,6 +5,7 @@
 
 import pytest
 
+import copy
 import os.path
 from datetime import datetime, timedelta
 
@@ -137,3 +138,40 @@ def test_uniq():
     assert [1, 2, 3] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 3, 3])
     assert [1, 2, 1] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 1, 1])
     assert [] == llnl.util.lang.uniq([])
+
+
+class _Slotted(object):
+    __slots__ = ('a', 'b', '__dict__')
+
+    __getstate__ = llnl.util.lang.getstate_with_slots
+    __setstate__ = llnl.util.lang.setstate_with_slots
+
+
+class _SlottedWrapper(llnl.util.lang.ObjectWrapper):
+    pass
+
+
+def test_getstate_with_slots():
+    obj = _Slotted()
+    obj.a = [1]
+    obj.c = 3
+    assert llnl.util.lang.slot_names(_Slotted) == ('a', 'b')
+    assert llnl.util.lang.getstate_with_slots(obj) == {'a': [1], 'c': 3}
+
+    clone = copy.deepcopy(obj)
+    assert clone.a == [1] and clone.a is not obj.a
+    assert clone.c == 3
+    assert not hasattr(clone, 'b')
+
+
+def test_object_wrapper_with_slots():
+    obj = _Slotted()
+    obj.a = 1
+    wrapper = _SlottedWrapper(obj)
+    assert isinstance(wrapper, _Slotted)
+    assert isinstance(wrapper, _SlottedWrapper)
+    assert wrapper.a == 1
+
+    # Attributes outside of slots are shared with the wrapped object
+    obj.c = 3
+    assert wrapper.c == 3
@@ -14,6 +14,7 @@
 import unittest
 
 from spack.build_environment import MakeExecutable
+from spack.util.jobserver import Jobserver
 from spack.util.environment import path_put_first
 
 
@@ -22,11 +23,12 @@ class MakeExecutableTest(unittest.TestCase):
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
 
-        make_exe = os.path.join(self.tmpdir, 'make')
-        with open(make_exe, 'w') as f:
-            f.write('#!/bin/sh\n')
-            f.write('echo "$@"')
-        os.chmod(make_exe, 0o700)
+        for name in ('make', 'ninja'):
+            make_exe = os.path.join(self.tmpdir, name)
+            with open(make_exe, 'w') as f:
+                f.write('#!/bin/sh\n')
+                f.write('echo "$@"')
+            os.chmod(make_exe, 0o700)
 
         path_put_first('PATH', [self.tmpdir])
 
@@ -110,3 +112,38 @@ def test_make_jobs_env(self):
         self.assertEqual(make(output=str, jobs_env='MAKE_PARALLELISM',
                               _dump_env=dump_env).strip(), '-j8')
         self.assertEqual(dump_env['MAKE_PARALLELISM'], '8')
+
+    def test_make_jobserver(self):
+        js = Jobserver(os.path.join(self.tmpdir, 'jobserver'), 8)
+        try:
+            make = MakeExecutable('make', 8, js)
+            dump_env = {}
+            self.assertEqual(make(output=str, _dump_env=dump_env).strip(), '')
+            self.assertEqual(dump_env['MAKEFLAGS'], js.makeflags)
+            self.assertEqual(js.held, 0)
+
+            # Not a jobserver client itself, so still needs -j
+            ninja = MakeExecutable('ninja', 8, js)
+            self.assertEqual(ninja('install', output=str,
+                                   _dump_env=dump_env).strip(), '-j8 install')
+            self.assertEqual(dump_env['MAKEFLAGS'], js.makeflags)
+
+            # ... and only gets the jobs that are available
+            self.assertEqual(js.acquire(5), 5)
+            self.assertEqual(ninja(output=str, jobs_env='NINJA_JOBS',
+                                   _dump_env=dump_env).strip(), '-j3')
+            self.assertEqual(dump_env['NINJA_JOBS'], '3')
+            js.release(5)
+            self.assertEqual(js.held, 0)
+
+            # Flags of the caller are kept
+            make(output=str, extra_env={'MAKEFLAGS': '-k'},
+                 _dump_env=dump_env)
+            self.assertEqual(dump_env['MAKEFLAGS'], '-k ' + js.makeflags)
+
+            dump_env = {}
+            self.assertEqual(make('install', parallel=False, output=str,
+                                  _dump_env=dump_env).strip(), 'install')
+            self.assertNotIn('MAKEFLAGS', dump_env)
+        finally:
+            js.close()
@@ -0,0 +1,86 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import time
+
+import pytest
+
+import spack.cmd.dependents
+import spack.cmd.maintainers
+import spack.package_metadata
+import spack.repo
+from spack.version import Version
+
+
+def _no_classes(*args, **kwargs):
+    raise AssertionError('package classes should not be loaded')
+
+
+def test_metadata_index_matches_classes(mock_packages):
+    for name in spack.repo.path.all_package_names():
+        pkg_class = spack.repo.path.get_pkg_class(name)
+        metadata = spack.repo.path.package_metadata(name)
+        assert (metadata.to_dict() ==
+                spack.package_metadata.metadata_from_class(pkg_class))
+
+
+def test_package_metadata(mock_packages):
+    pkg = spack.repo.path.package_metadata('mpileaks')
+    assert pkg.fullname == 'builtin.mock.mpileaks'
+    assert pkg.homepage == 'http://www.llnl.gov'
+    assert sorted(pkg.versions) == [
+        Version('1.0'), Version('2.1'), Version('2.2'), Version('2.3')]
+    assert pkg.variants['shared']['default'] is True
+    assert sorted(pkg.dependencies_of_type('link')) == ['callpath', 'mpi']
+    assert pkg.dependencies_of_type('run') == []
+
+    pkg = spack.repo.path.package_metadata('multivalue-variant')
+    assert pkg.variants['foo']['multi']
+    assert pkg.variants['foo']['values'] == [
+        'bar', 'barbaz', 'baz', 'none']
+
+    pkg = spack.repo.path.package_metadata('conflict')
+    assert pkg.conflicts['%clang'] == [['+foo', None]]
+
+    pkg = spack.repo.path.package_metadata('zmpi')
+    assert pkg.provided == {'mpi@:10.0': ['zmpi']}
+
+    assert spack.repo.path.package_metadata('maintainers-1').maintainers == [
+        'user1', 'user2']
+
+
+def test_unknown_package_metadata(mock_packages):
+    with pytest.raises(spack.repo.UnknownPackageError):
+        spack.repo.path.package_metadata('nonexistentpackage')
+
+
+def test_commands_do_not_load_classes(mock_packages, monkeypatch):
+    dag = spack.cmd.dependents.inverted_dependencies()
+    maintained = spack.cmd.maintainers.maintained_packages()
+
+    monkeypatch.setattr(spack.repo.Repo, 'get_pkg_class', _no_classes)
+    assert spack.cmd.dependents.inverted_dependencies() == dag
+    assert spack.cmd.maintainers.maintained_packages() == maintained
+
+
+def test_metadata_index_updated_with_core(mock_packages, monkeypatch):
+    repo = spack.repo.path.get_repo('builtin.mock')
+    index = spack.repo.RepoIndex(repo._pkg_checker, repo.namespace)
+    index.add_indexer('metadata', spack.repo.MetadataIndexer())
+    index['metadata']
+
+    # Nothing changed, so the index is read back
+    index = spack.repo.RepoIndex(repo._pkg_checker, repo.namespace)
+    index.add_indexer('metadata', spack.repo.MetadataIndexer())
+    monkeypatch.setattr(spack.repo.Repo, 'get_pkg_class', _no_classes)
+    index['metadata']
+
+    # A change in Spack's core invalidates the metadata of all packages
+    monkeypatch.setattr(spack.package_metadata, 'core_mtime',
+                        lambda: time.time() + 3600)
+    index = spack.repo.RepoIndex(repo._pkg_checker, repo.namespace)
+    index.add_indexer('metadata', spack.repo.MetadataIndexer())
+    with pytest.raises(AssertionError):
+        index['metadata']
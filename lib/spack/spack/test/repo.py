@@ -4,10 +4,14 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import time
+
 import pytest
 
+import spack.caches
 import spack.repo
 import spack.paths
+from spack.util.file_cache import FileCache
 
 
 @pytest.fixture()
@@ -79,3 +83,101 @@ def test_namespace_hasattr(attr_name, exists, mutable_mock_repo):
     # of a custom __getattr__ implementation
     nms = spack.repo.SpackNamespace('spack.pkg.builtin.mock')
     assert hasattr(nms, attr_name) == exists
+
+
+def test_repo_index_parallel_update(mutable_mock_repo, tmpdir, monkeypatch):
+    repo = mutable_mock_repo.get_repo('builtin.mock')
+    monkeypatch.setattr(spack.repo, 'parallel_index_threshold', 1)
+
+    def build_indexes(cache, jobs):
+        monkeypatch.setattr(
+            spack.caches, 'misc_cache', FileCache(str(tmpdir.join(cache))))
+        index = spack.repo.RepoIndex(repo._pkg_checker, repo.namespace)
+        for name, indexer in repo.index.indexers.items():
+            index.add_indexer(name, type(indexer)())
+        index._build_all_indexes(jobs=jobs)
+        return index.indexes
+
+    def check_same(indexes, expected):
+        assert indexes['providers'] == expected['providers']
+        assert indexes['patches'].index == expected['patches'].index
+        assert (indexes['metadata'].packages ==
+                expected['metadata'].packages)
+        assert sorted(indexes['tags']) == sorted(expected['tags'])
+        for tag in expected['tags']:
+            assert sorted(indexes['tags'][tag]) == sorted(
+                expected['tags'][tag])
+
+    expected = build_indexes('serial', 1)
+    check_same(build_indexes('parallel', 2), expected)
+
+    # Updating all the packages in existing indexes gives the same result
+    for name in expected:
+        index_file = spack.caches.misc_cache.cache_path(
+            '{0}/{1}-index.json'.format(name, repo.namespace))
+        os.utime(index_file, (0, 0))
+    check_same(build_indexes('parallel', 2), expected)
+
+
+def test_package_checker_snapshot(tmpdir, monkeypatch):
+    checker_type = spack.repo.FastPackageChecker
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+
+    def make_checker():
+        monkeypatch.setattr(checker_type, '_paths_cache', {})
+        monkeypatch.setattr(checker_type, '_names_cache', {})
+        return checker_type(str(packages))
+
+    packages = tmpdir.join('packages')
+    packages.ensure('a', 'package.py')
+    packages.ensure('b', 'package.py')
+    packages.ensure('c', dir=True)
+    packages.ensure('d')
+    settled = time.time() - 60
+    os.utime(str(packages), (settled, settled))
+    assert sorted(make_checker()) == ['a', 'b']
+
+    # The snapshot is used while the repository directory is unchanged, so
+    # only the directories without a package file are checked again
+    stat_package = checker_type._stat_package
+    checked = []
+
+    def _stat_package(self, pkg_name):
+        checked.append(pkg_name)
+        return stat_package(self, pkg_name)
+
+    monkeypatch.setattr(checker_type, '_stat_package', _stat_package)
+    packages.ensure('c', 'package.py')
+    checker = make_checker()
+    assert sorted(checker) == ['a', 'b', 'c']
+    assert 'a' in checker
+    assert checked == ['c']
+
+    # Package files are stat'ed when their stats are needed
+    mtime = os.stat(str(packages.join('a', 'package.py'))).st_mtime
+    assert checker['a'].st_mtime == mtime
+    assert sorted(checked) == ['a', 'b', 'c', 'c']
+
+    # Adding a package modifies the repository directory
+    packages.ensure('e', 'package.py')
+    os.utime(str(packages), (settled + 1, settled + 1))
+    assert sorted(make_checker()) == ['a', 'b', 'c', 'e']
+
+    # Package files removed since the snapshot was taken are found when the
+    # stats are taken
+    packages.join('b', 'package.py').remove()
+    checker = make_checker()
+    assert 'b' in checker
+    assert sorted(name for name, _ in checker.items()) == ['a', 'c', 'e']
+    assert sorted(checker) == ['a', 'c', 'e']
+    assert 'b' not in checker
+    with pytest.raises(KeyError):
+        checker['b']
+
+    # The names are found again if they are dropped from the cache
+    monkeypatch.delitem(checker_type._paths_cache, str(packages))
+    monkeypatch.delitem(checker_type._names_cache, str(packages))
+    assert sorted(checker) == ['a', 'b', 'c', 'e']
+    assert len(checker.values()) == 3
+    assert sorted(checker) == ['a', 'c', 'e']
@@ -89,3 +89,30 @@ def test_yaml_aliases():
 
     # ensure no YAML aliases appear in syaml dumps.
     assert '*id' not in string
+
+
+@pytest.mark.parametrize('obj', [
+    {'a': 'b'},
+    syaml.syaml_dict([('zlib', syaml.syaml_dict([
+        ('version', '1.2.11'),
+        ('arch', {'platform': 'linux', 'target': 'x86_64'}),
+        ('parameters', syaml.syaml_dict([
+            ('optimize', True), ('pic', False), ('cflags', []),
+            ('cppflags', ['-O3', '-g -fPIC'])])),
+        ('dependencies', {'cmake': {'hash': 'x', 'type': ['build']}}),
+    ]))]),
+    [1, -1, None, True, '', [], {}, ('a', 'b')],
+    # Strings that would be read back as something else are quoted
+    {'float': '1.0', 'int': '12', 'hex': '0x10', 'bool': 'true',
+     'null': 'null', 'date': '2013-07-29', 'yes': 'yes', 'path': '/a/b'},
+    # Others are left to the YAML emitter
+    {'a': 'b: c', 'b': '#x', 'c': '@x', 'd': '-', 'e': '...', 'f': ' x',
+     'g': 'x ', 'h': 'a  b', 'i': 'x\ny', 'j': "it's", 'k': 1.5,
+     'l': syaml.syaml_str('~')},
+    {None: 'a'},
+    {'x' * 128: 'a'},
+    syaml.OrderedDict([('b', 1), ('a', 2)]),
+    'plain',
+])
+def test_dump_flow(obj):
+    assert syaml.dump_flow(obj) == syaml.dump(obj, default_flow_style=True)
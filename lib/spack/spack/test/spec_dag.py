@@ -5,6 +5,9 @@
 """
 These tests check Spec DAG operations using dummy packages.
 """
+import sys
+import timeit
+
 import pytest
 import spack.architecture
 import spack.error
@@ -13,6 +16,7 @@
 from spack.spec import Spec
 from spack.dependency import all_deptypes, Dependency, canonical_deptype
 from spack.util.mock_package import MockPackageMultiRepo
+from spack.version import Version
 
 
 def check_links(spec_to_check):
@@ -617,6 +621,36 @@ def test_copy_concretized(self):
         copy_ids = set(id(s) for s in copy.traverse())
         assert not orig_ids.intersection(copy_ids)
 
+    def test_copy_concretized_shares_node_data(self):
+        orig = Spec('mpileaks').concretized()
+        copy = orig.copy()
+        for a, b in zip(orig.traverse(), copy.traverse()):
+            assert a is not b
+            assert a.versions is b.versions
+            assert a.compiler is b.compiler
+            assert a.architecture is b.architecture
+            assert a.variants is not b.variants
+            assert b.variants.spec is b and b.compiler_flags.spec is b
+            assert all(a.variants[v] is b.variants[v] for v in a.variants)
+
+        # Data is copied before a copy can change
+        copy._mark_concrete(False)
+        for a, b in zip(orig.traverse(), copy.traverse()):
+            assert a.versions is not b.versions
+            assert a.architecture is not b.architecture
+            assert not any(a.variants[v] is b.variants[v] for v in a.variants)
+
+        copy.versions.add(Version('100'))
+        copy.variants['debug'].value = True
+        assert orig.satisfies('@:10 ~debug')
+        assert orig.dag_hash() == Spec('mpileaks').concretized().dag_hash()
+
+    def test_copy_normalized_does_not_share_node_data(self):
+        orig = Spec('mpileaks').normalized()
+        copy = orig.copy()
+        for a, b in zip(orig.traverse(), copy.traverse()):
+            assert a.versions is not b.versions
+
     """
     Here is the graph with deptypes labeled (assume all packages have a 'dt'
     prefix). Arrows are marked with the deptypes ('b' for 'build', 'l' for
@@ -982,3 +1016,119 @@ def test_invalid_literal_spec(self):
         # Can't use more than one ':' separator
         with pytest.raises(KeyError):
             Spec.from_literal({'foo': {'bar:build:link': None}})
+
+
+def _recursive_traverse_edges(spec, visited, d, dspec, kwargs):
+    """Recursive traversal of a DAG, as implemented before traverse_edges()
+    was made iterative, used as a reference."""
+    cover = kwargs.get('cover', 'nodes')
+    order = kwargs.get('order', 'pre')
+    parents = kwargs.get('direction', 'children') == 'parents'
+    deptype = canonical_deptype(kwargs.get('deptype', 'all'))
+
+    if id(spec) in visited and cover == 'nodes':
+        return
+    yield_me = kwargs.get('root', True) or d > 0
+    if yield_me and order == 'pre':
+        yield d, dspec
+    if not (id(spec) in visited and cover == 'edges'):
+        visited.add(id(spec))
+        where = spec._dependents if parents else spec._dependencies
+        for name, edge in sorted(where.items()):
+            if edge.deptypes and not any(t in deptype for t in edge.deptypes):
+                continue
+            succ = edge.parent if parents else edge.spec
+            for item in _recursive_traverse_edges(
+                    succ, visited, d + 1, edge, kwargs):
+                yield item
+    if yield_me and order == 'post':
+        yield d, dspec
+
+
+def _layered_dag(layers, width, fanout):
+    """Make a DAG of ``layers`` layers of ``width`` nodes below a root, with
+    each node depending on ``fanout`` nodes of the next layer."""
+    deptypes = [('build',), ('link',), ('build', 'link'), ('link', 'run')]
+    nodes = [[Spec('node-{0}-{1}@1.0'.format(i, j)) for j in range(width)]
+             for i in range(layers)]
+    root = Spec('root@1.0')
+    for j, node in enumerate(nodes[0]):
+        root._add_dependency(node, deptypes[j % len(deptypes)])
+    for i in range(layers - 1):
+        for j, node in enumerate(nodes[i]):
+            for k in range(fanout):
+                dep = nodes[i + 1][(j * fanout + k) % width]
+                node._add_dependency(dep, deptypes[(i + j + k) % 4])
+    root._mark_concrete()
+    return root
+
+
+@pytest.mark.parametrize('cover', ['nodes', 'edges', 'paths'])
+@pytest.mark.parametrize('order', ['pre', 'post'])
+@pytest.mark.parametrize('direction', ['children', 'parents'])
+@pytest.mark.parametrize('deptype', ['all', 'build', ('link', 'run')])
+@pytest.mark.parametrize('root', [True, False])
+def test_traverse_edges_matches_recursive(cover, order, direction, deptype,
+                                          root):
+    dag = _layered_dag(4, 5, 2)
+    start = dag if direction == 'children' else dag['node-3-0']
+    kwargs = dict(cover=cover, order=order, direction=direction,
+                  deptype=deptype, root=root)
+
+    # The root is yielded with a fake edge
+    fake = (None, start) if direction == 'children' else (start, None)
+    expected = [(d,) + ((dspec.parent, dspec.spec) if dspec else fake)
+                for d, dspec in
+                _recursive_traverse_edges(start, set(), 0, None, kwargs)]
+    edges = [(d, dspec.parent, dspec.spec) for d, dspec in
+             start.traverse_edges(depth=True, **kwargs)]
+    assert edges == expected
+
+
+def test_traverse_deep_dag():
+    """DAGs deeper than the recursion limit can be traversed."""
+    nodes = [Spec('node-{0}'.format(i))
+             for i in range(sys.getrecursionlimit() + 100)]
+    for parent, child in zip(nodes, nodes[1:]):
+        parent._add_dependency(child, ('link',))
+
+    assert list(nodes[0].traverse()) == nodes
+    assert list(nodes[0].traverse(order='post')) == nodes[::-1]
+    assert list(nodes[-1].traverse(direction='parents')) == nodes[::-1]
+    assert nodes[0].topological_order() == nodes
+
+
+def test_topological_order():
+    dag = _layered_dag(4, 5, 2)
+    order = dag.topological_order()
+    assert set(order) == set(dag.traverse())
+    for spec in order:
+        for dep in spec.dependencies():
+            assert order.index(spec) < order.index(dep)
+
+    # Nodes are ordered by name where the DAG does not decide
+    assert [s.name for s in order[:6]] == [
+        'root', 'node-0-0', 'node-0-1', 'node-0-2', 'node-0-3', 'node-0-4']
+
+    order = dag.topological_order(reverse=True)
+    for spec in order:
+        for dep in spec.dependencies():
+            assert order.index(spec) > order.index(dep)
+
+    order = dag.topological_order(deptype='build')
+    assert set(order) == set(dag.traverse(deptype='build'))
+
+
+@pytest.mark.benchmark
+def test_traversal_benchmark(report_timing):
+    """Time traversing a 1,000 node DAG, and with the recursive
+    implementation."""
+    dag = _layered_dag(100, 10, 3)
+    assert len(list(dag.traverse())) == 1001
+
+    for kwargs in ({}, {'cover': 'edges'}, {'order': 'post'}):
+        report_timing('recursive {0}'.format(kwargs), timeit.timeit(
+            lambda: list(_recursive_traverse_edges(
+                dag, set(), 0, None, kwargs)), number=20))
+        report_timing('iterative {0}'.format(kwargs), timeit.timeit(
+            lambda: list(dag.traverse_edges(**kwargs)), number=20))
@@ -3,9 +3,15 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import copy
+import gc
+import pickle
 import sys
 import pytest
 
+import llnl.util.tty.color as clr
+from llnl.util.lang import slot_names
+
 from spack.error import SpecError, UnsatisfiableSpecError
 from spack.spec import UnconstrainableDependencySpecError
 from spack.spec import Spec, SpecFormatSigilError, SpecFormatStringError
@@ -14,8 +20,13 @@
 from spack.variant import substitute_abstract_variants
 
 import spack.architecture
+import spack.database
 import spack.directives
 import spack.error
+import spack.paths
+import spack.platforms.linux
+import spack.repo
+import spack.spec
 
 
 def make_spec(spec_like, concrete):
@@ -1030,3 +1041,206 @@ def test_is_extension_after_round_trip_to_dict(config, spec_str):
     # Using 'y' since the round-trip make us lose build dependencies
     for d in y.traverse():
         assert x[d.name].package.is_extension == y[d.name].package.is_extension
+
+
+def test_concrete_spec_pickle_and_copy(config, mock_packages):
+    spec = Spec('mpileaks cflags=-O2 ^mpich').concretized()
+    spec.mpicc = 'mpicc'
+
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        clone = pickle.loads(pickle.dumps(spec, protocol))
+        assert clone == spec
+        assert clone.dag_hash() == spec.dag_hash()
+        assert clone.mpicc == 'mpicc'
+
+    for clone in (copy.copy(spec), copy.deepcopy(spec)):
+        assert clone == spec
+        assert clone.dag_hash() == spec.dag_hash()
+
+
+def test_spec_components_have_no_instance_dict(config, mock_packages):
+    spec = Spec('mpileaks cflags=-O2 ^mpich').concretized()
+    for node in spec.traverse():
+        assert not node.__dict__
+        components = [node.architecture, node.compiler, node.variants,
+                      node.compiler_flags, node._dependencies,
+                      node._dependents]
+        components.extend(node.variants.values())
+        components.extend(node._dependencies.values())
+        for component in components:
+            assert not hasattr(component, '__dict__')
+
+
+def test_concrete_spec_from_dict_has_no_instance_dict(config, mock_packages):
+    """Test concrete specs read from dicts, as done for install databases,
+    environments and build cache indices, keep their attributes in slots."""
+    specs = [Spec(s).concretized()
+             for s in ('mpileaks ^mpich', 'mpileaks ^zmpi', 'dttop')]
+
+    for spec in specs:
+        read = Spec.from_dict(spec.to_dict())
+        assert read.dag_hash() == spec.dag_hash()
+        for node in read.traverse():
+            assert not vars(node)
+            components = [node.architecture, node.compiler, node.variants,
+                          node.compiler_flags, node._dependencies,
+                          node._dependents]
+            components.extend(node.variants.values())
+            components.extend(node._dependencies.values())
+            components.extend(node._dependents.values())
+            for component in components:
+                assert not hasattr(component, '__dict__'), type(component)
+
+
+def _traced_copies(objects, classes):
+    """Bytes allocated to copy the objects, as instances of the classes
+    mapped to their own, with the same attribute values."""
+    import tracemalloc
+
+    copies = []
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for obj in objects:
+        cls = classes[type(obj)]
+        clone = cls.__new__(cls)
+        for name in slot_names(type(obj)):
+            if hasattr(obj, name):
+                object.__setattr__(clone, name, getattr(obj, name))
+        copies.append(clone)
+    return tracemalloc.get_traced_memory()[0] - before
+
+
+@pytest.mark.skipif(sys.version_info < (3, 4),
+                    reason='tracemalloc is not available')
+def test_concrete_spec_memory(database):
+    """Measure the memory taken by concrete specs read from a database,
+    compared with the same specs keeping their attributes in instance
+    dicts instead of slots."""
+    import tracemalloc
+
+    def read_specs():
+        db = spack.database.Database(database.root)
+        with db.read_transaction():
+            return db.query(installed=any)
+
+    # The first read makes the node data shared among all readers
+    read_specs()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        read = [read_specs() for _ in range(20)]
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+
+        # The objects each reader has its own copy of
+        objects = []
+        for specs in read:
+            for spec in specs:
+                objects.extend([spec, spec.variants, spec.compiler_flags,
+                                spec._dependencies, spec._dependents])
+                objects.extend(spec._dependencies.values())
+        nodes = sum(len(specs) for specs in read)
+
+        slotted = dict((cls, cls) for cls in set(map(type, objects)))
+        unslotted = dict((cls, type(cls.__name__, (object,), {}))
+                         for cls in slotted)
+        with_slots = _traced_copies(objects, slotted)
+        with_dicts = _traced_copies(objects, unslotted)
+    finally:
+        tracemalloc.stop()
+
+    assert nodes >= 200
+    # About 2100 bytes per node read, of which 520 for the objects above,
+    # which would take 1280 bytes with instance dicts (Python 3.8)
+    assert with_slots < with_dicts, (
+        '{0} bytes per node read, {1} with slots, {2} with dicts'.format(
+            used // nodes, with_slots // nodes, with_dicts // nodes))
+
+
+@pytest.mark.parametrize('constraint,expected', [
+    ('mpileaks', True), ('^mpich', True), ('^zmpi', False), ('^mpi', True),
+    ('mpileaks+debug', False), ('^callpath ^dyninst', True), ('libelf', False)
+])
+def test_satisfies_cache(
+        config, mock_packages, monkeypatch, constraint, expected):
+    cache = spack.spec.SatisfiesCache()
+    monkeypatch.setattr(spack.spec, 'satisfies_cache', cache)
+    spec = Spec('mpileaks ^mpich').concretized()
+
+    for other in (constraint, Spec(constraint)):
+        assert spec.satisfies(other) is expected
+        hits = cache.hits
+        assert spec.satisfies(other) is expected
+        assert cache.hits == hits + 1
+
+    # Specs equal to the one checked share results
+    assert spec.copy().satisfies(constraint) is expected
+    assert cache.hits == hits + 2
+
+
+def test_satisfies_cache_invalidation(config, mock_packages, monkeypatch):
+    cache = spack.spec.SatisfiesCache(max_size=2)
+    monkeypatch.setattr(spack.spec, 'satisfies_cache', cache)
+    spec = Spec('mpich').concretized()
+    assert spec.satisfies('mpi')
+    assert spec.satisfies('mpi')
+    assert cache.hits == 1
+
+    # Results are not kept once the repository is swapped
+    repo = spack.repo.RepoPath(spack.paths.mock_packages_path)
+    with spack.repo.swap(repo):
+        assert spec.satisfies('mpi')
+        assert cache.hits == 1
+
+    # String constraints on the architecture are resolved for the platform
+    assert spec.satisfies('os=be')
+    assert spec.satisfies('os=be')
+    assert cache.hits == 2
+    monkeypatch.setattr(
+        spack.architecture, 'platform', spack.platforms.linux.Linux)
+    assert not spec.satisfies('os=be')
+    assert cache.hits == 2
+
+    # The cache is bounded
+    spec.satisfies('mpich@1:')
+    spec.satisfies('mpich@:1')
+    assert len(cache._results) <= 2
+
+
+def test_format_templates_are_cached(config, mock_packages):
+    fmt = '{name}{@version}{%compiler.name}{variants}{/hash:7}'
+    template = spack.spec.format_template(fmt)
+    assert spack.spec.format_template(fmt) is template
+
+    spec = Spec('mpileaks').concretized()
+    for s in spec.traverse():
+        assert s.format(fmt) == template.render(s)
+        assert s.format(fmt, color=True) == template.render(s, color=True)
+
+
+def test_format_template_render():
+    template = spack.spec.FormatTemplate(
+        r'\{{name}\}-{^callpath.@version}/{variants.debug}')
+    assert [p if isinstance(p, str) else p.attribute
+            for p in template.pieces] == [
+        '{', 'name', '}-', 'version', '/', 'variants.debug']
+
+    spec = Spec('mpileaks+debug ^callpath@1.0')
+    assert template.render(spec) == '{mpileaks}-@1.0/+debug'
+    assert template.render(
+        spec, transform={'name': lambda s, x: x.upper()}
+    ) == '{MPILEAKS}-@1.0/+debug'
+    assert template.render(spec, color=True) == (
+        '{mpileaks}-' + clr.colorize('@c@@1.0@./@B+debug@.', color=True))
+
+    # Parts that are not set are not printed
+    assert template.render(Spec('mpileaks ^callpath')) == '{mpileaks}-/'
+
+
+def test_format_template_errors_are_not_cached():
+    fmt = '{name}{@name}'
+    for _ in range(2):
+        with pytest.raises(SpecFormatSigilError):
+            spack.spec.format_template(fmt)
+    assert ('{name}{@name}',) not in spack.spec.format_template.cache
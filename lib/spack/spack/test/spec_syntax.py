@@ -5,11 +5,16 @@
 import itertools
 import os
 import pytest
+import re
 import shlex
+import timeit
 
 import llnl.util.filesystem as fs
 
+import spack.architecture
 import spack.hash_types as ht
+import spack.parse
+import spack.platforms.linux
 import spack.repo
 import spack.store
 import spack.spec as sp
@@ -829,3 +834,168 @@ def test_compare_abstract_specs(self):
         for a, b in itertools.product(specs, repeat=2):
             # Check that we can compare without raising an error
             assert a <= b or b < a
+
+
+def test_lexer_token_positions():
+    tokens = sp.SpecLexer().lex(['foo@1.2', 'cflags=-O2 -g', '^bar'])
+    assert [(t.type, t.value, t.start, t.end) for t in tokens] == [
+        (sp.ID, 'foo', 0, 3),
+        (sp.AT, '@', 3, 4),
+        (sp.ID, '1.2', 4, 7),
+        (sp.ID, 'cflags', 0, 6),
+        (sp.EQ, '=', 6, 7),
+        (sp.VAL, '-O2 -g', 7, 13),
+        (sp.DEP, '^', 0, 1),
+        (sp.ID, 'bar', 1, 4),
+    ]
+
+
+def test_lexer_mode_is_reset():
+    lexer = sp.SpecLexer()
+    lexer.lex(['cflags='])
+    assert lexer.lex(['foo'])[0].type == sp.ID
+
+
+def test_lex_error_position():
+    with pytest.raises(spack.parse.LexError) as e:
+        sp.SpecLexer().lex(['foo@1.2$'])
+    assert e.value.pos == 7
+
+
+@pytest.mark.parametrize('text', [
+    'foo  bar\tbaz\n', 'foo cflags="-O2 -g"', "foo cflags='-O2'", 'a\\ b',
+])
+def test_parser_splits_words_like_shlex(text):
+    parser = spack.parse.Parser(sp.SpecLexer())
+    parser.setup(text)
+    assert parser.text == shlex.split(text)
+
+
+def test_parse_cache(monkeypatch):
+    cache = sp.ParseCache()
+    monkeypatch.setattr(sp, 'parse_cache', cache)
+
+    s = Spec('mpileaks@1.2:1.4 +debug cflags=-O2 %gcc target=x86_64 ^mpich')
+    t = Spec('mpileaks@1.2:1.4 +debug cflags=-O2 %gcc target=x86_64 ^mpich')
+    assert cache.hits == 1
+    assert s == t and s is not t
+    assert s.architecture.platform == t.architecture.platform
+
+    # Cached specs are not changed along with the specs copied from them
+    t.variants['debug'].value = False
+    t['mpich'].constrain('@3')
+    assert Spec('mpileaks@1.2:1.4 +debug cflags=-O2 %gcc target=x86_64 '
+                '^mpich') == s
+
+    # Attributes set by the constructor are kept
+    u = Spec('mpileaks@1.2:1.4 +debug cflags=-O2 %gcc target=x86_64 '
+             '^mpich',
+             external_path='/path/to/mpileaks', full_hash='a' * 32)
+    assert u.external_path == '/path/to/mpileaks'
+    assert u._full_hash == 'a' * 32
+
+    # Hashes are not cached
+    with pytest.raises(sp.NoSuchHashError):
+        Spec('/abcdef')
+    assert '/abcdef' not in cache._results
+
+
+def test_parse_cache_platform(monkeypatch):
+    cache = sp.ParseCache()
+    monkeypatch.setattr(sp, 'parse_cache', cache)
+    Spec('mpileaks target=x86_64')
+
+    monkeypatch.setattr(
+        spack.architecture, 'platform', spack.platforms.linux.Linux)
+    s = Spec('mpileaks target=x86_64')
+    assert cache.hits == 0
+    assert s.architecture.platform == 'linux'
+
+
+_benchmark_strings = [
+    'mpileaks@{0}.0:{0}.4 +debug ~shared cflags=-O{0} %gcc@9.3.0 '
+    '^mpich@3.0.{0} target=x86_64'.format(i) for i in range(200)]
+
+
+@pytest.mark.benchmark
+def test_parse_benchmark(monkeypatch, report_timing):
+    """Time parsing specs for the first time, and again from the cache."""
+    def parse():
+        for s in _benchmark_strings:
+            Spec(s)
+
+    cache = sp.ParseCache()
+    monkeypatch.setattr(sp, 'parse_cache', cache)
+    report_timing('first parse', timeit.timeit(
+        lambda: (cache.clear(), parse()), number=5))
+    report_timing('cached parse', timeit.timeit(parse, number=5))
+
+
+class _RuleListLexer(spack.parse.Lexer):
+    """The lexer as it was before its rules were combined: ``re.Scanner``
+    tries the rules in turn, and the rest of a word is scanned again after
+    a mode switch."""
+
+    def __init__(self, lexicon0, mode_switches_01=[],
+                 lexicon1=[], mode_switches_10=[]):
+        self.scanner0 = re.Scanner(lexicon0)
+        self.mode_switches_01 = mode_switches_01
+        self.scanner1 = re.Scanner(lexicon1)
+        self.mode_switches_10 = mode_switches_10
+        self.mode = 0
+
+    def token(self, type, value=''):
+        scanner = self.scanner0 if self.mode == 0 else self.scanner1
+        return spack.parse.Token(
+            type, value, scanner.match.start(0), scanner.match.end(0))
+
+    def lex_word(self, word):
+        scanner = self.scanner0
+        mode_switches = self.mode_switches_01
+        if self.mode == 1:
+            scanner = self.scanner1
+            mode_switches = self.mode_switches_10
+
+        tokens, remainder = scanner.scan(word)
+        remainder_used = 0
+
+        for i, t in enumerate(tokens):
+            if t.type in mode_switches:
+                self.mode = 1 - self.mode
+                remainder_used = 1
+                tokens = tokens[:i + 1] + self.lex_word(
+                    word[word.index(t.value) + len(t.value):])
+                break
+
+        if remainder and not remainder_used:
+            raise spack.parse.LexError(
+                "Invalid character", word, word.index(remainder))
+
+        return tokens
+
+    def lex(self, text):
+        self.mode = 0
+        return super(_RuleListLexer, self).lex(text)
+
+
+class _RuleListSpecLexer(sp.SpecLexer, _RuleListLexer):
+    """The rules of ``SpecLexer``, tried in turn."""
+
+
+@pytest.mark.benchmark
+def test_lexer_benchmark(report_timing):
+    """Time lexing specs with the rules combined in one regular expression,
+    and with the rules tried in turn."""
+    words = [s.split() for s in _benchmark_strings]
+    combined, rule_list = sp.SpecLexer(), _RuleListSpecLexer()
+    for text in words:
+        assert combined.lex(text) == rule_list.lex(text)
+
+    def lex(lexer):
+        for text in words:
+            lexer.lex(text)
+
+    report_timing('combined rules', timeit.timeit(
+        lambda: lex(combined), number=5))
+    report_timing('rule list', timeit.timeit(
+        lambda: lex(rule_list), number=5))
@@ -9,6 +9,8 @@
 
 """
 import ast
+import base64
+import hashlib
 import inspect
 import os
 
@@ -321,3 +323,65 @@ def test_save_dependency_spec_yamls_subset(tmpdir, config):
 
         assert check_specs_equal(b_spec, os.path.join(output_path, 'b.yaml'))
         assert check_specs_equal(c_spec, os.path.join(output_path, 'c.yaml'))
+
+
+def _yaml_hash(spec, hash):
+    """Compute a spec hash from the node dict dumped by the YAML emitter,
+    as hashes used to be computed."""
+    yaml_text = syaml.dump(spec.to_node_dict(hash=hash),
+                           default_flow_style=True)
+    sha = hashlib.sha1(yaml_text.encode('utf-8'))
+    return base64.b32encode(sha.digest()).lower().decode('utf-8')
+
+
+def _check_hashes(spec):
+    for s in spec.traverse():
+        assert s.dag_hash() == _yaml_hash(s, ht.dag_hash)
+        assert s.build_hash() == _yaml_hash(s, ht.build_hash)
+        assert s.full_hash() == _yaml_hash(s, ht.full_hash)
+
+
+@pytest.mark.parametrize('spec_str', [
+    'mpileaks', 'dyninst', 'patch-several-dependencies', 'patch-a-dependency',
+    'multivalue-variant', 'singlevalue-variant-dependent', 'externaltool',
+    'hash-test1', 'hash-test3',
+])
+def test_hashes_match_yaml_emitter(spec_str, config, mock_packages):
+    _check_hashes(Spec(spec_str).concretized())
+
+
+def test_installed_hashes_match_yaml_emitter(database):
+    for spec in database.query(installed=any):
+        for s in spec.traverse():
+            assert s.dag_hash() == _yaml_hash(s, ht.dag_hash)
+
+
+def _check_package_node_dicts():
+    """Check that nodes of all packages in the repository, with default
+    variants, dump the same as with the YAML emitter."""
+    other = Spec('zlib arch=linux-centos7-x86_64 %gcc@9.3.0')
+    for name in spack.repo.all_package_names():
+        pkg_cls = spack.repo.path.get_pkg_class(name)
+        spec = Spec(name)
+        for variant_name, variant in sorted(pkg_cls.variants.items()):
+            spec.variants[variant_name] = variant.make_default()
+        if pkg_cls.versions:
+            spec.versions = spack.version.VersionList(
+                [max(pkg_cls.versions)])
+        spec.architecture = other.architecture
+        spec.compiler = other.compiler
+        spec.namespace = pkg_cls.namespace
+        spec._concrete = True
+
+        node_dict = spec.to_node_dict()
+        assert (syaml.dump_flow(node_dict) ==
+                syaml.dump(node_dict, default_flow_style=True))
+
+
+def test_mock_package_node_dicts_match_yaml_emitter(config, mock_packages):
+    _check_package_node_dicts()
+
+
+@pytest.mark.maybeslow
+def test_builtin_package_node_dicts_match_yaml_emitter(config):
+    _check_package_node_dicts()
@@ -0,0 +1,98 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Test Spack's node-wide jobserver."""
+import errno
+import os
+
+import pytest
+
+import spack.util.jobserver as jobserver
+
+
+def _tokens(path):
+    """Read all of the tokens available in the pool at ``path``."""
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    tokens = b''
+    try:
+        while True:
+            tokens += os.read(fd, 512)
+    except OSError as e:
+        assert e.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+    finally:
+        os.close(fd)
+    return tokens
+
+
+@pytest.fixture()
+def jobserver_path(tmpdir):
+    path = str(tmpdir.join('jobserver', 'jobserver'))
+    yield path
+    jobserver.detach()
+
+
+def test_jobserver_fill(jobserver_path):
+    """Test the first process to attach fills the pool."""
+    js = jobserver.attach(jobserver_path, 4)
+    assert js is not None
+    assert jobserver.attach(jobserver_path, 8) is js
+
+    assert _tokens(jobserver_path) == jobserver.token * 4
+
+
+def test_jobserver_drains_stale_tokens(jobserver_path):
+    """Test tokens left behind by earlier clients are replaced."""
+    os.makedirs(os.path.dirname(jobserver_path))
+    os.mkfifo(jobserver_path)
+    fd = os.open(jobserver_path, os.O_RDWR)
+    try:
+        os.write(fd, jobserver.token * 10)
+        js = jobserver.attach(jobserver_path, 2)
+    finally:
+        os.close(fd)
+
+    assert _tokens(jobserver_path) == jobserver.token * 2
+    assert str(js.read_fd) in js.makeflags
+    assert '--jobserver-auth={0},{1}'.format(*js.fds) in js.makeflags
+
+
+def test_jobserver_acquire_release(jobserver_path):
+    """Test clients take what is available and give it back."""
+    js = jobserver.attach(jobserver_path, 4)
+    assert js.acquire() == 1
+    assert js.acquire(8) == 3
+    assert js.held == 4
+    assert _tokens(jobserver_path) == b''
+
+    js.release(4)
+    assert js.held == 0
+    assert _tokens(jobserver_path) == jobserver.token * 4
+
+
+def test_jobserver_refill(jobserver_path):
+    """Test tokens lost by clients are replaced, except the held ones."""
+    js = jobserver.attach(jobserver_path, 4)
+    assert js.acquire() == 1
+
+    # Tokens taken by a client that never gives them back
+    lost = _tokens(jobserver_path)
+    assert len(lost) == 3
+
+    # Nothing is available, until the pool is filled again
+    assert js.refill()
+    assert js.acquire(8) == 3
+    js.release(4)
+    assert _tokens(jobserver_path) == jobserver.token * 4
+
+
+def test_jobserver_not_a_pipe(jobserver_path):
+    """Test a regular file is not mistaken for the jobserver."""
+    os.makedirs(os.path.dirname(jobserver_path))
+    with open(jobserver_path, 'w'):
+        pass
+
+    with pytest.raises(jobserver.JobserverError):
+        jobserver.Jobserver(jobserver_path, 2)
+    assert jobserver.attach(jobserver_path, 2) is None
@@ -0,0 +1,73 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import marshal
+import os
+import sys
+
+import pytest
+
+import spack.util.imp as simp
+
+if sys.version_info >= (3, 5):
+    from importlib.util import MAGIC_NUMBER  # novm
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 5), reason='bytecode is only cached on Python 3')
+
+
+@pytest.fixture()
+def module_file(tmpdir):
+    path = tmpdir.join('module.py')
+    path.write('value = prepended + 1\n')
+    return path
+
+
+def _load(path, bytecode_dir, prepend='prepended = 1'):
+    name = 'spack_test_imp_module'
+    try:
+        return simp.load_source(name, str(path), prepend=prepend,
+                                bytecode_dir=str(bytecode_dir))
+    finally:
+        sys.modules.pop(name, None)
+
+
+def test_bytecode_cache(module_file, tmpdir):
+    bytecode_dir = tmpdir.join('bytecode')
+    assert _load(module_file, bytecode_dir).value == 2
+    cached = bytecode_dir.listdir()
+    assert len(cached) == 1
+
+    # The cached bytecode is used as long as the source is unchanged
+    code = compile('value = 42', str(module_file), 'exec')
+    cached[0].write_binary(MAGIC_NUMBER + marshal.dumps(code))
+    assert _load(module_file, bytecode_dir).value == 42
+
+    # Invalid bytecode is replaced
+    cached[0].write_binary(b'invalid')
+    assert _load(module_file, bytecode_dir).value == 2
+    assert _load(module_file, bytecode_dir).value == 2
+
+
+def test_bytecode_cache_invalidation(module_file, tmpdir):
+    bytecode_dir = tmpdir.join('bytecode')
+    assert _load(module_file, bytecode_dir).value == 2
+
+    # A different prepended text is compiled again
+    assert _load(module_file, bytecode_dir, 'prepended = 2').value == 3
+    assert len(bytecode_dir.listdir()) == 2
+
+    # So is a modified source
+    module_file.write('value = prepended + 10\n')
+    st = os.stat(str(module_file))
+    os.utime(str(module_file), (st.st_atime, st.st_mtime + 1))
+    assert _load(module_file, bytecode_dir).value == 11
+    assert len(bytecode_dir.listdir()) == 3
+
+
+def test_bytecode_cache_not_writable(module_file, tmpdir):
+    bytecode_dir = tmpdir.join('bytecode')
+    bytecode_dir.write('not a directory')
+    assert _load(module_file, bytecode_dir).value == 2
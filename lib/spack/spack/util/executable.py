@@ -88,6 +88,8 @@ def __call__(self, *args, **kwargs):
             input: Where to read stdin from
             output: Where to send stdout
             error: Where to send stderr
+            pass_fds (list): Additional file descriptors to keep open in the
+                subprocess
 
         Accepted values for input, output, and error:
 
@@ -102,7 +104,8 @@ def __call__(self, *args, **kwargs):
           Behaves the same as ``str``, except that value is also written to
           ``stdout`` or ``stderr``.
 
-        By default, the subprocess inherits the parent's file descriptors.
+        By default, the subprocess inherits the parent's standard file
+        descriptors.
 
         """
         # Environment
@@ -132,6 +135,12 @@ def __call__(self, *args, **kwargs):
         if input is str:
             raise ValueError('Cannot use `str` as input stream.')
 
+        popen_kwargs = {}
+        pass_fds = kwargs.pop('pass_fds', None)
+        if pass_fds and sys.version_info >= (3,):
+            # Python 2 does not close any file descriptors by default
+            popen_kwargs['pass_fds'] = pass_fds
+
         def streamify(arg, mode):
             if isinstance(arg, string_types):
                 return open(arg, mode), True
@@ -167,7 +176,8 @@ def streamify(arg, mode):
                 stdin=istream,
                 stderr=estream,
                 stdout=ostream,
-                env=env)
+                env=env,
+                **popen_kwargs)
             out, err = proc.communicate()
 
             result = None
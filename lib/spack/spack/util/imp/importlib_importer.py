@@ -7,13 +7,76 @@
 
 ``importlib`` is only fully implemented in Python 3.
 """
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
 from importlib.machinery import SourceFileLoader  # novm
+from importlib.util import MAGIC_NUMBER  # novm
 
 
 class PrependFileLoader(SourceFileLoader):
-    def __init__(self, full_name, path, prepend=None):
+    def __init__(self, full_name, path, prepend=None, bytecode_dir=None):
         super(PrependFileLoader, self).__init__(full_name, path)
         self.prepend = prepend
+        self.bytecode_dir = bytecode_dir
+
+    def bytecode_path(self, fullname):
+        """Path of the cached bytecode of the module in ``bytecode_dir``.
+
+        The file name has a hash of everything the bytecode depends on:
+        the path, modification time and size of the source, the text
+        prepended to it, and the interpreter.
+        """
+        source_path = self.get_filename(fullname)
+        st = os.stat(source_path)
+        key = '\0'.join([
+            source_path, str(st.st_mtime_ns), str(st.st_size),  # novm
+            self.prepend or '', sys.version, MAGIC_NUMBER.hex()])
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(
+            self.bytecode_dir, '%s-%s.pyc' % (fullname, digest[:32]))
+
+    def get_code(self, fullname):
+        if self.bytecode_dir is None:
+            return super(PrependFileLoader, self).get_code(fullname)
+
+        bytecode_path = self.bytecode_path(fullname)
+        try:
+            with open(bytecode_path, 'rb') as f:
+                data = f.read()
+            if data[:len(MAGIC_NUMBER)] == MAGIC_NUMBER:
+                return marshal.loads(data[len(MAGIC_NUMBER):])
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        source_path = self.get_filename(fullname)
+        code = self.source_to_code(self.get_data(source_path), source_path)
+        self._write_bytecode(bytecode_path, code)
+        return code
+
+    def _write_bytecode(self, bytecode_path, code):
+        """Write bytecode to the cache, if possible.
+
+        The bytecode is written to a temporary file that is renamed to its
+        final name, so concurrent readers and writers only ever see
+        complete files.
+        """
+        try:
+            os.makedirs(self.bytecode_dir, exist_ok=True)  # novm
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.bytecode_dir, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(MAGIC_NUMBER + marshal.dumps(code))
+                os.replace(tmp_path, bytecode_path)  # novm
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            # The cache is an optimization; e.g., it may not be writable
+            pass
 
     def path_stats(self, path):
         stats = super(PrependFileLoader, self).path_stats(path)
@@ -29,7 +92,7 @@ def get_data(self, path):
             return self.prepend.encode() + b"\n" + data
 
 
-def load_source(full_name, path, prepend=None):
+def load_source(full_name, path, prepend=None, bytecode_dir=None):
     """Import a Python module from source.
 
     Load the source file and add it to ``sys.modules``.
@@ -39,10 +102,12 @@ def load_source(full_name, path, prepend=None):
         path (str): path to the file that should be loaded
         prepend (str, optional): some optional code to prepend to the
             loaded module; e.g., can be used to inject import statements
+        bytecode_dir (str, optional): directory where the compiled module
+            is cached, instead of ``__pycache__`` next to the source
 
     Returns:
         (ModuleType): the loaded module
     """
     # use our custom loader
-    loader = PrependFileLoader(full_name, path, prepend)
+    loader = PrependFileLoader(full_name, path, prepend, bytecode_dir)
     return loader.load_module()
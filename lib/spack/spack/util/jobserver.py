@@ -0,0 +1,228 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""GNU make compatible jobserver shared by all builds on a node.
+
+GNU make coordinates parallel sub-makes through a pipe preloaded with one
+token per extra job: a make must read a token before starting a job beyond
+its first and write it back when the job is done.  Spack hosts such a pool
+in a named pipe (FIFO) so that builds run by separate Spack processes on the
+same node draw jobs from the same pool instead of each running ``make -jN``.
+
+The pool holds one token per job.  Each make started by Spack keeps one
+job of its own without reading a token, so Spack takes a token for it before
+starting it and gives it back when it exits.  Tools that are not jobserver
+clients take their ``-j`` from the pool in the same way.
+
+The pool only exists while at least one process has the FIFO open, so every
+process attached to it holds a shared lock on a lock file next to it.  The
+first process to attach (i.e., the one that can get an exclusive lock) drains
+any stale tokens and fills the pool before downgrading to a shared lock.
+
+A make that is killed does not give back the tokens it holds.  A process
+that is the only one attached to the pool (i.e., that can upgrade its lock)
+fills the pool again after a client fails or while it waits for a token, but
+lost tokens are not replaced while other processes are attached.
+"""
+import errno
+import os
+import select
+import stat
+import sys
+
+import llnl.util.lock as lk
+import llnl.util.tty as tty
+from llnl.util.filesystem import mkdirp
+
+import spack.error
+
+__all__ = ['Jobserver', 'attach', 'detach']
+
+#: Character written to the pipe for each token (the one GNU make uses)
+token = b'+'
+
+#: The jobserver the current process is attached to, if any
+_jobserver = None
+
+
+class Jobserver(object):
+    """A pool of job tokens in a named pipe shared by processes on a node."""
+
+    def __init__(self, path, jobs):
+        """Attach to the jobserver at ``path``, creating it if necessary.
+
+        Args:
+            path (str): path of the named pipe holding the tokens
+            jobs (int): maximum number of parallel jobs, which is used to
+                size the pool if this process is the first one to attach
+        """
+        self.path = path
+        self.jobs = jobs
+
+        mkdirp(os.path.dirname(path))
+        try:
+            os.mkfifo(path, 0o600)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        if not stat.S_ISFIFO(os.stat(path).st_mode):
+            raise JobserverError('{0} is not a named pipe'.format(path))
+
+        # Open for reading and writing so opening never blocks and the pool
+        # persists as long as we are attached.
+        self.read_fd = os.open(path, os.O_RDWR)
+        self.write_fd = os.open(path, os.O_WRONLY)
+
+        # Tokens are taken through a separate, non-blocking open file
+        # description so the descriptors handed to make stay blocking.
+        self._nonblocking_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+        #: Number of tokens taken from the pool by this process
+        self.held = 0
+
+        self._lock = lk.Lock(path + '.lock', desc='jobserver')
+        try:
+            self._lock.acquire_write(timeout=1e-9)
+        except lk.LockTimeoutError:
+            # Others are attached, so the pool is already filled.
+            self._lock.acquire_read()
+        else:
+            self._fill()
+            self._lock.downgrade_write_to_read()
+
+    def _read_tokens(self, count):
+        """Take up to ``count`` tokens without waiting, and return how many
+        were taken."""
+        taken = 0
+        while taken < count:
+            try:
+                data = os.read(self._nonblocking_fd, count - taken)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            taken += len(data)
+        return taken
+
+    def _fill(self):
+        """Replace the tokens in the pool with the ones that are not held
+        by this process."""
+        while self._read_tokens(512):
+            pass
+
+        count = self.jobs - self.held
+        tty.debug('Filling jobserver {0} with {1} tokens'
+                  .format(self.path, count))
+        if count > 0:
+            os.write(self.write_fd, token * count)
+
+    def refill(self):
+        """Fill the pool again if no other process is attached to it, so
+        tokens lost by killed clients are replaced.
+
+        Returns:
+            (bool): whether the pool was filled again
+        """
+        try:
+            self._lock.upgrade_read_to_write(timeout=1e-9)
+        except lk.LockTimeoutError:
+            return False
+
+        try:
+            self._fill()
+        finally:
+            self._lock.downgrade_write_to_read()
+        return True
+
+    def acquire(self, jobs=1):
+        """Take tokens from the pool for up to ``jobs`` jobs.
+
+        Waits for the first token, and takes as many of the others as are
+        available right away.
+
+        Args:
+            jobs (int): number of jobs wanted
+
+        Returns:
+            (int): number of tokens taken, which is between 1 and ``jobs``
+        """
+        taken = self._read_tokens(1)
+        while not taken:
+            # The pool may be empty because tokens were lost
+            ready, _, _ = select.select([self._nonblocking_fd], [], [], 1)
+            if not ready:
+                self.refill()
+            taken = self._read_tokens(1)
+
+        taken += self._read_tokens(max(jobs, 1) - 1)
+        self.held += taken
+        return taken
+
+    def release(self, jobs=1):
+        """Give back tokens taken with ``acquire()``.
+
+        Args:
+            jobs (int): number of tokens to give back
+        """
+        self.held -= jobs
+        os.write(self.write_fd, token * jobs)
+
+    @property
+    def fds(self):
+        """The descriptors a client needs to inherit to use the pool."""
+        return (self.read_fd, self.write_fd)
+
+    @property
+    def makeflags(self):
+        """``MAKEFLAGS`` that make a (GNU make compatible) client use the
+        pool, in both the current and pre-4.2 spellings."""
+        return '-j --jobserver-auth={0},{1} --jobserver-fds={0},{1}'.format(
+            self.read_fd, self.write_fd)
+
+    def close(self):
+        """Detach from the pool."""
+        for fd in self.fds + (self._nonblocking_fd,):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._lock.release_read()
+
+
+def attach(path, jobs):
+    """Attach the current process to the jobserver at ``path``.
+
+    Subsequent calls return the same jobserver.
+
+    Args:
+        path (str): path of the named pipe holding the tokens
+        jobs (int): maximum number of parallel jobs on the node
+
+    Returns:
+        (Jobserver or None): the jobserver, or ``None`` if it is not
+            available on this platform or could not be set up
+    """
+    global _jobserver
+    if _jobserver is None and sys.platform != 'win32':
+        try:
+            _jobserver = Jobserver(path, jobs)
+        except (OSError, lk.LockError, JobserverError) as e:
+            tty.warn('Cannot use the jobserver at {0}: {1}'
+                     .format(path, str(e)))
+    return _jobserver
+
+
+def detach():
+    """Detach the current process from its jobserver, if any."""
+    global _jobserver
+    if _jobserver is not None:
+        _jobserver.close()
+        _jobserver = None
+
+
+class JobserverError(spack.error.SpackError):
+    """Raised when the jobserver cannot be set up."""
@@ -14,13 +14,15 @@
 """
 import ctypes
 import collections
+import re
 from typing import List  # novm
 
 from ordereddict_backport import OrderedDict
-from six import string_types, StringIO
+from six import integer_types, string_types, StringIO, text_type
 
 import ruamel.yaml as yaml
 from ruamel.yaml import RoundTripLoader, RoundTripDumper
+from ruamel.yaml.nodes import ScalarNode
 
 from llnl.util.tty.color import colorize, clen, cextra
 
@@ -208,6 +210,102 @@ def dump(obj, default_flow_style=False, stream=None):
                      Dumper=SafeDumper, stream=stream)
 
 
+#: Strings that dump_flow() writes itself: they are emitted plain, or
+#: single-quoted if they would be read back as something other than a
+#: string.  Others are left to the YAML emitter.
+_flow_plain_re = re.compile(
+    r'^(?:[A-Za-z0-9_/]|[-.][A-Za-z0-9_])[A-Za-z0-9_.+=/-]*'
+    r'(?: [A-Za-z0-9_.+=/-]+)*$')
+
+_flow_str_types = tuple(set([str, text_type, syaml_str]))
+_flow_int_types = tuple(integer_types) + (syaml_int,)
+_flow_dict_types = (dict, syaml_dict)
+_flow_list_types = (list, tuple, syaml_list)
+
+#: Strings emitted by dump_flow(), keyed on their value
+_flow_str_cache = {}
+
+#: Resolver of the tags of plain scalars, as used by SafeDumper
+_flow_resolver = None
+
+
+class _NotFlowable(Exception):
+    """Raised for data dump_flow() leaves to the YAML emitter."""
+
+
+def _flow_str(value):
+    global _flow_resolver
+
+    text = _flow_str_cache.get(value)
+    if text is None:
+        if not _flow_plain_re.match(value):
+            raise _NotFlowable()
+
+        if _flow_resolver is None:
+            _flow_resolver = SafeDumper(None)
+        tag = _flow_resolver.resolve(ScalarNode, value, (True, False))
+        text = value if tag == 'tag:yaml.org,2002:str' else "'%s'" % value
+
+        if len(_flow_str_cache) > 65536:
+            _flow_str_cache.clear()
+        _flow_str_cache[value] = text
+    return text
+
+
+def _dump_flow(obj, out):
+    cls = type(obj)
+    if cls in _flow_str_types:
+        out.append(_flow_str(obj))
+    elif cls is bool:
+        out.append('true' if obj else 'false')
+    elif cls in _flow_int_types:
+        out.append(str(int(obj)))
+    elif obj is None:
+        out.append("!!null ''")
+    elif cls in _flow_dict_types:
+        out.append('{')
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                out.append(', ')
+            # Long keys are not emitted as simple keys
+            if type(key) not in _flow_str_types or len(key) >= 128:
+                raise _NotFlowable()
+            out.append(_flow_str(key))
+            out.append(': ')
+            _dump_flow(value, out)
+        out.append('}')
+    elif cls in _flow_list_types:
+        out.append('[')
+        for i, value in enumerate(obj):
+            if i:
+                out.append(', ')
+            _dump_flow(value, out)
+        out.append(']')
+    else:
+        raise _NotFlowable()
+
+
+def dump_flow(obj):
+    """Return the same text as ``dump(obj, default_flow_style=True)``.
+
+    Mappings, sequences, strings, integers, booleans and ``None`` are
+    written directly, on one line, as the YAML emitter writes them (lines
+    are never wrapped by ``dump()``), which is many times faster.  This is
+    the text spec hashes are computed from.  Anything else, including
+    strings that may need quoting other than plain single quotes, is left
+    to ``dump()``, so the text is always the same.
+    """
+    if type(obj) in _flow_dict_types or type(obj) in _flow_list_types:
+        out = []
+        try:
+            _dump_flow(obj, out)
+            out.append('\n')
+            return ''.join(out)
+        except _NotFlowable:
+            pass
+    return dump(obj, default_flow_style=True)
+
+
 def file_line(mark):
     """Format a mark as <file>:<line> information."""
     result = mark.name
@@ -213,6 +213,11 @@ class AbstractVariant(object):
     values.
     """
 
+    __slots__ = ('name', '_value', '_original_value')
+
+    __getstate__ = lang.getstate_with_slots
+    __setstate__ = lang.setstate_with_slots
+
     def __init__(self, name, value):
         self.name = name
 
@@ -372,6 +377,10 @@ def __str__(self):
 
 class MultiValuedVariant(AbstractVariant):
     """A variant that can hold multiple values at once."""
+
+    # Only set on the variant holding the patches of a spec
+    __slots__ = ('_patches_in_order_of_appearance',)
+
     @implicit_variant_conversion
     def satisfies(self, other):
         """Returns true if ``other.name == self.name`` and ``other.value`` is
@@ -398,6 +407,8 @@ def append(self, value):
 class SingleValuedVariant(AbstractVariant):
     """A variant that can hold multiple values, but one at a time."""
 
+    __slots__ = ()
+
     def _value_setter(self, value):
         # Treat the value as a multi-valued variant
         super(SingleValuedVariant, self)._value_setter(value)
@@ -449,6 +460,8 @@ class BoolValuedVariant(SingleValuedVariant):
     BoolValuedVariant can also hold the value '*', for coerced
     comparisons between ``foo=*`` and ``+foo`` or ``~foo``."""
 
+    __slots__ = ()
+
     def _value_setter(self, value):
         # Check the string representation of the value and turn
         # it to a boolean
@@ -478,6 +491,8 @@ class VariantMap(lang.HashableMap):
     if the key is not already present.
     """
 
+    __slots__ = ('spec',)
+
     def __init__(self, spec):
         super(VariantMap, self).__init__()
         self.spec = spec
@@ -333,7 +333,7 @@ _spack() {
     then
         SPACK_COMPREPLY="-h --help -H --all-help --color -C --config-scope -d --debug --timestamp --pdb -e --env -D --env-dir -E --no-env --use-env-repo -k --insecure -l --enable-locks -L --disable-locks -m --mock -p --profile --sorted-profile --lines -v --verbose --stacktrace -V --version --print-shell-vars"
     else
-        SPACK_COMPREPLY="activate add arch blame build-env buildcache cd checksum ci clean clone commands compiler compilers concretize config containerize create deactivate debug dependencies dependents deprecate dev-build develop docs edit env extensions external fetch find flake8 gc gpg graph help info install license list load location log-parse maintainers mark mirror module patch pkg providers pydoc python reindex remove rm repo resource restage setup solve spec stage style test test-env tutorial undevelop uninstall unit-test unload url verify versions view"
+        SPACK_COMPREPLY="activate add arch blame build-env build-stats buildcache cd checksum ci clean clone commands compiler compilers concretize config containerize create database deactivate debug dependencies dependents deprecate dev-build develop docs edit env extensions external fetch find flake8 gc gpg graph help info install license list load location log-parse maintainers mark mirror module patch pkg providers pydoc python reindex remove rm repo resource restage setup solve spec stage style test test-env tutorial undevelop uninstall unit-test unload url verify versions view"
     fi
 }
 
@@ -377,6 +377,15 @@ _spack_build_env() {
     fi
 }
 
+_spack_build_stats() {
+    if $list_options
+    then
+        SPACK_COMPREPLY="-h --help -g --group-by -s --sort -n --limit -p --phases"
+    else
+        _all_packages
+    fi
+}
+
 _spack_buildcache() {
     if $list_options
     then
@@ -676,6 +685,23 @@ _spack_create() {
     fi
 }
 
+_spack_database() {
+    if $list_options
+    then
+        SPACK_COMPREPLY="-h --help"
+    else
+        SPACK_COMPREPLY="import export"
+    fi
+}
+
+_spack_database_import() {
+    SPACK_COMPREPLY="-h --help"
+}
+
+_spack_database_export() {
+    SPACK_COMPREPLY="-h --help"
+}
+
 _spack_deactivate() {
     if $list_options
     then
@@ -1033,7 +1059,7 @@ _spack_info() {
 _spack_install() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help --only -u --until -j --jobs --overwrite --fail-fast --keep-prefix --keep-stage --dont-restage --use-cache --no-cache --cache-only --include-build-deps --no-check-signature --require-full-hash-match --show-log-on-error --source -n --no-checksum -v --verbose --fake --only-concrete -f --file --clean --dirty --test --run-tests --log-format --log-file --help-cdash --cdash-upload-url --cdash-build --cdash-site --cdash-track --cdash-buildstamp -y --yes-to-all"
+        SPACK_COMPREPLY="-h --help --only -u --until -j --jobs --overwrite --fail-fast --concurrent-builds --prefetch-jobs --keep-prefix --keep-stage --dont-restage --use-cache --no-cache --cache-only --include-build-deps --no-check-signature --require-full-hash-match --show-log-on-error --source -n --no-checksum -v --verbose --fake --only-concrete -f --file --clean --dirty --test --run-tests --log-format --log-file --help-cdash --cdash-upload-url --cdash-build --cdash-site --cdash-track --cdash-buildstamp -y --yes-to-all"
     else
         _all_packages
     fi
@@ -1380,7 +1406,7 @@ _spack_python() {
 }
 
 _spack_reindex() {
-    SPACK_COMPREPLY="-h --help"
+    SPACK_COMPREPLY="-h --help -i --incremental -j --jobs"
 }
 
 _spack_remove() {